@@ -0,0 +1,87 @@
+"""
+Script to export LLM caches to a cache bundle, or import a bundle into a service's cache.
+
+A bundle is a single read-only file of cached responses that can be copied to, or mounted on,
+other machines, e.g. to warm-start cluster jobs (see LLMService cache_bundles).
+
+Examples:
+    python3 scripts/cache-bundle.py export shared/responses.bundle --service openai --model gpt-4o --since 2026-01-01
+    python3 scripts/cache-bundle.py export merged.bundle --bundle a.bundle --bundle b.bundle
+    python3 scripts/cache-bundle.py import shared/responses.bundle --service openai
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+# Standard library imports
+import argparse
+import os
+import logging
+from logging.handlers import RotatingFileHandler
+
+# Logging setup
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_DIR = os.path.join(ROOT, 'data', 'logs', 'docs')
+os.makedirs(LOG_DIR, exist_ok=True)
+LOG_FILE = os.path.join(LOG_DIR, 'cache_bundle.log')
+logger = logging.getLogger("cache_bundle")
+logger.setLevel(logging.INFO)
+handler = RotatingFileHandler(LOG_FILE, maxBytes=512*1024, backupCount=3)
+formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+handler.setFormatter(formatter)
+if not logger.hasHandlers():
+    logger.addHandler(handler)
+
+
+def export_command(args):
+    """
+    Export the caches of services and bundles to a new bundle.
+    """
+    from gabm.io.llm.bundle import export_bundle
+    count = export_bundle(
+        args.bundle, services=args.service, bundles=args.include, models=args.model or None,
+        since=args.since, until=args.until, compression=args.compression, dictionary=args.dictionary,
+        keep_raw=args.keep_raw, backend=args.backend, logger=logger
+    )
+    print(f"Exported {count} cached responses to {args.bundle}.")
+
+
+def import_command(args):
+    """
+    Import a bundle into the cache of each given service.
+    """
+    from gabm.io.llm.bundle import import_bundle
+    for service in args.service:
+        count = import_bundle(
+            args.bundle, service, models=args.model or None, overwrite=args.overwrite, logger=logger, backend=args.backend
+        )
+        print(f"{service}: imported {count} cached responses.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export and import LLM cache bundles.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export caches to a bundle.")
+    export_parser.add_argument("bundle", help="The bundle file to write.")
+    export_parser.add_argument("--service", action="append", default=[], help="Include this service's cache (repeatable).")
+    export_parser.add_argument("--bundle", dest="include", action="append", default=[], help="Include this bundle (repeatable).")
+    export_parser.add_argument("--model", action="append", default=[], help="Only export responses from this model (repeatable).")
+    export_parser.add_argument("--since", help="Only export responses cached at or after this UTC time (ISO format).")
+    export_parser.add_argument("--until", help="Only export responses cached before this UTC time (ISO format).")
+    export_parser.add_argument("--compression", help="Compress values with zlib, gzip or zstd.")
+    export_parser.add_argument("--dictionary", action="store_true", help="Train a compression dictionary (zlib or zstd).")
+    export_parser.add_argument("--keep-raw", action="store_true", help="Keep the full provider payload of each response.")
+    export_parser.add_argument("--backend", default="segment", help="The cache backend of the services (segment, sqlite or pickle).")
+    export_parser.set_defaults(func=export_command)
+    import_parser = subparsers.add_parser("import", help="Import a bundle into service caches.")
+    import_parser.add_argument("bundle", help="The bundle file to read.")
+    import_parser.add_argument("--service", action="append", required=True, help="Import into this service's cache (repeatable).")
+    import_parser.add_argument("--model", action="append", default=[], help="Only import responses from this model (repeatable).")
+    import_parser.add_argument("--overwrite", action="store_true", help="Replace responses the cache already holds.")
+    import_parser.add_argument("--backend", default="segment", help="The cache backend of the services (segment, sqlite or pickle).")
+    import_parser.set_defaults(func=import_command)
+    args = parser.parse_args()
+    logger.info(f"Starting cache-bundle.py {args.command}")
+    args.func(args)
+    logger.info("cache-bundle.py completed successfully.")
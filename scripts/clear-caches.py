@@ -1,6 +1,9 @@
 """
 Script to clear all LLM caches and model lists for a clean slate.
 This removes all cached responses and model lists for all LLMs, allowing you to start fresh with new API calls and model queries. Use this when you want to reset the state of your LLM interactions or if you encounter issues with stale cache data.
+
+With --service, only the cached responses of that service are cleared (optionally only those of one
+model with --model), and pinned responses are kept unless --include-pinned is given.
 """
 # Metadata
 __author__ = ["Andy Turner <agdturner@gmail.com>"]
@@ -8,6 +11,7 @@ __version__ = "0.1.0"
 __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
 # Standard library imports
+import argparse
 import os
 import shutil
 import logging
@@ -33,21 +37,74 @@ CACHE_PATHS = [
     os.path.join("data", "model_lists"),
 ]
 
-# Remove cache directories/files
-logger.info("Starting clear_caches.py script")
-for path in CACHE_PATHS:
-    if os.path.exists(path):
-        try:
-            if os.path.isdir(path):
-                shutil.rmtree(path)
-                logger.info(f"Removed directory: {path}")
-            else:
-                os.remove(path)
-                logger.info(f"Removed file: {path}")
-        except Exception as e:
-            logger.error(f"Could not remove {path}: {e}")
+
+def clear_all():
+    """
+    Remove all cache directories/files.
+    """
+    for path in CACHE_PATHS:
+        if os.path.exists(path):
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                    logger.info(f"Removed directory: {path}")
+                else:
+                    os.remove(path)
+                    logger.info(f"Removed file: {path}")
+            except Exception as e:
+                logger.error(f"Could not remove {path}: {e}")
+        else:
+            logger.warning(f"Not found: {path}")
+
+
+def clear_service(service, model=None, include_pinned=False, backend="segment"):
+    """
+    Remove the cached responses of one LLM service, or of one of its models, keeping pinned responses.
+
+    Args:
+        service (str): The service name (e.g. "openai").
+        model (str, optional): Only clear responses from this model.
+        include_pinned (bool): Whether to remove pinned responses too.
+        backend (str): The cache backend used by the service.
+    """
+    from gabm.io.llm.log_writer import iter_log_entries
+    from gabm.io.llm.utils import get_llm_cache_paths, load_llm_cache
+    cache_path, jsonl_path = get_llm_cache_paths(service)
+    with load_llm_cache(cache_path, logger, backend=backend, limits={}) as cache:
+        if model is None:
+            removed = sum(cache.clear_namespace(namespace, include_pinned=include_pinned) for namespace in list(cache.namespaces()))
+        else:
+            removed = cache.clear_namespace(model, include_pinned=include_pinned)
+            # Responses cached by a service without cache_limits have no namespace: take their model from the JSONL log
+            unlabelled = [key for key in cache if cache.namespace_of(key) is None]
+            if unlabelled:
+                models = {entry["cache_key"]: entry.get("model") for entry in iter_log_entries(jsonl_path) if "cache_key" in entry}
+                keys = [key for key in unlabelled
+                        if models.get(key) == model and (include_pinned or not cache.is_pinned(key))]
+                for key in keys:
+                    del cache[key]
+                removed += len(keys)
+                unknown = sum(1 for key in unlabelled if key not in models)
+                if unknown:
+                    message = f"{unknown} cached responses have no model recorded in the cache or the JSONL log and were kept."
+                    logger.warning(message)
+                    print(f"Warning: {message}")
+        cache.compact()
+    logger.info(f"Removed {removed} cached responses from {service}" + (f" for model {model}" if model else ""))
+    print(f"Removed {removed} cached responses.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clear LLM caches and model lists.")
+    parser.add_argument("--service", help="Only clear the cached responses of this service (e.g. openai).")
+    parser.add_argument("--model", help="With --service, only clear the cached responses of this model.")
+    parser.add_argument("--include-pinned", action="store_true", help="With --service, also clear pinned responses.")
+    parser.add_argument("--backend", default="segment", help="With --service, the cache backend (segment, sqlite or pickle).")
+    args = parser.parse_args()
+    logger.info("Starting clear_caches.py script")
+    if args.service:
+        clear_service(args.service, args.model, args.include_pinned, args.backend)
     else:
-        logger.warning(f"Not found: {path}")
-        
-# Final log message
-logger.info("clear_caches.py completed successfully.")
\ No newline at end of file
+        clear_all()
+    # Final log message
+    logger.info("clear_caches.py completed successfully.")
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Script to benchmark the LLM service layer against a local mock LLM server.
+
+Starts a MockLLMServer with the given latency distribution, error rate and rate limits, drives an
+OpenAIService or PublicAIService at it from several threads, and prints requests per second,
+latency percentiles, the cache hit rate and error counts. No API key or network connection is
+needed, and the services run in a temporary directory, so real caches and logs are not touched.
+
+Examples:
+    python3 scripts/llm-benchmark.py --service publicai --requests 2000 --unique 500 --concurrency 32
+    python3 scripts/llm-benchmark.py --latency lognormal 0.2 0.5 --rate-limit-rate 0.05 --max-rps 200
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+# Standard library imports
+import argparse
+import os
+import logging
+from logging.handlers import RotatingFileHandler
+import tempfile
+
+# Logging setup
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_DIR = os.path.join(ROOT, 'data', 'logs', 'docs')
+os.makedirs(LOG_DIR, exist_ok=True)
+LOG_FILE = os.path.join(LOG_DIR, 'llm_benchmark.log')
+logger = logging.getLogger("llm_benchmark")
+logger.setLevel(logging.INFO)
+handler = RotatingFileHandler(LOG_FILE, maxBytes=512*1024, backupCount=3)
+formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+handler.setFormatter(formatter)
+if not logger.hasHandlers():
+    logger.addHandler(handler)
+
+
+def parse_latency(values):
+    """
+    Convert a --latency argument (a number of seconds, or a distribution name and its parameters) to a latency spec.
+    """
+    if len(values) == 1:
+        return float(values[0])
+    return (values[0], *(float(value) for value in values[1:]))
+
+
+def run_benchmark(args):
+    """
+    Run the benchmark described by the command line arguments and return the load report.
+    """
+    from gabm.io.llm.load_generator import format_report, make_prompts, run_load
+    from gabm.io.llm.mock_server import MockLLMServer
+    if args.service == "openai":
+        from gabm.io.llm.openai import OpenAIService as Service
+    else:
+        from gabm.io.llm.publicai import PublicAIService as Service
+    rate_limits = {"requests_per_minute": args.client_rpm} if args.client_rpm else None
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir, MockLLMServer(
+        latency=parse_latency(args.latency), error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        max_requests_per_second=args.max_rps, retry_after=args.retry_after, seed=args.seed, logger=logger
+    ) as server:
+        os.chdir(workdir)
+        try:
+            with Service(base_url=server.url, logger=logger, pool_size=args.concurrency, rate_limits=rate_limits) as service:
+                prompts = make_prompts(args.requests, args.unique, seed=args.seed)
+                report = run_load(service, "mock-key", prompts, model="mock-model", concurrency=args.concurrency, server=server)
+        finally:
+            os.chdir(cwd)
+    print(format_report(report))
+    logger.info(f"Benchmark report: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the LLM service layer against a local mock server.")
+    parser.add_argument("--service", choices=["openai", "publicai"], default="publicai", help="The service class to drive.")
+    parser.add_argument("--requests", type=int, default=1000, help="Number of requests to send.")
+    parser.add_argument("--unique", type=int, help="Number of distinct prompts (default: all distinct).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of sending threads.")
+    parser.add_argument("--latency", nargs="+", default=["0.05"],
+                        help="Server latency: seconds, or uniform LOW HIGH, normal MEAN SD, lognormal MEDIAN SIGMA or exponential MEAN.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an injected HTTP 500.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of an injected HTTP 429.")
+    parser.add_argument("--max-rps", type=float, help="Server requests per second above which requests get HTTP 429.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with HTTP 429.")
+    parser.add_argument("--client-rpm", type=float, help="Client-side requests per minute limit.")
+    parser.add_argument("--seed", type=int, help="Seed for the workload, latencies and injected errors.")
+    args = parser.parse_args()
+    logger.info("Starting llm-benchmark.py script")
+    run_benchmark(args)
+    logger.info("llm-benchmark.py completed successfully.")
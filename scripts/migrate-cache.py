@@ -0,0 +1,78 @@
+"""
+Script to convert LLM prompt/response caches to the pickle-free segment format.
+
+Existing caches are pickles of provider SDK objects, which are slow to load, can break when an SDK
+is upgraded and are unsafe to load from someone else. This converts each service's
+prompt_response_cache.pkl (and any pickle-serialised prompt_response_cache.seg) to a segment of
+compact LLMResponse records stored as tagged JSON. The replaced segment is kept as .seg.bak.
+
+By default every service under data/llm is converted; use --service to convert one.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+# Standard library imports
+import argparse
+import os
+import logging
+from logging.handlers import RotatingFileHandler
+
+# Logging setup
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_DIR = os.path.join(ROOT, 'data', 'logs', 'docs')
+os.makedirs(LOG_DIR, exist_ok=True)
+LOG_FILE = os.path.join(LOG_DIR, 'migrate_cache.log')
+logger = logging.getLogger("migrate_cache")
+logger.setLevel(logging.INFO)
+handler = RotatingFileHandler(LOG_FILE, maxBytes=512*1024, backupCount=3)
+formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+handler.setFormatter(formatter)
+if not logger.hasHandlers():
+    logger.addHandler(handler)
+
+LLM_DIR = os.path.join("data", "llm")
+
+
+def migrate_service(service, keep_raw=False, compression=None, dictionary=False):
+    """
+    Convert the cache of one LLM service to the pickle-free segment format.
+
+    Args:
+        service (str): The service name (e.g. "openai").
+        keep_raw (bool): Whether records keep the full provider payload.
+        compression (str, optional): "zlib", "gzip" or "zstd" to compress values.
+        dictionary (bool): Whether to train a compression dictionary on the values.
+
+    Returns:
+        int: The number of entries migrated.
+    """
+    from gabm.io.llm.utils import get_llm_cache_paths, migrate_llm_cache
+    cache_path, _ = get_llm_cache_paths(service)
+    count = migrate_llm_cache(cache_path, keep_raw=keep_raw, compression=compression, dictionary=dictionary, logger=logger)
+    print(f"{service}: migrated {count} cached responses.")
+    return count
+
+
+def list_services():
+    """
+    Return the names of the services with a cache directory under data/llm.
+    """
+    if not os.path.isdir(LLM_DIR):
+        return []
+    return sorted(name for name in os.listdir(LLM_DIR) if os.path.isdir(os.path.join(LLM_DIR, name)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert LLM caches to the pickle-free segment format.")
+    parser.add_argument("--service", help="Only convert the cache of this service (e.g. openai).")
+    parser.add_argument("--keep-raw", action="store_true", help="Keep the full provider payload of each response.")
+    parser.add_argument("--compression", help="Compress values with zlib, gzip or zstd.")
+    parser.add_argument("--dictionary", action="store_true", help="Train a compression dictionary (zlib or zstd).")
+    args = parser.parse_args()
+    logger.info("Starting migrate-cache.py script")
+    services = [args.service] if args.service else list_services()
+    for service in services:
+        migrate_service(service, args.keep_raw, args.compression, args.dictionary)
+    logger.info("migrate-cache.py completed successfully.")
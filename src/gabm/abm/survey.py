@@ -7,12 +7,14 @@ __version__ = "0.1.0"
 __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
 # Standard library imports
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from typing import List, Dict, Any
 # Local imports
 from gabm.abm.agent import Person
 from gabm.core.id import GABMID
 from gabm.io.llm.llm_service import LLMService
+from gabm.io.llm.streaming import AnswerMatcher
 
 class AnswerID(GABMID):
     """
@@ -96,6 +98,16 @@ class Question():
         answer_texts = [answer.text for answer in self.answers]
         return f"{question_text}{', '.join(answer_texts)}. What do I choose?"
 
+    def get_answer_matcher(self) -> AnswerMatcher:
+        """
+        Get an early-stop hook for LLMService.send_stream() that stops as soon as a response names one of the answers.
+
+        Returns:
+            An AnswerMatcher for the answer texts.
+
+        """
+        return AnswerMatcher([answer.text for answer in self.answers])
+
     def add_answer(self, answer: Answer):
         """
         Add an answer to the question.
@@ -143,10 +155,12 @@ class SurveyConversation:
         llm_service (LLMService): The LLM service interface (to be implemented).
         api_key (str): The API key for the LLM service.
         model (str): The model to use for the LLM service.
+        max_concurrency (int): Maximum number of questions sent to the LLM at once.
+        early_stop (bool): Whether responses are streamed and stopped as soon as they name an answer.
         responses (List[str]): The list of responses from the LLM for each question.
     """
     def __init__(self, person: Person, survey: Survey, llm_service: LLMService,
-            api_key: str = None, model: str = None):
+            api_key: str = None, model: str = None, max_concurrency: int = 8, early_stop: bool = False):
         """
         Initialize
         Args:
@@ -154,25 +168,81 @@ class SurveyConversation:
             survey: The Survey instance.
             llm_service: The LLMService instance.
             api_key: The API key for the LLM service (optional, can be set via environment variable).
-            model: The model to use for the LLM service (optional, can be determined by
+            model: The model to use for the LLM service (optional, defaults to the service default model).
+            max_concurrency: Maximum number of questions sent to the LLM at once.
+            early_stop: If True, stream each response and stop generation as soon as it names one of
+                the question's answers (the responses are then response texts).
         """
         self.person = person
         self.survey = survey
         self.llm_service = llm_service
         self.api_key = api_key or llm_service.get_api_key()
         self.model = model or llm_service.get_default_model()
+        self.max_concurrency = max_concurrency
+        self.early_stop = early_stop
         self.responses = []
 
+    def get_prompts(self) -> List[str]:
+        """
+        Get the LLM prompt for each question: the person's self-description followed by the question prompt.
+
+        Returns:
+            A list of prompts, one per question.
+
+        """
+        description = self.person.get_self_description()
+        return [description + question.get_prompt() for question in self.survey.questions]
+
     def conduct(self):
         """
         Conducts the survey by asking each question to the LLM with the given profile context.
+        Questions are sent concurrently (at most max_concurrency at once).
         Stores responses in self.responses.
         """
-        person_profile = self.person.profile
-        for question in self.survey.questions:
-            context = person_profile + " " + question.text  # In a real implementation, this would include more context about the person and the question
-            response = self.llm_service.send(context, model=self.model, api_key=self.api_key)
-            self.responses.append(response)
+        if self.early_stop:
+            questions = self.survey.questions
+            def ask(args):
+                prompt, question = args
+                return self.llm_service.send_stream(
+                    self.api_key, prompt, model=self.model, stop=question.get_answer_matcher()
+                )
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(questions)))) as executor:
+                self.responses.extend(executor.map(ask, zip(self.get_prompts(), questions)))
+            return
+        self.responses.extend(self.llm_service.send_many(
+            self.api_key, self.get_prompts(), model=self.model, max_concurrency=self.max_concurrency
+        ))
+
+    @staticmethod
+    def conduct_many(conversations: List["SurveyConversation"], max_concurrency: int = 8):
+        """
+        Conducts several conversations at once, so that N persons x Q questions are sent together
+        rather than one conversation at a time. Conversations sharing an LLM service, API key and
+        model are sent as one batch (identical prompts are sent once). Conversations with early_stop
+        are conducted one at a time.
+
+        Args:
+            conversations: The conversations to conduct.
+            max_concurrency: Maximum number of requests in flight at once per batch.
+
+        """
+        batches = {}
+        for conversation in conversations:
+            if conversation.early_stop:
+                conversation.conduct()
+                continue
+            batch_key = (id(conversation.llm_service), conversation.api_key, conversation.model)
+            batches.setdefault(batch_key, []).append(conversation)
+        for batch in batches.values():
+            prompts = [conversation.get_prompts() for conversation in batch]
+            first = batch[0]
+            responses = first.llm_service.send_many(
+                first.api_key, [p for ps in prompts for p in ps], model=first.model, max_concurrency=max_concurrency
+            )
+            start = 0
+            for conversation, ps in zip(batch, prompts):
+                conversation.responses.extend(responses[start:start + len(ps)])
+                start += len(ps)
 
     def _build_context(self, question: Question) -> Dict[str, Any]:
         """
@@ -2,9 +2,23 @@
 __version__ = "0.2.14"
 
 from .apertus import *
+from .bundle import *
+from .cache import *
+from .compression import *
 from .deepseek import *
 from .genai import *
 from .llm_service import *
+from .load_generator import *
+from .log_writer import *
+from .mock_server import *
+from .near_duplicate import *
 from .openai import *
 from .publicai import *
+from .rate_limit import *
+from .replay import *
+from .response import *
+from .router import *
+from .single_flight import *
+from .streaming import *
+from .telemetry import *
 from .utils import *
\ No newline at end of file
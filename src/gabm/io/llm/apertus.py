@@ -1,6 +1,17 @@
 """
-This script demonstrates how to use the Apertus models from the Hugging Face Transformers library.
-It loads the model and tokenizer, prepares a prompt, generates a response, and prints the output.
+For running Apertus models (and other Hugging Face causal language models) locally with the Transformers library.
+
+Features:
+- ApertusService: an LLM service with the standard send API that keeps models resident in memory.
+- Models and tokenizers are loaded once per process (on first use, or up front) and reused by every call,
+  so the time per prompt is the generation time only.
+- Many prompts can be generated in batches: prompts are grouped by length, left-padded, and each
+  batch is generated with one call to generate(), which gives far higher throughput on CPU.
+- Prompts that share a long prefix (e.g. one persona description followed by each survey question)
+  reuse the past key/values computed once for that prefix, so the prefix is not re-encoded per prompt,
+  and the rest of each prompt is still generated in batches.
+- Responses can be streamed, and generation stopped early (see LLMService.send_stream()).
+- Responses are cached and logged like the API-based services.
 """
 # Metadata
 __author__ = ["Andy Turner <agdturner@gmail.com>"]
@@ -9,11 +20,26 @@ __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
 
 # Standard library imports
+import asyncio
+from collections import OrderedDict
+import contextlib
+import copy
+import os
 from pathlib import Path
+import threading
 import time
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, Iterator, List, Tuple
+# LLM service base class
+from .llm_service import LLMService
 # Shared utilities for caching and logging
-from .utils import load_llm_cache, cache_and_log, get_llm_cache_paths
+from .cache import PromptTable
+from .response import LLMResponse
+from .telemetry import CallTimer
+from .utils import load_llm_cache, cache_and_log, get_llm_cache_paths, get_prompt_table_path, make_cache_key, lookup_cache
+
+# Resident (tokenizer, model) pairs, keyed on (model name, device)
+_local_models: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+_local_models_lock = threading.Lock()
 
 def download_apertus_model(model_name: str) -> None:
     """
@@ -39,6 +65,519 @@ def download_apertus_model(model_name: str) -> None:
     model = AutoModelForCausalLM.from_pretrained(model_name)
     print("Download complete. Model and tokenizer are now cached locally.")
 
+def _from_pretrained(model_name: str, device: str) -> Tuple[Any, Any]:
+    """
+    Load a tokenizer and model with Hugging Face Transformers and move the model to device.
+    """
+    # Hugging Face Transformers for local model loading and inference
+    # Note: This will download the model and tokenizer to the Hugging Face cache directory (~/.cache/huggingface/transformers)
+    # if they have not been downloaded already (see download_apertus_model()).
+    # The import is done in this way here to avoid requiring the transformers package for users who only want to use the API-based services and not local inference.
+    try:
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+    except ImportError:
+        raise ImportError("The 'transformers' package is required for this function. Please install it with 'pip install transformers'.")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForCausalLM.from_pretrained(model_name).to(device)
+    return tokenizer, model
+
+def load_local_model(model_name: str, device: str = "cpu", logger: Optional[Any] = None) -> Tuple[Any, Any]:
+    """
+    Return the tokenizer and model for model_name on device, loading them on first use.
+    Loaded models stay resident for the rest of the process (see unload_local_model()).
+
+    Args:
+        model_name (str): The Hugging Face model name (e.g., 'swiss-ai/Apertus-8B-2509').
+        device (str): The device to run inference on ('cpu' or 'cuda').
+        logger: Optional logger for logging messages.
+
+    Returns:
+        tuple: (tokenizer, model)
+
+    """
+    key = (model_name, device)
+    with _local_models_lock:
+        if key not in _local_models:
+            if logger:
+                logger.info(f"Loading tokenizer and model for {model_name} on {device}...")
+            t0 = time.time()
+            _local_models[key] = _from_pretrained(model_name, device)
+            if logger:
+                logger.info(f"Model loaded in {time.time()-t0:.2f} seconds.")
+        return _local_models[key]
+
+def unload_local_model(model_name: Optional[str] = None, device: Optional[str] = None) -> int:
+    """
+    Release resident models so their memory can be reclaimed.
+
+    Args:
+        model_name (str, optional): Only unload this model (default: all models).
+        device (str, optional): Only unload models on this device (default: all devices).
+
+    Returns:
+        int: The number of models unloaded.
+
+    """
+    with _local_models_lock:
+        keys = [key for key in _local_models
+                if (model_name is None or key[0] == model_name) and (device is None or key[1] == device)]
+        for key in keys:
+            del _local_models[key]
+    return len(keys)
+
+def _prompt_text(tokenizer: Any, prompt: str) -> str:
+    """Apply the tokenizer's chat template to prompt, if it has one."""
+    if getattr(tokenizer, "chat_template", None):
+        return tokenizer.apply_chat_template(
+            [{"role": "user", "content": prompt}],
+            tokenize=False,
+            add_generation_prompt=True,
+        )
+    return prompt
+
+def _common_prefix_length(a: List[int], b: List[int]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+def common_prefix_groups(token_ids: List[List[int]], min_prefix_tokens: int = 64) -> List[Tuple[int, List[int]]]:
+    """
+    Find groups of prompts that share a prefix of at least min_prefix_tokens tokens.
+
+    Args:
+        token_ids (list of list of int): The token ids of each prompt.
+        min_prefix_tokens (int): Minimum shared prefix length worth reusing.
+
+    Returns:
+        list of (int, list of int): For each group of two or more prompts, the length of the
+        prefix they share and their indexes into token_ids. The prefix is always shorter than
+        every prompt in the group, so each has at least one token to encode.
+
+    """
+    groups: List[Tuple[int, List[int]]] = []
+    # Sorting token id lists puts prompts with a common prefix next to each other
+    order = sorted(range(len(token_ids)), key=lambda i: token_ids[i])
+    group: List[int] = []
+    length = 0
+    for i in order:
+        if group:
+            shared = min(length, _common_prefix_length(token_ids[group[-1]], token_ids[i]), len(token_ids[i]) - 1)
+            if shared >= min_prefix_tokens:
+                group.append(i)
+                length = shared
+                continue
+            if len(group) > 1:
+                groups.append((length, group))
+        group = [i]
+        length = len(token_ids[i]) - 1
+    if len(group) > 1:
+        groups.append((length, group))
+    return groups
+
+
+class PrefixCache:
+    """
+    A bounded LRU cache of past key/values for token id prefixes of one model.
+
+    The token ids of recent single prompts are also remembered (see shared_prefix()), so that a
+    prefix shared by prompts sent one at a time can be found and cached.
+
+    Attributes:
+        max_entries (int): Maximum number of prefixes kept.
+        max_recent (int): Maximum number of recent prompts remembered.
+        hits (int): Number of generations that reused a prefix.
+        misses (int): Number of generations that found no cached prefix.
+    """
+
+    def __init__(self, max_entries: int = 8, max_recent: int = 64):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries (int): Maximum number of prefixes kept.
+            max_recent (int): Maximum number of recent prompts remembered.
+        """
+        self.max_entries = max_entries
+        self.max_recent = max_recent
+        self._entries: "OrderedDict[Tuple[int, ...], Any]" = OrderedDict()
+        self._recent: "OrderedDict[Tuple[int, ...], None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, ids: List[int], uses: int = 1) -> Tuple[int, Any]:
+        """
+        Return the longest cached prefix that is a proper prefix of ids.
+
+        Args:
+            ids (list of int): The token ids of a prompt.
+            uses (int): Number of generations that will reuse the prefix, counted in hits or misses.
+
+        Returns:
+            tuple: (prefix length, past key/values), or (0, None) if there is none.
+
+        """
+        ids = tuple(ids)
+        with self._lock:
+            best = None
+            for prefix in self._entries:
+                if len(prefix) < len(ids) and ids[:len(prefix)] == prefix and (best is None or len(prefix) > len(best)):
+                    best = prefix
+            if best is None:
+                self.misses += uses
+                return 0, None
+            self.hits += uses
+            self._entries.move_to_end(best)
+            return len(best), self._entries[best]
+
+    def shared_prefix(self, ids: List[int], min_prefix_tokens: int) -> int:
+        """
+        Return the length of the longest prefix of ids shared with a recent prompt, then remember ids.
+
+        Args:
+            ids (list of int): The token ids of a prompt.
+            min_prefix_tokens (int): Minimum shared prefix length worth reusing.
+
+        Returns:
+            int: The shared prefix length (always shorter than ids), or 0 if it is below min_prefix_tokens.
+        """
+        ids = tuple(ids)
+        with self._lock:
+            shared = max((_common_prefix_length(ids, recent) for recent in self._recent if recent != ids), default=0)
+            self._recent[ids] = None
+            self._recent.move_to_end(ids)
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+        shared = min(shared, len(ids) - 1)
+        return shared if shared >= min_prefix_tokens else 0
+
+    def add(self, tokenizer: Any, model: Any, prefix_ids: List[int]) -> None:
+        """
+        Encode prefix_ids with model and cache the past key/values, unless they are cached already.
+
+        Args:
+            tokenizer: The tokenizer (used to build the model inputs).
+            model: The model.
+            prefix_ids (list of int): The prefix token ids.
+        """
+        prefix = tuple(prefix_ids)
+        with self._lock:
+            if prefix in self._entries:
+                self._entries.move_to_end(prefix)
+                return
+        inputs = tokenizer.pad({"input_ids": [list(prefix)]}, return_tensors="pt").to(model.device)
+        with _no_grad():
+            past_key_values = model(**inputs, use_cache=True).past_key_values
+        with self._lock:
+            self._entries[prefix] = past_key_values
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached prefix."""
+        with self._lock:
+            self._entries.clear()
+
+
+def _no_grad() -> Any:
+    """Return torch.no_grad() if torch is installed, else a context manager that does nothing."""
+    try:
+        import torch
+    except ImportError:
+        return contextlib.nullcontext()
+    return torch.no_grad()
+
+def generate_local_response(
+    tokenizer: Any,
+    model: Any,
+    prompt: str,
+    max_new_tokens: int = 32768,
+    logger: Optional[Any] = None,
+    prefix_cache: Optional[PrefixCache] = None,
+    min_prefix_tokens: Optional[int] = None
+) -> str:
+    """
+    Generate a response to prompt with a loaded tokenizer and model.
+
+    Args:
+        tokenizer: The tokenizer.
+        model: The model.
+        prompt (str): The input prompt to send to the model.
+        max_new_tokens (int): The maximum number of new tokens to generate.
+        logger: Optional logger for logging messages.
+        prefix_cache (PrefixCache, optional): If given and it holds a prefix of the prompt, the
+            past key/values of that prefix are reused and only the rest of the prompt is encoded.
+        min_prefix_tokens (int, optional): If given with prefix_cache, a prefix of at least this many
+            tokens shared with a recent prompt is encoded and added to prefix_cache before generating,
+            so prompts sent one at a time with a common prefix (e.g. a persona) reuse it.
+
+    Returns:
+        str: The generated response.
+
+    """
+    # Use chat template if available, else use prompt as-is
+    text = _prompt_text(tokenizer, prompt)
+    model_inputs = tokenizer([text], return_tensors="pt").to(model.device)
+    past_key_values = None
+    if prefix_cache is not None:
+        ids = model_inputs["input_ids"][0]
+        ids = ids.tolist() if hasattr(ids, "tolist") else list(ids)
+        if min_prefix_tokens is not None:
+            # Only encode a shared prefix that reuses at least min_prefix_tokens more than the cached one
+            cached_length, _ = prefix_cache.get(ids, uses=0)
+            shared = prefix_cache.shared_prefix(ids, min_prefix_tokens)
+            if shared >= cached_length + min_prefix_tokens:
+                prefix_cache.add(tokenizer, model, ids[:shared])
+        prefix_length, past_key_values = prefix_cache.get(ids)
+        if past_key_values is not None and logger:
+            logger.info(f"Reusing {prefix_length} cached prefix tokens.")
+    if logger:
+        logger.info(f"Starting generation (max_new_tokens={max_new_tokens})...")
+    t0 = time.time()
+    if past_key_values is not None:
+        # generate() extends the cache it is given, so each continuation works on a copy
+        generated_ids = model.generate(
+            **model_inputs, past_key_values=copy.deepcopy(past_key_values), max_new_tokens=max_new_tokens
+        )
+    else:
+        generated_ids = model.generate(**model_inputs, max_new_tokens=max_new_tokens)
+    if logger:
+        logger.info(f"Generation complete in {time.time()-t0:.2f} seconds. Decoding output...")
+    output_ids = generated_ids[0][len(model_inputs["input_ids"][0]):]
+    return tokenizer.decode(output_ids, skip_special_tokens=True)
+
+def stream_local_response(
+    tokenizer: Any,
+    model: Any,
+    prompt: str,
+    max_new_tokens: int = 32768,
+    logger: Optional[Any] = None
+) -> Iterator[str]:
+    """
+    Generate a response to prompt, yielding the text as it is decoded. Generation runs in a
+    background thread and stops at the next token if the generator is closed.
+
+    Args:
+        tokenizer: The tokenizer.
+        model: The model.
+        prompt (str): The input prompt to send to the model.
+        max_new_tokens (int): The maximum number of new tokens to generate.
+        logger: Optional logger for logging messages.
+
+    Yields:
+        str: Chunks of the response text.
+
+    """
+    try:
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+    except ImportError:
+        raise ImportError("The 'transformers' package is required for this function. Please install it with 'pip install transformers'.")
+    cancelled = threading.Event()
+
+    class Cancelled(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return cancelled.is_set()
+
+    model_inputs = tokenizer([_prompt_text(tokenizer, prompt)], return_tensors="pt").to(model.device)
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    errors = []
+
+    def generate():
+        try:
+            model.generate(
+                **model_inputs,
+                max_new_tokens=max_new_tokens,
+                streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([Cancelled()]),
+            )
+        except Exception as e:
+            # End the stream so the consumer does not wait for tokens that will never come
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=generate, daemon=True)
+    thread.start()
+    try:
+        for chunk in streamer:
+            if chunk:
+                yield chunk
+        if errors:
+            raise errors[0]
+    finally:
+        cancelled.set()
+        thread.join()
+        if logger:
+            logger.info("Streamed generation finished.")
+
+def plan_generation_batches(
+    lengths: List[int],
+    batch_size: int = 8,
+    max_batch_tokens: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Group prompts into generation batches of similar length, so little compute is spent on padding.
+
+    Args:
+        lengths (list of int): The token length of each prompt.
+        batch_size (int): Maximum number of prompts per batch.
+        max_batch_tokens (int, optional): Maximum padded prompt tokens per batch
+            (number of prompts times the longest prompt). A prompt longer than this gets a batch of its own.
+
+    Returns:
+        list of list of int: Indexes into lengths, one list per batch, shortest prompts first.
+
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        # Sorted by length, so lengths[i] is the longest prompt in the batch if i is added
+        full = len(batch) >= batch_size or (
+            max_batch_tokens is not None and batch and (len(batch) + 1) * lengths[i] > max_batch_tokens
+        )
+        if full:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _expand_past_key_values(past_key_values: Any, n: int) -> Any:
+    """
+    Return a copy of the past key/values of one sequence, repeated for a batch of n sequences.
+    generate() extends the cache it is given, so the cached prefix itself is never passed.
+    """
+    past_key_values = copy.deepcopy(past_key_values)
+    if n == 1:
+        return past_key_values
+    if hasattr(past_key_values, "batch_repeat_interleave"):
+        # A transformers Cache object
+        past_key_values.batch_repeat_interleave(n)
+        return past_key_values
+    if isinstance(past_key_values, tuple):
+        # The legacy format: a (key, value) pair of tensors per layer
+        return tuple(tuple(t.repeat_interleave(n, dim=0) for t in layer) for layer in past_key_values)
+    return past_key_values
+
+def generate_prefixed_responses(
+    tokenizer: Any,
+    model: Any,
+    prompts: List[str],
+    prefix_length: int,
+    past_key_values: Any,
+    max_new_tokens: int = 32768,
+    batch_size: int = 8,
+    max_batch_tokens: Optional[int] = None,
+    logger: Optional[Any] = None
+) -> List[str]:
+    """
+    Generate responses to prompts that share their first prefix_length tokens, in batches, reusing
+    the past key/values of the shared prefix for every prompt.
+
+    The rest of each prompt is padded on the left, between the prefix and the rest, and the padding
+    is masked out, so every row of a batch continues from the same prefix cache.
+
+    Args:
+        tokenizer: The tokenizer.
+        model: The model.
+        prompts (list of str): The prompts. Each must be longer than the shared prefix.
+        prefix_length (int): The number of tokens the prompts share.
+        past_key_values: The past key/values of the shared prefix (see PrefixCache).
+        max_new_tokens (int): The maximum number of new tokens to generate per prompt.
+        batch_size (int): Maximum number of prompts per batch.
+        max_batch_tokens (int, optional): Maximum padded tokens per batch after the prefix (see plan_generation_batches()).
+        logger: Optional logger for logging messages.
+
+    Returns:
+        list of str: The response to each prompt, in the order of prompts.
+
+    """
+    token_ids = [list(ids) for ids in tokenizer([_prompt_text(tokenizer, prompt) for prompt in prompts])["input_ids"]]
+    lengths = [len(ids) - prefix_length for ids in token_ids]
+    pad_token_id = getattr(tokenizer, "pad_token_id", None)
+    if pad_token_id is None:
+        pad_token_id = tokenizer.eos_token_id
+    responses: List[str] = [""] * len(prompts)
+    for batch in plan_generation_batches(lengths, batch_size, max_batch_tokens):
+        width = max(lengths[i] for i in batch)
+        input_ids = []
+        attention_mask = []
+        for i in batch:
+            padding = width - lengths[i]
+            input_ids.append(token_ids[i][:prefix_length] + [pad_token_id] * padding + token_ids[i][prefix_length:])
+            attention_mask.append([1] * prefix_length + [0] * padding + [1] * lengths[i])
+        model_inputs = tokenizer.pad(
+            {"input_ids": input_ids, "attention_mask": attention_mask}, return_tensors="pt"
+        ).to(model.device)
+        t0 = time.time()
+        generated_ids = model.generate(
+            **model_inputs, past_key_values=_expand_past_key_values(past_key_values, len(batch)),
+            max_new_tokens=max_new_tokens, pad_token_id=pad_token_id
+        )
+        if logger:
+            logger.info(
+                f"Generated a batch of {len(batch)} prompts reusing {prefix_length} prefix tokens in {time.time()-t0:.2f} seconds."
+            )
+        for row, i in enumerate(batch):
+            responses[i] = tokenizer.decode(generated_ids[row][prefix_length + width:], skip_special_tokens=True)
+    return responses
+
+def generate_local_responses(
+    tokenizer: Any,
+    model: Any,
+    prompts: List[str],
+    max_new_tokens: int = 32768,
+    batch_size: int = 8,
+    max_batch_tokens: Optional[int] = None,
+    logger: Optional[Any] = None
+) -> List[str]:
+    """
+    Generate responses to many prompts, running one generate() call per batch of similar-length prompts.
+
+    Args:
+        tokenizer: The tokenizer.
+        model: The model.
+        prompts (list of str): The prompts.
+        max_new_tokens (int): The maximum number of new tokens to generate per prompt.
+        batch_size (int): Maximum number of prompts per batch.
+        max_batch_tokens (int, optional): Maximum padded prompt tokens per batch (see plan_generation_batches()).
+        logger: Optional logger for logging messages.
+
+    Returns:
+        list of str: The response to each prompt, in the order of prompts.
+
+    """
+    texts = [_prompt_text(tokenizer, prompt) for prompt in prompts]
+    lengths = [len(ids) for ids in tokenizer(texts)["input_ids"]]
+    batches = plan_generation_batches(lengths, batch_size, max_batch_tokens)
+    responses: List[str] = [""] * len(prompts)
+    # Decoder-only models continue from the end of the input, so pad on the left
+    padding_side = getattr(tokenizer, "padding_side", "right")
+    if getattr(tokenizer, "pad_token", None) is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    try:
+        for batch in batches:
+            model_inputs = tokenizer([texts[i] for i in batch], return_tensors="pt", padding=True).to(model.device)
+            t0 = time.time()
+            generated_ids = model.generate(
+                **model_inputs, max_new_tokens=max_new_tokens, pad_token_id=tokenizer.pad_token_id
+            )
+            if logger:
+                logger.info(f"Generated a batch of {len(batch)} prompts in {time.time()-t0:.2f} seconds.")
+            input_length = len(model_inputs["input_ids"][0])
+            for row, i in enumerate(batch):
+                responses[i] = tokenizer.decode(generated_ids[row][input_length:], skip_special_tokens=True)
+    finally:
+        tokenizer.padding_side = padding_side
+    return responses
+
 def local_apertus_infer(
     model_name: str,
     prompt: str,
@@ -46,91 +585,281 @@ def local_apertus_infer(
     cache: Optional[Dict[Any, Any]] = None,
     cache_path: Optional[str] = None,
     max_new_tokens: int = 32768,
-    logger: Optional[Any] = None
+    logger: Optional[Any] = None,
+    prompt_table: Optional[PromptTable] = None
 ) -> str:
     """
     Run local inference with an Apertus model, using shared cache and logging utilities.
+    The model is loaded on the first call and kept resident (see load_local_model()).
+    For repeated use, prefer ApertusService.
     
     Args:
         model_name (str): The Hugging Face model name to use (e.g., 'swiss-ai/apertus-70b-instruct').
         prompt (str): The input prompt to send to the model.
         device (str): The device to run inference on ('cpu' or 'cuda').
-        cache (dict, optional): An optional cache dictionary to use for caching responses.
+        cache (dict, optional): An optional cache dictionary to use for caching responses. If not
+            provided, the cache at cache_path is opened for the call and closed afterwards.
         cache_path (str, optional): An optional path to the cache file. If not provided, uses default paths.
         max_new_tokens (int): The maximum number of new tokens to generate.
         logger: Optional logger for logging messages.
+        prompt_table (PromptTable, optional): The prompt side table. If not provided, the table beside
+            cache_path is opened; pass one in to avoid indexing it again on every call.
 
     Returns:
         str: The generated response from the model.
 
     """
-    messages_think = [{"role": "user", "content": prompt}]
-    cache_key = (model_name, prompt)
+    cache_key = make_cache_key(prompt, model_name)
     # Use standard cache/log paths if not provided
     if cache_path is None:
         cache_path, jsonl_path = get_llm_cache_paths("apertus")
     else:
         cache_path = Path(cache_path)
         jsonl_path = cache_path.parent / "prompt_response_cache.jsonl"
-    # Load cache if not provided
-    if cache is None:
-        cache = load_llm_cache(cache_path, logger)
-    # Check cache
-    if cache_key in cache:
-        if logger:
-            logger.info(f"Cache hit for model={model_name}, prompt={prompt}")
-        return cache[cache_key]
-    if logger:
-        logger.info(f"Loading tokenizer and model for {model_name} on {device}...")
-    t0 = time.time()
-    # Hugging Face Transformers for local model loading and inference
-    # Note: This will download the model and tokenizer to the Hugging Face cache directory (~/.cache/huggingface/transformers)
-    # The model will be cached locally after the first download, so subsequent runs will be faster.
-    # You can specify a different cache directory by setting the TRANSFORMERS_CACHE environment variable.
-    # For more details on Hugging Face caching, see: https://huggingface.co/docs/transformers/cache
-    # This function is intended to be run once to download the model, and then you can use local_apertus_infer() for inference without needing to download again.
-    # If you want to clear the Hugging Face cache, you can delete the contents of the cache directory or set a different cache directory.
-    # The import is done in this way here to avoid requiring the transformers package for users who only want to use the API-based services and not local inference.
-    try:
-        from transformers import AutoModelForCausalLM, AutoTokenizer
-    except ImportError:
-        raise ImportError("The 'transformers' package is required for this function. Please install it with 'pip install transformers'.")
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForCausalLM.from_pretrained(model_name).to(device)
-    t1 = time.time()
-    if logger:
-        logger.info(f"Model loaded in {t1-t0:.2f} seconds. Preparing input...")
-    # Use chat template if available, else use prompt as-is
-    if getattr(tokenizer, "chat_template", None):
-        text = tokenizer.apply_chat_template(
-            messages_think,
-            tokenize=False,
-            add_generation_prompt=True,
+    # Open (and afterwards close) the cache if not provided
+    with contextlib.nullcontext(cache) if cache is not None else load_llm_cache(cache_path, logger) as cache:
+        # Check cache (earlier releases keyed this cache on (model_name, prompt))
+        cached = lookup_cache(cache, cache_key, legacy_key=(model_name, prompt))
+        if cached is not None:
+            if logger:
+                logger.info(f"Cache hit for model={model_name}, prompt={prompt}")
+            return cached
+        tokenizer, model = load_local_model(model_name, device, logger)
+        response = generate_local_response(tokenizer, model, prompt, max_new_tokens, logger)
+        if prompt_table is None:
+            prompt_table = PromptTable(get_prompt_table_path(cache_path), logger)
+        # Cache and log response using shared utility
+        cache_and_log(
+            cache,
+            cache_key,
+            response,
+            cache_path,
+            jsonl_path,
+            prompt=prompt,
+            model=model_name,
+            logger=logger,
+            extract_text_from_response=None,
+            prompt_table=prompt_table
         )
-    else:
-        text = prompt
-    model_inputs = tokenizer([text], return_tensors="pt").to(model.device)
-    if logger:
-        logger.info(f"Starting generation (max_new_tokens={max_new_tokens})...")
-    t2 = time.time()
-    generated_ids = model.generate(**model_inputs, max_new_tokens=max_new_tokens)
-    t3 = time.time()
-    if logger:
-        logger.info(f"Generation complete in {t3-t2:.2f} seconds. Decoding output...")
-    output_ids = generated_ids[0][len(model_inputs["input_ids"][0]):]
-    response = tokenizer.decode(output_ids, skip_special_tokens=True)
-    # Cache and log response using shared utility
-    cache_and_log(
-        cache,
-        cache_key,
-        response,
-        cache_path,
-        jsonl_path,
-        prompt=prompt,
-        model=model_name,
-        logger=logger,
-        extract_text_from_response=None
-    )
     if logger:
         logger.info(f"Local inference complete for model={model_name}.")
-    return response
\ No newline at end of file
+    return response
+
+
+class ApertusService(LLMService):
+    """
+    Service class for local Apertus (Hugging Face) models.
+    Keeps loaded models resident, so each cache miss costs only generation time.
+    No API key is needed; the api_key argument of send() is ignored.
+    """
+    SERVICE_NAME = "apertus"
+    DEFAULT_MODEL = "swiss-ai/Apertus-8B-2509"
+
+    def __init__(self, *args, device=None, max_new_tokens=32768, lazy=True, batch_size=8, max_batch_tokens=None,
+                 prefix_cache_size=8, min_prefix_tokens=64, **kwargs):
+        """
+        Initialize the service.
+
+        Args:
+            device (str, optional): The device to run inference on. Defaults to 'cuda' if
+                CUDA_VISIBLE_DEVICES is set, else 'cpu'.
+            max_new_tokens (int): The maximum number of new tokens to generate.
+            lazy (bool): If True, load DEFAULT_MODEL on the first cache miss; if False, load it now.
+            batch_size (int): Maximum number of prompts generated together by send_many().
+            max_batch_tokens (int, optional): Maximum padded prompt tokens per batch in send_many().
+            prefix_cache_size (int): Number of shared prompt prefixes whose past key/values are kept
+                per model (0 to disable prefix reuse).
+            min_prefix_tokens (int): Minimum shared prefix length, in tokens, worth reusing.
+            *args, **kwargs: Passed to LLMService.
+        """
+        super().__init__(*args, **kwargs)
+        self.device = device or ("cuda" if os.environ.get("CUDA_VISIBLE_DEVICES") else "cpu")
+        self.max_new_tokens = max_new_tokens
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.prefix_cache_size = prefix_cache_size
+        self.min_prefix_tokens = min_prefix_tokens
+        self._prefix_caches = {}
+        # One generation at a time per service; concurrent callers queue rather than contend for the device
+        self._generate_lock = threading.Lock()
+        if not lazy:
+            self.load_model()
+
+    def load_model(self, model=DEFAULT_MODEL):
+        """
+        Load model (if it is not already resident) and return (tokenizer, model).
+        """
+        return load_local_model(model, self.device, self.logger)
+
+    def get_prefix_cache(self, model=DEFAULT_MODEL):
+        """
+        Return the PrefixCache for model, or None if prefix reuse is disabled.
+        """
+        if not self.prefix_cache_size:
+            return None
+        with self._generate_lock:
+            return self._prefix_caches.setdefault(model, PrefixCache(self.prefix_cache_size))
+
+    def unload_model(self, model=None):
+        """
+        Release model (default: every model) on this service's device, and its cached prefixes.
+        Returns the number of models unloaded.
+        """
+        with self._generate_lock:
+            if model is None:
+                self._prefix_caches.clear()
+            else:
+                self._prefix_caches.pop(model, None)
+        return unload_local_model(model, self.device)
+
+    def _generate_many(self, tokenizer, loaded_model, prompts, prefix_cache):
+        """
+        Generate responses to prompts in length-grouped batches. Prompts sharing a long prefix are
+        batched together, reusing the past key/values of the prefix.
+        """
+        responses = [None] * len(prompts)
+        grouped = set()
+        if prefix_cache is not None:
+            token_ids = [list(ids) for ids in tokenizer([_prompt_text(tokenizer, p) for p in prompts])["input_ids"]]
+            for length, group in common_prefix_groups(token_ids, self.min_prefix_tokens):
+                prefix_cache.add(tokenizer, loaded_model, token_ids[group[0]][:length])
+                # The longest cached proper prefix of the first length + 1 tokens is the one just added
+                _, past_key_values = prefix_cache.get(token_ids[group[0]][:length + 1], uses=len(group))
+                group_responses = generate_prefixed_responses(
+                    tokenizer, loaded_model, [prompts[i] for i in group], length, past_key_values,
+                    self.max_new_tokens, self.batch_size, self.max_batch_tokens, self.logger
+                )
+                for i, response in zip(group, group_responses):
+                    responses[i] = response
+                grouped.update(group)
+        batched = [i for i in range(len(prompts)) if i not in grouped]
+        if batched:
+            batch_responses = generate_local_responses(
+                tokenizer, loaded_model, [prompts[i] for i in batched],
+                self.max_new_tokens, self.batch_size, self.max_batch_tokens, self.logger
+            )
+            for i, response in zip(batched, batch_responses):
+                responses[i] = response
+        return responses
+
+    def _check_api_key(self, api_key):
+        """
+        Local models need no API key.
+        """
+
+    def _pre_send_check_and_cache(self, api_key, message, model):
+        """
+        Return the cached response for (message, model), or None on a miss. Local models need no API key.
+        """
+        cached = lookup_cache(self.cache, make_cache_key(message, model), legacy_key=(model, message))
+        if cached is not None:
+            self.logger.info(f"Cache hit for model={model}, message={message}")
+            self.telemetry.record_cache_hit(self.SERVICE_NAME, model)
+        return cached
+
+    def send(self, api_key, message, model=DEFAULT_MODEL):
+        """
+        Generate a response to a prompt with a local model and return the response text.
+        Caches and logs the response for reproducibility.
+        A prefix of at least min_prefix_tokens tokens shared with a recently sent prompt (e.g. a
+        persona) is cached and reused, so later prompts only encode the rest.
+
+        Args:
+            api_key: Ignored (local models need no API key); may be None.
+            message (str): Prompt to send.
+            model (str): Hugging Face model name (default: "swiss-ai/Apertus-8B-2509").
+
+        Returns:
+            str: The response text, or None or an error dict on error.
+
+        """
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        cache_key = make_cache_key(message, model)
+        def api_call():
+            tokenizer, loaded_model = self.load_model(model)
+            prefix_cache = self.get_prefix_cache(model)
+            with self._generate_lock:
+                return generate_local_response(
+                    tokenizer, loaded_model, message, self.max_new_tokens, self.logger, prefix_cache,
+                    self.min_prefix_tokens
+                )
+        return self._call_and_cache_response(api_call, cache_key, message, model, api_key)
+
+    def _stream(self, api_key, message, model):
+        """
+        Stream the response text chunks from the local model (see stream_local_response()).
+        """
+        tokenizer, loaded_model = self.load_model(model)
+        with self._generate_lock:
+            yield from stream_local_response(tokenizer, loaded_model, message, self.max_new_tokens, self.logger)
+
+    def send_many(self, api_key, messages, model=DEFAULT_MODEL, max_concurrency=None):
+        """
+        Generate responses to many prompts and return them in input order.
+
+        Cache hits and duplicates are handled as in LLMService.send_many(); the remaining prompts
+        are generated in batches of up to batch_size similar-length prompts (see generate_local_responses()).
+        Prompts sharing a prefix of at least min_prefix_tokens tokens are batched together and the
+        shared prefix is encoded once (see PrefixCache and generate_prefixed_responses()).
+
+        Args:
+            api_key: Ignored (local models need no API key); may be None.
+            messages (list of str): Prompts to send.
+            model (str): Hugging Face model name (default: "swiss-ai/Apertus-8B-2509").
+            max_concurrency: Ignored; batch_size controls how many prompts are generated together.
+
+        Returns:
+            list: The response text for each message (an error dict if its batch failed).
+
+        """
+        results, pending, unique = self._plan_many(api_key, messages, model)
+        if not pending:
+            return results
+        keys = list(pending)
+        # One timer for the batch: each prompt is recorded as a call with the batch's latency
+        timer = CallTimer()
+        try:
+            tokenizer, loaded_model = self.load_model(model)
+            prefix_cache = self.get_prefix_cache(model)
+            with self._generate_lock:
+                responses = timer.wrap(lambda: self._generate_many(
+                    tokenizer, loaded_model, [unique[cache_key] for cache_key in keys], prefix_cache
+                ))()
+        except Exception as e:
+            responses = [self._error_result(e)] * len(keys)
+        for cache_key, response in zip(keys, responses):
+            self.telemetry.record_call(self.SERVICE_NAME, model, timer, response, unique[cache_key])
+            if isinstance(response, str):
+                if self.compact_responses:
+                    response = LLMResponse(response, model=model)
+                cache_and_log(
+                    self.cache, cache_key, response, self.cache_path, self.jsonl_path,
+                    prompt=unique[cache_key], model=model, logger=self.logger,
+                    extract_text_from_response=self.simple_extract_text,
+                    prompt_table=self.prompt_table, log_writer=self.log_writer
+                )
+            for i in pending[cache_key]:
+                results[i] = response
+        return results
+
+    async def asend_many(self, api_key, messages, model=DEFAULT_MODEL, max_concurrency=None):
+        """
+        Async counterpart of send_many(): generates the batches in a worker thread.
+        """
+        return await asyncio.to_thread(self.send_many, api_key, messages, model, max_concurrency)
+
+    def list_available_models(self, api_key=None):
+        """
+        List the models resident on this service's device.
+
+        Args:
+            api_key: Ignored.
+
+        Returns:
+            list: Model names.
+
+        """
+        with _local_models_lock:
+            return [name for name, device in _local_models if device == self.device]
@@ -0,0 +1,491 @@
+"""
+Cache bundles: read-only, memory-mapped files of precomputed responses for distributing and warm-starting caches.
+
+- A bundle holds cached responses in the pickle-free format (tagged JSON, see response.encode_value),
+  each with its model and the time it was cached, optionally compressed with a trained dictionary.
+- Bundles are memory-mapped and searched through a sorted hash index, so opening one reads only its
+  header and a lookup touches only the pages it needs. Many processes on a node share the pages.
+- export_bundle() merges the caches of services and other bundles into a bundle, keeping the newest
+  response for each key and optionally only responses from some models or cached in a time window.
+- import_bundle() copies a bundle into a service's local cache.
+- LayeredCacheStore serves hits from read-only bundles behind a local cache, so a job can mount a
+  shared precomputed cache with no per-node copy (see LLMService cache_bundles).
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+from datetime import datetime, timezone
+import hashlib
+import logging
+import mmap
+import os
+from pathlib import Path
+import struct
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+# Local imports
+from .cache import CacheStore
+from .compression import get_codec, train_dictionary
+from .log_writer import iter_log_entries
+from .response import decode_value, encode_value, to_record
+from .utils import get_llm_cache_paths, load_llm_cache
+
+# File layout:
+#   header: MAGIC, codec id (1 byte, see compression.CODECS), dictionary length (4 bytes),
+#           entry count (8 bytes), index offset (8 bytes), dictionary
+#   entries: key, metadata, value (compressed), one after another
+#   index: one slot per entry, sorted by key hash:
+#          key hash (16 bytes), entry offset (8 bytes), key, metadata and value lengths (4 bytes each)
+# Keys and metadata are tagged JSON; values are tagged JSON compressed with the bundle's codec.
+BUNDLE_MAGIC = b"GABMBND1"
+_BUNDLE_HEADER = struct.Struct("<BIQQ")
+_INDEX_SLOT = struct.Struct("<16sQIII")
+_HASH_SIZE = 16
+# Maximum number of values sampled to train a compression dictionary
+_DICTIONARY_SAMPLES = 10000
+
+
+def _key_hash(key_bytes: bytes) -> bytes:
+    return hashlib.blake2b(key_bytes, digest_size=_HASH_SIZE).digest()
+
+
+def _as_timestamp(value: Union[datetime, str, None]) -> Optional[str]:
+    """
+    Return a time as an ISO timestamp comparable with JSONL log timestamps (UTC, ending in "Z").
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat() + "Z"
+
+
+class CacheBundle(CacheStore):
+    """
+    Read-only cache store backed by a memory-mapped bundle file.
+
+    Attributes:
+        path (Path): The bundle file.
+        serialiser (str): Always "json".
+    """
+    serialiser = "json"
+
+    def __init__(self, path: Union[Path, str], logger: Optional[Any] = None):
+        """
+        Open a bundle.
+
+        Args:
+            path (Path or str): The bundle file.
+            logger: Logger for info messages (optional).
+
+        Raises:
+            ValueError: If the file is not a GABM cache bundle.
+        """
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        with self.path.open("rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_end = len(BUNDLE_MAGIC) + _BUNDLE_HEADER.size
+        if self._map[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC or len(self._map) < header_end:
+            self._map.close()
+            raise ValueError(f"'{self.path}' is not a GABM cache bundle.")
+        codec_id, dictionary_len, self._count, self._index_offset = _BUNDLE_HEADER.unpack_from(self._map, len(BUNDLE_MAGIC))
+        self._codec = get_codec(codec_id, bytes(self._map[header_end:header_end + dictionary_len]))
+        if self._index_offset + self._count * _INDEX_SLOT.size > len(self._map):
+            self._map.close()
+            raise ValueError(f"'{self.path}' is a truncated GABM cache bundle.")
+
+    def _slot(self, i: int) -> Tuple[bytes, int, int, int, int]:
+        return _INDEX_SLOT.unpack_from(self._map, self._index_offset + i * _INDEX_SLOT.size)
+
+    def _find(self, key: Any) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Return (entry offset, key length, metadata length, value length) for key, or None.
+        """
+        key_bytes = encode_value(key)
+        target = _key_hash(key_bytes)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._index_offset + mid * _INDEX_SLOT.size
+            if self._map[start:start + _HASH_SIZE] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Equal hashes are adjacent; compare the keys themselves in case of a collision
+        while lo < self._count:
+            key_hash, offset, key_len, meta_len, value_len = self._slot(lo)
+            if key_hash != target:
+                break
+            if self._map[offset:offset + key_len] == key_bytes:
+                return offset, key_len, meta_len, value_len
+            lo += 1
+        return None
+
+    def __getitem__(self, key: Any) -> Any:
+        found = self._find(key)
+        if found is None:
+            raise KeyError(key)
+        offset, key_len, meta_len, value_len = found
+        start = offset + key_len + meta_len
+        return decode_value(self._codec.decompress(self._map[start:start + value_len]))
+
+    def metadata(self, key: Any) -> Dict[str, Any]:
+        """
+        Return the metadata of key: {"model", "timestamp"} (either may be None).
+        """
+        found = self._find(key)
+        if found is None:
+            raise KeyError(key)
+        offset, key_len, meta_len, _ = found
+        return decode_value(self._map[offset + key_len:offset + key_len + meta_len])
+
+    def entries(self) -> Iterator[Tuple[Any, Any, Dict[str, Any]]]:
+        """
+        Yield every (key, value, metadata) in the bundle, in index order.
+        """
+        for i in range(self._count):
+            _, offset, key_len, meta_len, value_len = self._slot(i)
+            key = decode_value(self._map[offset:offset + key_len])
+            meta = decode_value(self._map[offset + key_len:offset + key_len + meta_len])
+            start = offset + key_len + meta_len
+            yield key, decode_value(self._codec.decompress(self._map[start:start + value_len])), meta
+
+    def __contains__(self, key: Any) -> bool:
+        try:
+            return self._find(key) is not None
+        except TypeError:
+            return False
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self._count):
+            _, offset, key_len, _, _ = self._slot(i)
+            yield decode_value(self._map[offset:offset + key_len])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def entry_size(self, key: Any) -> int:
+        """
+        Return the size in bytes of the stored value for key.
+        """
+        found = self._find(key)
+        if found is None:
+            raise KeyError(key)
+        return found[3]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        raise TypeError(f"Cache bundle {self.path} is read-only.")
+
+    def __delitem__(self, key: Any) -> None:
+        raise TypeError(f"Cache bundle {self.path} is read-only.")
+
+    def close(self) -> None:
+        """
+        Release the memory map.
+        """
+        if not self._map.closed:
+            self._map.close()
+
+
+def write_bundle(
+    path: Union[Path, str],
+    entries: Iterable[Tuple[Any, Any, Dict[str, Any]]],
+    compression: Optional[str] = None,
+    dictionary: bool = False
+) -> int:
+    """
+    Write a bundle from (key, value, metadata) entries. The file is replaced atomically.
+
+    Args:
+        path (Path or str): The bundle file.
+        entries (iterable): (key, value, metadata) triples with distinct keys. Values must be plain
+            data or LLMResponse records; metadata is {"model", "timestamp"}.
+        compression (str, optional): "zlib", "gzip" or "zstd" to compress values.
+        dictionary (bool): Whether to train a compression dictionary on the values (zlib and zstd only).
+
+    Returns:
+        int: The number of entries written.
+    """
+    path = Path(path)
+    encoded = [(encode_value(key), encode_value(meta), encode_value(value)) for key, value, meta in entries]
+    codec_name = compression or "none"
+    trained = b""
+    if dictionary and codec_name in ("zlib", "zstd"):
+        trained = train_dictionary((value for _, _, value in encoded[:_DICTIONARY_SAMPLES]), codec_name)
+    codec = get_codec(codec_name, trained)
+    index = []
+    tmp_path = path.with_name(path.name + ".tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tmp_path.open("wb") as f:
+        f.write(BUNDLE_MAGIC + _BUNDLE_HEADER.pack(codec.codec_id, len(trained), 0, 0) + trained)
+        offset = f.tell()
+        for key_bytes, meta_bytes, value_bytes in encoded:
+            value_bytes = codec.compress(value_bytes)
+            f.write(key_bytes + meta_bytes + value_bytes)
+            index.append((_key_hash(key_bytes), offset, len(key_bytes), len(meta_bytes), len(value_bytes)))
+            offset += len(key_bytes) + len(meta_bytes) + len(value_bytes)
+        index.sort()
+        f.write(b"".join(_INDEX_SLOT.pack(*slot) for slot in index))
+        f.seek(len(BUNDLE_MAGIC))
+        f.write(_BUNDLE_HEADER.pack(codec.codec_id, len(trained), len(index), offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(index)
+
+
+def _log_metadata(jsonl_path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Return {cache key: {"model", "timestamp"}} from the latest entry for each key in a JSONL log
+    (including rolled logs).
+    """
+    metadata = {}
+    for entry in iter_log_entries(jsonl_path):
+        cache_key = entry.get("cache_key")
+        if cache_key is not None:
+            metadata[cache_key] = {"model": entry.get("model"), "timestamp": entry.get("timestamp")}
+    return metadata
+
+
+def _service_entries(
+    service: str, logger: Any, keep_raw: bool, backend: str = "segment"
+) -> Iterator[Tuple[Any, Any, Dict[str, Any]]]:
+    cache_path, jsonl_path = get_llm_cache_paths(service)
+    suffix = {"segment": ".seg", "sqlite": ".sqlite", "pickle": ".pkl"}.get(backend)
+    if suffix is None:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    if not cache_path.exists() and not cache_path.with_suffix(suffix).exists():
+        logger.warning(f"No cache found for {service} at {cache_path.parent}")
+        return
+    metadata = _log_metadata(jsonl_path)
+    # Read-only, so a legacy pickle cache is read as it is rather than converted to the backend
+    options = {"lazy": True, "hot_cache_size": 0} if backend == "segment" else {}
+    with load_llm_cache(cache_path, logger, backend=backend, read_only=True, **options) as cache:
+        for key in cache:
+            try:
+                value = to_record(cache[key], keep_raw)
+            except KeyError:
+                continue
+            meta = dict(metadata.get(key) or {"model": None, "timestamp": None})
+            if meta["model"] is None:
+                meta["model"] = getattr(value, "model", None)
+            yield key, value, meta
+
+
+def export_bundle(
+    path: Union[Path, str],
+    services: Sequence[str] = (),
+    bundles: Sequence[Union[Path, str]] = (),
+    models: Optional[Sequence[str]] = None,
+    since: Union[datetime, str, None] = None,
+    until: Union[datetime, str, None] = None,
+    compression: Optional[str] = None,
+    dictionary: bool = False,
+    keep_raw: bool = False,
+    backend: str = "segment",
+    logger: Optional[Any] = None
+) -> int:
+    """
+    Merge the caches of services and existing bundles into a new bundle.
+
+    Where several sources hold the same key, the most recently cached response is kept (a response
+    with no known time counts as oldest; among equals the later source wins). Provider SDK responses
+    are converted to LLMResponse records. The model and time of each response come from the
+    service's JSONL log, so responses missing from the log have no time and, if a time window is
+    given, are left out.
+
+    Args:
+        path (Path or str): The bundle file to write (replaced if it exists).
+        services (sequence of str): Service names whose caches to include (e.g. ["openai"]).
+        bundles (sequence of Path or str): Bundles to include.
+        models (sequence of str, optional): Only include responses from these models.
+        since (datetime or str, optional): Only include responses cached at or after this time (UTC).
+        until (datetime or str, optional): Only include responses cached before this time (UTC).
+        compression (str, optional): "zlib", "gzip" or "zstd" to compress values.
+        dictionary (bool): Whether to train a compression dictionary on the values.
+        keep_raw (bool): Whether converted responses keep the full provider payload.
+        backend (str): The cache backend of the services ("segment", "sqlite" or "pickle").
+            Caches are only read, never created or converted.
+        logger: Logger for info messages (optional).
+
+    Returns:
+        int: The number of responses in the bundle.
+    """
+    logger = logger or logging.getLogger(__name__)
+    since = _as_timestamp(since)
+    until = _as_timestamp(until)
+    merged: Dict[Any, Tuple[Any, Dict[str, Any]]] = {}
+
+    def include(key: Any, value: Any, meta: Dict[str, Any]) -> None:
+        if models is not None and meta.get("model") not in models:
+            return
+        timestamp = meta.get("timestamp")
+        if (since is not None or until is not None) and timestamp is None:
+            return
+        if (since is not None and timestamp < since) or (until is not None and timestamp >= until):
+            return
+        existing = merged.get(key)
+        if existing is None or (existing[1].get("timestamp") or "") <= (timestamp or ""):
+            merged[key] = (value, meta)
+
+    for service in services:
+        for key, value, meta in _service_entries(service, logger, keep_raw, backend):
+            include(key, value, meta)
+    for bundle_path in bundles:
+        with CacheBundle(bundle_path, logger) as bundle:
+            for key, value, meta in bundle.entries():
+                include(key, value, meta)
+    count = write_bundle(
+        path, ((key, value, meta) for key, (value, meta) in merged.items()),
+        compression=compression, dictionary=dictionary
+    )
+    logger.info(f"Exported {count} cached responses to {path}")
+    return count
+
+
+def import_bundle(
+    path: Union[Path, str],
+    service: str,
+    models: Optional[Sequence[str]] = None,
+    overwrite: bool = False,
+    logger: Optional[Any] = None,
+    **cache_options: Any
+) -> int:
+    """
+    Copy the responses in a bundle into a service's local cache.
+
+    Args:
+        path (Path or str): The bundle file.
+        service (str): The service whose cache to fill (e.g. "openai").
+        models (sequence of str, optional): Only import responses from these models.
+        overwrite (bool): Whether to replace responses the cache already holds.
+        logger: Logger for info messages (optional).
+        **cache_options: Passed to load_llm_cache (e.g. backend="sqlite").
+
+    Returns:
+        int: The number of responses imported.
+    """
+    logger = logger or logging.getLogger(__name__)
+    cache_path, _ = get_llm_cache_paths(service)
+    count = 0
+    with CacheBundle(path, logger) as bundle, load_llm_cache(cache_path, logger, **cache_options) as cache:
+        for key, value, meta in bundle.entries():
+            if models is not None and meta.get("model") not in models:
+                continue
+            if not overwrite and key in cache:
+                continue
+            cache.put(key, value, namespace=meta.get("model"))
+            count += 1
+    logger.info(f"Imported {count} cached responses from {path} into {service}")
+    return count
+
+
+class LayeredCacheStore(CacheStore):
+    """
+    Cache store that serves hits from a local store and then from read-only bundles.
+
+    Writes go to the local store only. Other attributes (e.g. pin() of a bounded store) are those
+    of the local store.
+
+    Attributes:
+        store (CacheStore): The local store.
+        bundles (list of CacheBundle): The bundles, searched in order.
+        bundle_hits (int): Number of lookups answered by a bundle.
+    """
+
+    def __init__(self, store: CacheStore, bundles: Sequence[Union[CacheBundle, Path, str]], logger: Optional[Any] = None):
+        """
+        Initialize the store.
+
+        Args:
+            store (CacheStore): The local store.
+            bundles (sequence of CacheBundle, Path or str): The bundles, or paths to them.
+            logger: Logger for info messages (optional).
+        """
+        self.store = store
+        self.bundles: List[CacheBundle] = [
+            bundle if isinstance(bundle, CacheBundle) else CacheBundle(bundle, logger) for bundle in bundles
+        ]
+        self.bundle_hits = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found on the layered store
+        if name == "store":
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+    @property
+    def serialiser(self) -> str:
+        """The serialiser of the local store."""
+        return self.store.serialiser
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            return self.store[key]
+        except KeyError:
+            pass
+        for bundle in self.bundles:
+            try:
+                value = bundle[key]
+            except (KeyError, TypeError):
+                continue
+            with self._lock:
+                self.bundle_hits += 1
+            return value
+        raise KeyError(key)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.store or any(key in bundle for bundle in self.bundles)
+
+    def put(self, key: Any, value: Any, namespace: Optional[str] = None) -> None:
+        self.store.put(key, value, namespace=namespace)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.store[key] = value
+
+    def __delitem__(self, key: Any) -> None:
+        if key in self.store:
+            del self.store[key]
+        elif not any(key in bundle for bundle in self.bundles):
+            raise KeyError(key)
+        # Bundles are read-only, so a key held only by a bundle stays there
+
+    def __iter__(self) -> Iterator[Any]:
+        seen = set(self.store)
+        yield from seen
+        for bundle in self.bundles:
+            for key in bundle:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def entry_size(self, key: Any) -> int:
+        if key in self.store:
+            return self.store.entry_size(key)
+        for bundle in self.bundles:
+            if key in bundle:
+                return bundle.entry_size(key)
+        raise KeyError(key)
+
+    def compact(self) -> None:
+        self.store.compact()
+
+    def flush(self) -> None:
+        self.store.flush()
+
+    def close(self) -> None:
+        """
+        Close the local store and the bundles.
+        """
+        self.store.close()
+        for bundle in self.bundles:
+            bundle.close()
@@ -0,0 +1,1341 @@
+"""
+Persistent stores for LLM prompt/response caches.
+
+- Provides a common CacheStore interface (a mutable mapping) used by LLMService and load_llm_cache.
+- Provides an append-only segment store with O(1) writes per entry, periodic compaction and recovery after a killed run.
+- The segment store can compress values (zlib, gzip or zstd), optionally with a dictionary trained on
+  the cached values at compaction.
+- The segment store can serialise values as tagged JSON instead of pickle (serialiser="json"), a
+  format that does not depend on the Python or provider SDK versions and is safe to share.
+- The segment store can load lazily: only keys and file offsets are read at startup and values are
+  deserialised on demand, with a bounded LRU of recently used values.
+- Provides a pickle store that keeps the original whole-file format for existing caches.
+- Provides an SQLite store (WAL mode) that several processes on the same host can read and write
+  at the same time. The segment and pickle stores assume a single writing process.
+- Provides a bounded store that wraps any store with LRU or LFU eviction to a byte or entry budget,
+  an optional time to live, per-model namespaces with their own budgets, and pinned entries that
+  are never evicted or expired.
+- Provides a prompt table that stores each distinct prompt text once, keyed by its fingerprint.
+  Appends are serialised with an advisory file lock, so processes can share the table.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+import logging
+import os
+from pathlib import Path
+import pickle
+import json
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+# Local imports
+from .compression import Codec, get_codec, train_dictionary
+from .response import decode_value, encode_value, to_record
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class CacheStore(MutableMapping):
+    """
+    Common interface for persistent prompt/response caches.
+
+    A store behaves like a dict: `key in store`, `store[key]` and `store[key] = value` are supported.
+    Writes are persisted by the store itself, so callers never need to rewrite the whole cache.
+
+    Attributes:
+        serialiser (str): How values are serialised: "pickle" (any object) or "json" (plain data
+            and LLMResponse records only).
+    """
+    serialiser = "pickle"
+
+    def put(self, key: Any, value: Any, namespace: Optional[str] = None) -> None:
+        """
+        Store value under key. Stores that manage entries per namespace (usually the model name)
+        record it; the default ignores it.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            namespace (str, optional): The namespace of the entry.
+        """
+        self[key] = value
+
+    def entry_size(self, key: Any) -> int:
+        """
+        Return the size in bytes of the stored value for key. The default serialises the value.
+        """
+        return len(_dumps(self[key]))
+
+    def compact(self) -> None:
+        """
+        Rewrite the underlying storage without superseded entries. The default does nothing.
+        """
+        pass
+
+    def flush(self) -> None:
+        """
+        Flush pending writes to disk. The default does nothing.
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Flush and release any resources held by the store.
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PickleCacheStore(CacheStore):
+    """
+    Cache store backed by a single pickled dict, as used by earlier GABM releases.
+
+    Every write rewrites the whole file (atomically, via a temporary file), so this store is
+    only suitable for small caches. It is kept for compatibility with existing `.pkl` caches.
+    """
+
+    def __init__(self, path: Union[Path, str], logger: Optional[Any] = None, read_only: bool = False):
+        """
+        Initialize the store, loading the pickled dict if the file exists.
+
+        Args:
+            path (Path or str): Path to the pickle file.
+            logger: Logger for warnings (optional).
+            read_only (bool): Whether to leave the file untouched, so writes raise ValueError.
+        """
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        self._data: Dict[Any, Any] = {}
+        if self.path.exists():
+            try:
+                with self.path.open("rb") as f:
+                    data = pickle.load(f)
+                if isinstance(data, dict):
+                    self._data = data
+                else:
+                    self.logger.warning(
+                        "Cache file '%s' did not contain a dict (got %s). "
+                        "Ignoring cache and using an empty dict instead.",
+                        self.path,
+                        type(data).__name__,
+                    )
+            except Exception as e:
+                self.logger.warning("Failed to load cache from '%s': %s", self.path, e)
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._data[key]
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ValueError(f"'{self.path}' is open read-only.")
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._check_writable()
+        with self._lock:
+            self._data[key] = value
+            self.flush()
+
+    def __delitem__(self, key: Any) -> None:
+        self._check_writable()
+        with self._lock:
+            del self._data[key]
+            self.flush()
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def flush(self) -> None:
+        """
+        Rewrite the pickle file with the current contents (unless the store is read-only).
+        """
+        if self.read_only:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            try:
+                with tmp_path.open("wb") as f:
+                    pickle.dump(self._data, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                self.logger.error(f"Failed to write cache: {e}")
+
+
+# Segment file layout:
+#   header: MAGIC (version 1, uncompressed values)
+#       or: MAGIC_V2, serialiser (1 byte, 0 = pickle, 1 = json), codec id (1 byte, see compression.CODECS),
+#           dictionary length (4 bytes), dictionary
+#   record: op (1 byte), key length (4 bytes), value length (4 bytes), crc32 of key+value (4 bytes), key, value
+# Records are only ever appended. A later record for the same key supersedes an earlier one and a
+# delete record removes the key. Superseded records are dropped by compaction. In version 2 files
+# the stored value is compressed with the codec and the crc is of the stored bytes.
+SEGMENT_MAGIC = b"GABMSEG1"
+SEGMENT_MAGIC_V2 = b"GABMSEG2"
+_SEGMENT_HEADER_V2 = struct.Struct("<BBI")
+_SERIALISER_PICKLE = 0
+_SERIALISER_JSON = 1
+# Value serialisers, by their id in the segment header
+SERIALISERS = ("pickle", "json")
+_RECORD_HEADER = struct.Struct("<BIII")
+# Maximum number of values sampled to train a compression dictionary
+_DICTIONARY_SAMPLES = 10000
+_OP_PUT = 1
+_OP_DELETE = 2
+
+
+def _dumps(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(data: bytes) -> Any:
+    return pickle.loads(data)
+
+
+def segment_serialiser(path: Union[Path, str]) -> str:
+    """
+    Return the value serialiser ("pickle" or "json") of a segment file, without loading it.
+
+    Raises:
+        ValueError: If the file is not a GABM cache segment.
+    """
+    with Path(path).open("rb") as f:
+        magic = f.read(len(SEGMENT_MAGIC))
+        if magic == SEGMENT_MAGIC:
+            return "pickle"
+        header = f.read(_SEGMENT_HEADER_V2.size)
+    if magic != SEGMENT_MAGIC_V2 or len(header) < _SEGMENT_HEADER_V2.size or header[0] >= len(SERIALISERS):
+        raise ValueError(f"'{path}' is not a GABM cache segment file.")
+    return SERIALISERS[header[0]]
+
+
+class AppendOnlyCacheStore(CacheStore):
+    """
+    Cache store backed by an append-only segment file and an in-memory index.
+
+    - Each write appends one record, so the cost of a write does not depend on the size of the cache.
+    - The index maps each key to the offset of its latest record.
+    - Compaction rewrites the live records to a temporary file and atomically replaces the segment.
+      It runs automatically once superseded records make up `compact_ratio` of the file.
+    - On opening, a truncated or corrupt trailing record (e.g. from a killed run) is discarded
+      and the file is truncated back to the last complete record.
+    - In lazy mode only keys and offsets are loaded when opening. Values are read from the segment
+      on a hit and the most recently used `hot_cache_size` values are kept in memory.
+    - With compression, each value is compressed on its own, so reads stay random access. With
+      dictionary=True, compaction trains a dictionary on the cached values and stores it in the
+      segment header, which helps most with many small, similar values. Opening an existing segment
+      with a different compression converts it at the next compaction (call compact() to convert now).
+    - With serialiser="json", keys and values are stored as tagged JSON (see response.encode_value),
+      so only plain data and LLMResponse records can be cached. An existing segment keeps the
+      serialiser it was written with; migrate_llm_cache() converts a pickle segment.
+    - With read_only=True an existing segment is read as it is: an incomplete tail is skipped
+      rather than truncated, and writes raise ValueError.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        logger: Optional[Any] = None,
+        legacy_path: Optional[Union[Path, str]] = None,
+        compact_ratio: float = 0.5,
+        compact_min_records: int = 1000,
+        fsync: bool = False,
+        lazy: bool = False,
+        hot_cache_size: int = 1024,
+        compression: Optional[str] = None,
+        dictionary: bool = False,
+        compression_level: Optional[int] = None,
+        serialiser: str = "pickle",
+        read_only: bool = False
+    ):
+        """
+        Initialize the store, creating or recovering the segment file.
+
+        Args:
+            path (Path or str): Path to the segment file.
+            logger: Logger for info/warning messages (optional).
+            legacy_path (Path or str, optional): Path to a pickle cache to import when the segment does not exist yet.
+            compact_ratio (float): Fraction of superseded records that triggers automatic compaction.
+            compact_min_records (int): Minimum number of superseded records before automatic compaction.
+            fsync (bool): Whether to fsync after every write (slower, but survives power loss).
+            lazy (bool): Whether to load only keys and offsets, deserialising values on demand.
+            hot_cache_size (int): Maximum number of values kept in memory in lazy mode.
+            compression (str, optional): "zlib", "gzip" or "zstd" to compress values (None or "none" for no compression).
+            dictionary (bool): Whether compaction trains a compression dictionary (zlib and zstd only).
+            compression_level (int, optional): Compression level.
+            serialiser (str): "pickle" or "json", for a new segment. An existing segment keeps its serialiser.
+            read_only (bool): Whether to open an existing segment without writing to it.
+
+        Raises:
+            FileNotFoundError: If read_only is set and the segment does not exist.
+        """
+        if serialiser not in SERIALISERS:
+            raise ValueError(f"Unknown cache serialiser: {serialiser}")
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+        self.fsync = fsync
+        self.lazy = lazy
+        self.hot_cache_size = hot_cache_size
+        self.compression = compression or "none"
+        self.dictionary = dictionary
+        self.compression_level = compression_level
+        self.read_only = read_only
+        self._set_serialiser(serialiser)
+        # Check the codec is available before touching the file
+        get_codec(self.compression, level=compression_level)
+        self._lock = threading.RLock()
+        # key -> (key offset, key length, value length, crc)
+        self._index: Dict[Any, Tuple[int, int, int, int]] = {}
+        # All values when eager; the most recently used values when lazy
+        self._values: Dict[Any, Any] = OrderedDict() if lazy else {}
+        self._stale = 0
+        if read_only:
+            self._file = self.path.open("rb")
+            self._load()
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._tmp_path()
+        if tmp_path.exists():
+            # A compaction was interrupted before the atomic replace; the segment itself is intact.
+            tmp_path.unlink()
+        if not self.path.exists():
+            self._codec = get_codec(self.compression, level=compression_level)
+            with self.path.open("wb") as f:
+                self._data_start = self._write_header(f, self._codec)
+            self._file = self.path.open("r+b")
+            if legacy_path is not None and Path(legacy_path).exists():
+                self._import_legacy(Path(legacy_path))
+        else:
+            self._file = self.path.open("r+b")
+            self._load()
+
+    def _tmp_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".tmp")
+
+    def _set_serialiser(self, serialiser: str) -> None:
+        self.serialiser = serialiser
+        if serialiser == "json":
+            self._dumps, self._loads = encode_value, decode_value
+        else:
+            self._dumps, self._loads = _dumps, _loads
+
+    def _write_header(self, f: Any, codec: Codec) -> int:
+        """
+        Write the segment header for codec and return its length.
+        """
+        if codec.name == "none" and not codec.dictionary and self.serialiser == "pickle":
+            f.write(SEGMENT_MAGIC)
+            return len(SEGMENT_MAGIC)
+        serialiser_id = SERIALISERS.index(self.serialiser)
+        f.write(SEGMENT_MAGIC_V2 + _SEGMENT_HEADER_V2.pack(serialiser_id, codec.codec_id, len(codec.dictionary)))
+        f.write(codec.dictionary)
+        return len(SEGMENT_MAGIC_V2) + _SEGMENT_HEADER_V2.size + len(codec.dictionary)
+
+    def _read_header(self) -> None:
+        """
+        Read the segment header, setting the codec and the offset of the first record.
+        """
+        f = self._file
+        f.seek(0)
+        magic = f.read(len(SEGMENT_MAGIC))
+        if magic == SEGMENT_MAGIC:
+            self._codec = get_codec("none")
+            self._data_start = len(SEGMENT_MAGIC)
+            self._check_serialiser(_SERIALISER_PICKLE)
+            return
+        if magic != SEGMENT_MAGIC_V2:
+            raise ValueError(f"'{self.path}' is not a GABM cache segment file.")
+        header = f.read(_SEGMENT_HEADER_V2.size)
+        if len(header) < _SEGMENT_HEADER_V2.size:
+            raise ValueError(f"'{self.path}' has a truncated segment header.")
+        serialiser, codec_id, dictionary_len = _SEGMENT_HEADER_V2.unpack(header)
+        if serialiser >= len(SERIALISERS):
+            raise ValueError(f"'{self.path}' uses an unknown value serialiser ({serialiser}).")
+        self._check_serialiser(serialiser)
+        dictionary = f.read(dictionary_len)
+        self._codec = get_codec(codec_id, dictionary, self.compression_level)
+        self._data_start = len(SEGMENT_MAGIC_V2) + _SEGMENT_HEADER_V2.size + dictionary_len
+        if self._codec.name != self.compression:
+            self.logger.info(
+                f"{self.path} is compressed with {self._codec.name}; it will be converted to {self.compression} when compacted"
+            )
+
+    def _check_serialiser(self, serialiser_id: int) -> None:
+        serialiser = SERIALISERS[serialiser_id]
+        if serialiser == "pickle" and self.serialiser == "json":
+            self.logger.warning(f"{self.path} uses pickle; run scripts/migrate-cache.py to convert it")
+        self._set_serialiser(serialiser)
+
+    def _decode(self, data: bytes) -> Any:
+        return self._loads(self._codec.decompress(data))
+
+    def _encode(self, value: Any) -> bytes:
+        return self._codec.compress(self._dumps(value))
+
+    def _import_legacy(self, legacy_path: Path) -> None:
+        legacy = PickleCacheStore(legacy_path, self.logger)
+        if len(legacy) == 0:
+            return
+        self.logger.info(f"Importing {len(legacy)} entries from legacy cache {legacy_path} into {self.path}")
+        with self._lock:
+            if self.serialiser == "json":
+                self.put_many((key, to_record(legacy[key])) for key in legacy)
+            else:
+                self.put_many((key, legacy[key]) for key in legacy)
+
+    def _load(self) -> None:
+        """
+        Scan the segment, rebuild the index and truncate any incomplete trailing record.
+
+        In lazy mode values are skipped rather than read, and only the crc of the last record is
+        checked here; the crc of every other record is checked when its value is first read.
+        """
+        self._read_header()
+        f = self._file
+        offset = self._data_start
+        size = os.fstat(f.fileno()).st_size
+        while offset < size:
+            f.seek(offset)
+            header = f.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                break
+            op, key_len, value_len, crc = _RECORD_HEADER.unpack(header)
+            body_offset = offset + _RECORD_HEADER.size
+            end = body_offset + key_len + value_len
+            if op not in (_OP_PUT, _OP_DELETE) or end > size:
+                break
+            if self.lazy and end < size:
+                body = f.read(key_len)
+            else:
+                body = f.read(key_len + value_len)
+                if zlib.crc32(body) != crc:
+                    break
+            try:
+                key = self._loads(body[:key_len])
+            except Exception:
+                break
+            if key in self._index:
+                self._stale += 1
+            if op == _OP_PUT:
+                self._index[key] = (body_offset, key_len, value_len, crc)
+                if not self.lazy:
+                    try:
+                        self._values[key] = self._decode(body[key_len:])
+                    except Exception as e:
+                        # E.g. a pickled class that no longer imports after an SDK upgrade: treat as a miss
+                        self.logger.warning(f"Skipping cache record at offset {body_offset} in {self.path} that cannot be loaded: {e}")
+                        del self._index[key]
+                        self._values.pop(key, None)
+                        self._stale += 1
+            else:
+                self._index.pop(key, None)
+                self._values.pop(key, None)
+                self._stale += 1
+            offset = end
+        if offset < size and self.read_only:
+            self.logger.warning(f"Ignoring {size - offset} bytes of incomplete or corrupt records at the end of {self.path}")
+        elif offset < size:
+            self.logger.warning(
+                f"Discarding {size - offset} bytes of incomplete or corrupt records at the end of {self.path}"
+            )
+            f.truncate(offset)
+            self._sync()
+
+    def _read_value(self, key: Any) -> Any:
+        """
+        Read and deserialise the value for key from the segment.
+        """
+        body_offset, key_len, value_len, crc = self._index[key]
+        self._file.flush()
+        self._file.seek(body_offset)
+        body = self._file.read(key_len + value_len)
+        if zlib.crc32(body) != crc:
+            # Treat a corrupt record as a miss so the response is fetched and cached again
+            self.logger.error(f"Corrupt cache record at offset {body_offset} in {self.path}; dropping it")
+            del self._index[key]
+            self._stale += 1
+            raise KeyError(key)
+        try:
+            return self._decode(body[key_len:])
+        except Exception as e:
+            self.logger.error(f"Cache record at offset {body_offset} in {self.path} cannot be loaded ({e}); dropping it")
+            del self._index[key]
+            self._stale += 1
+            raise KeyError(key) from e
+
+    def _remember(self, key: Any, value: Any) -> None:
+        self._values[key] = value
+        if self.lazy:
+            self._values.move_to_end(key)
+            while len(self._values) > self.hot_cache_size:
+                self._values.popitem(last=False)
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ValueError(f"'{self.path}' is open read-only.")
+
+    def _append(self, op: int, key: Any, value: Any, sync: bool = True) -> None:
+        self._check_writable()
+        key_bytes = self._dumps(key)
+        value_bytes = self._encode(value) if op == _OP_PUT else b""
+        crc = zlib.crc32(key_bytes + value_bytes)
+        f = self._file
+        offset = f.seek(0, os.SEEK_END)
+        f.write(_RECORD_HEADER.pack(op, len(key_bytes), len(value_bytes), crc) + key_bytes + value_bytes)
+        if key in self._index:
+            self._stale += 1
+        if op == _OP_PUT:
+            self._index[key] = (offset + _RECORD_HEADER.size, len(key_bytes), len(value_bytes), crc)
+            self._remember(key, value)
+        else:
+            del self._index[key]
+            self._values.pop(key, None)
+            self._stale += 1
+        if sync:
+            self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        if self.fsync and not self.read_only:
+            os.fsync(self._file.fileno())
+
+    def _maybe_compact(self) -> None:
+        if self._stale >= self.compact_min_records and self._stale >= self.compact_ratio * (self._stale + len(self._index)):
+            self.compact()
+
+    def __getitem__(self, key: Any) -> Any:
+        with self._lock:
+            if key in self._values:
+                value = self._values[key]
+                if self.lazy:
+                    self._values.move_to_end(key)
+                return value
+            if not self.lazy or key not in self._index:
+                raise KeyError(key)
+            value = self._read_value(key)
+            self._remember(key, value)
+            return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._append(_OP_PUT, key, value)
+            self._maybe_compact()
+
+    def __delitem__(self, key: Any) -> None:
+        with self._lock:
+            if key not in self._index:
+                raise KeyError(key)
+            self._append(_OP_DELETE, key, None)
+            self._maybe_compact()
+
+    def put_many(self, items: Iterable[Tuple[Any, Any]]) -> int:
+        """
+        Store many (key, value) pairs, flushing once at the end rather than after every write.
+
+        Args:
+            items (iterable): The (key, value) pairs.
+
+        Returns:
+            int: The number of pairs written.
+        """
+        count = 0
+        with self._lock:
+            for key, value in items:
+                self._append(_OP_PUT, key, value, sync=False)
+                count += 1
+            self._sync()
+            self._maybe_compact()
+        return count
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            return iter(list(self._index))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def entry_size(self, key: Any) -> int:
+        """
+        Return the size in bytes of the stored value for key, without reading it.
+        """
+        return self._index[key][2]
+
+    @property
+    def stale_records(self) -> int:
+        """Number of superseded or deleted records that compaction would drop."""
+        return self._stale
+
+    def _target_codec(self) -> Codec:
+        """
+        Return the codec compaction should write: the configured compression, with a newly trained
+        dictionary if dictionary is set and the current codec has none or is a different codec.
+        """
+        if self._codec.name == self.compression and (not self.dictionary or self._codec.dictionary):
+            return self._codec
+        dictionary = b""
+        if self.dictionary and self.compression in ("zlib", "zstd"):
+            samples = []
+            for key in list(self._index)[-_DICTIONARY_SAMPLES:]:
+                body_offset, key_len, value_len, crc = self._index[key]
+                self._file.seek(body_offset + key_len)
+                samples.append(self._codec.decompress(self._file.read(value_len)))
+            dictionary = train_dictionary(samples, self.compression)
+        return get_codec(self.compression, dictionary, self.compression_level)
+
+    def compact(self) -> None:
+        """
+        Rewrite the segment with only the live records and atomically replace the original.
+        Records are copied as raw bytes, so no values are re-serialised, unless the segment is
+        being converted to another compression or a dictionary is being trained, in which case
+        values are decompressed and compressed again (but not unpickled).
+        """
+        self._check_writable()
+        with self._lock:
+            self._file.flush()
+            codec = self._target_codec()
+            transcode = codec is not self._codec
+            tmp_path = self._tmp_path()
+            new_index = {}
+            with tmp_path.open("wb") as out:
+                offset = self._write_header(out, codec)
+                data_start = offset
+                for key, (body_offset, key_len, value_len, crc) in self._index.items():
+                    self._file.seek(body_offset)
+                    body = self._file.read(key_len + value_len)
+                    if transcode:
+                        if zlib.crc32(body) != crc:
+                            self.logger.error(f"Dropping corrupt cache record at offset {body_offset} in {self.path}")
+                            continue
+                        body = body[:key_len] + codec.compress(self._codec.decompress(body[key_len:]))
+                        value_len = len(body) - key_len
+                        crc = zlib.crc32(body)
+                    out.write(_RECORD_HEADER.pack(_OP_PUT, key_len, value_len, crc) + body)
+                    new_index[key] = (offset + _RECORD_HEADER.size, key_len, value_len, crc)
+                    offset += _RECORD_HEADER.size + key_len + value_len
+                out.flush()
+                os.fsync(out.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            _fsync_dir(self.path.parent)
+            self._file = self.path.open("r+b")
+            self._index = new_index
+            self._codec = codec
+            self._data_start = data_start
+            self.logger.info(f"Compacted {self.path} ({codec.name}): dropped {self._stale} stale records, kept {len(new_index)}")
+            self._stale = 0
+
+    def flush(self) -> None:
+        """
+        Flush buffered writes to the operating system (and fsync if enabled).
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+
+    def close(self) -> None:
+        """
+        Flush and close the segment file.
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+
+class SQLiteCacheStore(CacheStore):
+    """
+    Cache store backed by an SQLite database in write-ahead log (WAL) mode.
+
+    - Several processes on the same host can open the same database: readers never block and
+      writers are serialised by SQLite, so parallel runs share hits without corrupting the cache.
+    - Each write is its own transaction and is visible to other processes as soon as it returns.
+    - Nothing is held in memory; every lookup reads the database, so entries written by other
+      processes are seen immediately.
+    - WAL mode needs a local file system; do not put the database on a network share.
+    - A row whose value cannot be loaded (corrupt, or pickled by an incompatible version) is logged,
+      deleted and treated as a miss.
+    - With read_only=True an existing database is opened for reading only, and writes raise
+      sqlite3.OperationalError.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        logger: Optional[Any] = None,
+        legacy_path: Optional[Union[Path, str]] = None,
+        timeout: float = 30.0,
+        synchronous: str = "NORMAL",
+        read_only: bool = False
+    ):
+        """
+        Initialize the store, creating the database if needed.
+
+        Args:
+            path (Path or str): Path to the database file.
+            logger: Logger for info/warning messages (optional).
+            legacy_path (Path or str, optional): Path to a pickle cache to import when the database is empty.
+            timeout (float): Seconds to wait for another process to finish writing before failing.
+            synchronous (str): SQLite synchronous setting. "NORMAL" survives a killed process;
+                "FULL" also survives power loss but is slower.
+            read_only (bool): Whether to open an existing database without writing to it.
+        """
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        if read_only:
+            self._conn = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro", uri=True, timeout=timeout,
+                isolation_level=None, check_same_thread=False
+            )
+            with self._lock:
+                self._conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: each statement is its own transaction unless BEGIN is issued
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA synchronous={synchronous}")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY KEY, value BLOB NOT NULL)")
+        if legacy_path is not None and Path(legacy_path).exists() and len(self) == 0:
+            self._import_legacy(Path(legacy_path))
+
+    def _import_legacy(self, legacy_path: Path) -> None:
+        legacy = PickleCacheStore(legacy_path, self.logger)
+        if len(legacy) == 0:
+            return
+        self.logger.info(f"Importing {len(legacy)} entries from legacy cache {legacy_path} into {self.path}")
+        rows = [(_dumps(key), _dumps(legacy[key])) for key in legacy]
+        with self._lock:
+            # Another process may import at the same time; OR IGNORE keeps whichever wrote first
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO cache (key, value) VALUES (?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def __getitem__(self, key: Any) -> Any:
+        key_bytes = _dumps(key)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key_bytes,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        try:
+            return _loads(row[0])
+        except Exception as e:
+            # Treat a row that cannot be loaded as a miss so the response is fetched and cached again
+            self.logger.error(f"Cache row for {key!r} in {self.path} cannot be loaded ({e}); dropping it")
+            if not self.read_only:
+                with self._lock:
+                    self._conn.execute("DELETE FROM cache WHERE key = ? AND value = ?", (key_bytes, row[0]))
+            raise KeyError(key) from e
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        key_bytes = _dumps(key)
+        value_bytes = _dumps(value)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", (key_bytes, value_bytes))
+
+    def __delitem__(self, key: Any) -> None:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache WHERE key = ?", (_dumps(key),))
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key: Any) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM cache WHERE key = ?", (_dumps(key),)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM cache").fetchall()
+        keys = []
+        for row in rows:
+            try:
+                keys.append(_loads(row[0]))
+            except Exception as e:
+                self.logger.warning(f"Skipping cache row in {self.path} whose key cannot be loaded: {e}")
+        return iter(keys)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def entry_size(self, key: Any) -> int:
+        """
+        Return the size in bytes of the stored value for key, without reading it.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT length(value) FROM cache WHERE key = ?", (_dumps(key),)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def compact(self) -> None:
+        """
+        Copy the write-ahead log into the database, truncate it, and reclaim free pages.
+        """
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+EVICTION_POLICIES = ("lru", "lfu")
+# Entry metadata fields
+_SIZE, _CREATED, _ACCESSED, _HITS, _NAMESPACE = range(5)
+
+
+class BoundedCacheStore(CacheStore):
+    """
+    Cache store that wraps another store and keeps it within a budget.
+
+    - When the total size of the values exceeds max_bytes, or there are more than max_entries,
+      the least recently used ("lru") or least frequently used ("lfu") entries are evicted until
+      the cache is back under low_water times the budget, so eviction runs in occasional batches.
+    - Each entry belongs to a namespace (the model name when written by an LLM service), and
+      namespaces can have their own byte budgets and be cleared on their own.
+    - Entries older than ttl seconds are treated as misses and removed.
+    - Pinned entries, and all entries in pinned namespaces, are never evicted or expired.
+    - Entry sizes, times, hit counts and pins are kept in memory and saved to meta_path on
+      flush() and close() (pins are saved at once), so LRU/LFU order survives restarts.
+    """
+
+    def __init__(
+        self,
+        store: CacheStore,
+        meta_path: Optional[Union[Path, str]] = None,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        policy: str = "lru",
+        namespace_max_bytes: Optional[Dict[str, int]] = None,
+        low_water: float = 0.9,
+        logger: Optional[Any] = None
+    ):
+        """
+        Initialize the store, loading saved metadata and applying the budget and ttl.
+
+        Args:
+            store (CacheStore): The store that holds the entries.
+            meta_path (Path or str, optional): File for the entry metadata and pins. If None they are not saved.
+            max_bytes (int, optional): Budget for the total size of the stored values.
+            max_entries (int, optional): Budget for the number of entries.
+            ttl (float, optional): Seconds after which an unpinned entry expires.
+            policy (str): "lru" or "lfu".
+            namespace_max_bytes (dict, optional): Byte budget for each namespace, e.g. {"gpt-4o": 10**8}.
+            low_water (float): Fraction of a budget to evict down to once it is exceeded.
+            logger: Logger for info/warning messages (optional).
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.store = store
+        self.meta_path = Path(meta_path) if meta_path is not None else None
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.policy = policy
+        self.namespace_max_bytes = namespace_max_bytes or {}
+        self.low_water = low_water
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        # key -> [size, created, last accessed, hits, namespace]
+        self._meta: Dict[Any, list] = {}
+        self._pins = set()
+        self._pinned_namespaces = set()
+        self._bytes = 0
+        self._namespace_bytes: Dict[Optional[str], int] = {}
+        self.evictions = 0
+        self.expirations = 0
+        self._load_meta()
+        self.expire()
+        for namespace in self.namespace_max_bytes:
+            self._evict(namespace)
+        self._evict()
+
+    def _load_meta(self) -> None:
+        saved = {}
+        if self.meta_path is not None and self.meta_path.exists():
+            try:
+                with self.meta_path.open("rb") as f:
+                    data = pickle.load(f)
+                saved = data["entries"]
+                self._pins = set(data["pins"])
+                self._pinned_namespaces = set(data["pinned_namespaces"])
+            except Exception as e:
+                self.logger.warning(f"Failed to load cache metadata from {self.meta_path}: {e}")
+        now = time.time()
+        for key in self.store:
+            meta = saved.get(key)
+            if meta is None:
+                # Written before the store was bounded, or by another process
+                meta = [self.store.entry_size(key), now, now, 0, None]
+            self._add_meta(key, meta)
+
+    def _save_meta(self) -> None:
+        if self.meta_path is None:
+            return
+        with self._lock:
+            data = {"entries": self._meta, "pins": self._pins, "pinned_namespaces": self._pinned_namespaces}
+            tmp_path = self.meta_path.with_name(self.meta_path.name + ".tmp")
+            try:
+                self.meta_path.parent.mkdir(parents=True, exist_ok=True)
+                with tmp_path.open("wb") as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.meta_path)
+            except Exception as e:
+                self.logger.error(f"Failed to write cache metadata {self.meta_path}: {e}")
+
+    def _add_meta(self, key: Any, meta: list) -> None:
+        self._drop_meta(key)
+        self._meta[key] = meta
+        self._bytes += meta[_SIZE]
+        namespace = meta[_NAMESPACE]
+        self._namespace_bytes[namespace] = self._namespace_bytes.get(namespace, 0) + meta[_SIZE]
+
+    def _drop_meta(self, key: Any) -> None:
+        meta = self._meta.pop(key, None)
+        if meta is not None:
+            self._bytes -= meta[_SIZE]
+            self._namespace_bytes[meta[_NAMESPACE]] -= meta[_SIZE]
+
+    def _meta_for(self, key: Any) -> Optional[list]:
+        meta = self._meta.get(key)
+        if meta is None and key in self.store:
+            now = time.time()
+            meta = [self.store.entry_size(key), now, now, 0, None]
+            self._add_meta(key, meta)
+        return meta
+
+    def is_pinned(self, key: Any) -> bool:
+        """
+        Return True if key is pinned, or is in a pinned namespace.
+        """
+        if key in self._pins:
+            return True
+        meta = self._meta.get(key)
+        return meta is not None and meta[_NAMESPACE] in self._pinned_namespaces
+
+    def _expired(self, key: Any, meta: list, now: float) -> bool:
+        return self.ttl is not None and now - meta[_CREATED] > self.ttl and not self.is_pinned(key)
+
+    def _remove(self, key: Any) -> None:
+        try:
+            del self.store[key]
+        except KeyError:
+            pass
+        self._drop_meta(key)
+
+    def __getitem__(self, key: Any) -> Any:
+        with self._lock:
+            meta = self._meta_for(key)
+            if meta is None:
+                raise KeyError(key)
+            now = time.time()
+            if self._expired(key, meta, now):
+                self._remove(key)
+                self.expirations += 1
+                raise KeyError(key)
+            value = self.store[key]
+            meta[_ACCESSED] = now
+            meta[_HITS] += 1
+            return value
+
+    def put(self, key: Any, value: Any, namespace: Optional[str] = None) -> None:
+        """
+        Store value under key in namespace, then evict entries if a budget is exceeded.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            namespace (str, optional): The namespace of the entry (usually the model name).
+        """
+        with self._lock:
+            self.store[key] = value
+            now = time.time()
+            self._add_meta(key, [self.store.entry_size(key), now, now, 0, namespace])
+            self._evict(namespace, keep=key)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        with self._lock:
+            meta = self._meta.get(key)
+            self.put(key, value, meta[_NAMESPACE] if meta is not None else None)
+
+    def __delitem__(self, key: Any) -> None:
+        with self._lock:
+            del self.store[key]
+            self._drop_meta(key)
+
+    def __contains__(self, key: Any) -> bool:
+        with self._lock:
+            meta = self._meta_for(key)
+            return meta is not None and not self._expired(key, meta, time.time())
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            return iter(list(self._meta))
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    @property
+    def serialiser(self) -> str:
+        """The serialiser of the wrapped store."""
+        return self.store.serialiser
+
+    def _victims(self, keys: Any, keep: Any = None) -> list:
+        """
+        Return the unpinned keys among keys, other than keep, in eviction order.
+        """
+        if self.policy == "lru":
+            order = lambda key: self._meta[key][_ACCESSED]
+        else:
+            order = lambda key: (self._meta[key][_HITS], self._meta[key][_ACCESSED])
+        return sorted((key for key in keys if key != keep and not self.is_pinned(key)), key=order)
+
+    def _evict(self, namespace: Optional[str] = None, keep: Any = None) -> None:
+        """
+        Evict entries from namespace if it is over its budget, then from the whole cache if it is
+        over budget. The entry just written (keep) is not evicted, as under LFU it would always
+        be the first victim.
+        """
+        limit = self.namespace_max_bytes.get(namespace)
+        if limit is not None and self._namespace_bytes.get(namespace, 0) > limit:
+            target = self.low_water * limit
+            keys = [key for key, meta in self._meta.items() if meta[_NAMESPACE] == namespace]
+            for key in self._victims(keys, keep):
+                if self._namespace_bytes[namespace] <= target:
+                    break
+                self._remove(key)
+                self.evictions += 1
+        over_bytes = self.max_bytes is not None and self._bytes > self.max_bytes
+        over_entries = self.max_entries is not None and len(self._meta) > self.max_entries
+        if not (over_bytes or over_entries):
+            return
+        target_bytes = self.low_water * self.max_bytes if self.max_bytes is not None else None
+        target_entries = int(self.low_water * self.max_entries) if self.max_entries is not None else None
+        evicted = 0
+        for key in self._victims(list(self._meta), keep):
+            if (target_bytes is None or self._bytes <= target_bytes) and (target_entries is None or len(self._meta) <= target_entries):
+                break
+            self._remove(key)
+            evicted += 1
+        self.evictions += evicted
+        if (self.max_bytes is not None and self._bytes > self.max_bytes) or (self.max_entries is not None and len(self._meta) > self.max_entries):
+            self.logger.warning(f"Pinned cache entries exceed the cache budget ({self._bytes} bytes, {len(self._meta)} entries)")
+        if evicted:
+            self.logger.info(f"Evicted {evicted} cache entries ({self.policy}); {len(self._meta)} entries, {self._bytes} bytes remain")
+
+    def expire(self) -> int:
+        """
+        Remove all unpinned entries older than ttl.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            now = time.time()
+            expired = [key for key, meta in self._meta.items() if self._expired(key, meta, now)]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def pin(self, key: Any) -> None:
+        """
+        Pin key, so its entry is never evicted or expired.
+        """
+        with self._lock:
+            self._pins.add(key)
+            self._save_meta()
+
+    def unpin(self, key: Any) -> None:
+        """
+        Unpin key.
+        """
+        with self._lock:
+            self._pins.discard(key)
+            self._save_meta()
+
+    def pin_namespace(self, namespace: Optional[str]) -> None:
+        """
+        Pin every entry in namespace, including entries added later.
+        """
+        with self._lock:
+            self._pinned_namespaces.add(namespace)
+            self._save_meta()
+
+    def unpin_namespace(self, namespace: Optional[str]) -> None:
+        """
+        Unpin namespace (entries pinned individually stay pinned).
+        """
+        with self._lock:
+            self._pinned_namespaces.discard(namespace)
+            self._save_meta()
+
+    def namespaces(self) -> Dict[Optional[str], Dict[str, int]]:
+        """
+        Return the number of entries and bytes in each namespace.
+        """
+        with self._lock:
+            result: Dict[Optional[str], Dict[str, int]] = {}
+            for meta in self._meta.values():
+                counts = result.setdefault(meta[_NAMESPACE], {"entries": 0, "bytes": 0})
+                counts["entries"] += 1
+                counts["bytes"] += meta[_SIZE]
+            return result
+
+    def namespace_of(self, key: Any) -> Optional[str]:
+        """
+        Return the namespace of the entry for key (None if it was stored without one).
+
+        Raises:
+            KeyError: If key is not cached.
+        """
+        with self._lock:
+            return self._meta[key][_NAMESPACE]
+
+    def clear_namespace(self, namespace: Optional[str], include_pinned: bool = False) -> int:
+        """
+        Remove the entries in namespace.
+
+        Args:
+            namespace (str): The namespace.
+            include_pinned (bool): Whether to remove pinned entries too.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        with self._lock:
+            keys = [key for key, meta in self._meta.items()
+                    if meta[_NAMESPACE] == namespace and (include_pinned or not self.is_pinned(key))]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the number of entries, bytes, pinned entries, evictions and expirations.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._meta),
+                "bytes": self._bytes,
+                "pinned": sum(1 for key in self._meta if self.is_pinned(key)),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def compact(self) -> None:
+        """
+        Compact the underlying store.
+        """
+        self.store.compact()
+
+    def flush(self) -> None:
+        """
+        Flush the underlying store and save the entry metadata.
+        """
+        self.store.flush()
+        self._save_meta()
+
+    def close(self) -> None:
+        """
+        Save the entry metadata and close the underlying store.
+        """
+        self._save_meta()
+        self.store.close()
+
+
+@contextmanager
+def locked_file(f: Any):
+    """
+    Hold an exclusive advisory lock on an open file, so that appends from several processes do
+    not interleave. Does nothing where advisory locks are not available (e.g. Windows).
+
+    Args:
+        f: An open file object.
+    """
+    if fcntl is None:
+        yield f
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield f
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """
+    Fsync a directory so that a rename within it is durable. Not supported on all platforms.
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class PromptTable:
+    """
+    Append-only side table mapping prompt fingerprints to prompt texts.
+
+    Cache keys are content hashes, so the prompt text is not part of the key. This table keeps
+    each distinct prompt once (shared by all models and parameters) so that cached entries can
+    still be traced back to their prompts.
+
+    Each line of the file is `<fingerprint>\t<JSON-encoded prompt>`. Only fingerprints and line
+    offsets are held in memory; prompt texts are read on demand. With read_only=True the file is
+    only read, and add() raises ValueError.
+    """
+
+    def __init__(self, path: Union[Path, str], logger: Optional[Any] = None, read_only: bool = False):
+        """
+        Initialize the table, indexing an existing file if present.
+
+        Args:
+            path (Path or str): Path to the table file.
+            logger: Logger for warnings (optional).
+            read_only (bool): Whether to read the table without writing to it.
+        """
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        self._offsets: Dict[str, int] = {}
+        self._end = 0
+        if not read_only:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        with self.path.open("rb" if self.read_only else "r+b") as f, locked_file(f):
+            self._scan(f)
+
+    def _scan(self, f: Any) -> None:
+        """
+        Index the lines after the last indexed line. Must be called holding the file lock.
+
+        Appends hold the lock, so an incomplete last line can only come from an interrupted
+        write; it is truncated so the next append starts on a new line.
+        """
+        offset = self._end
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            fingerprint, sep, _ = line.partition(b"\t")
+            if sep:
+                self._offsets.setdefault(fingerprint.decode("ascii"), offset)
+            offset += len(line)
+        if offset < f.seek(0, os.SEEK_END) and not self.read_only:
+            self.logger.warning(f"Discarding incomplete last line of {self.path}")
+            f.truncate(offset)
+        self._end = offset
+
+    def add(self, fingerprint: str, prompt: str) -> None:
+        """
+        Store a prompt under its fingerprint unless it is already present.
+
+        Lines appended by other processes since the last add are indexed first, so a prompt
+        added by another process is not written again.
+
+        Args:
+            fingerprint (str): The prompt fingerprint.
+            prompt (str): The prompt text.
+        """
+        if self.read_only:
+            raise ValueError(f"'{self.path}' is open read-only.")
+        if fingerprint in self._offsets:
+            return
+        line = (fingerprint + "\t" + json.dumps(prompt, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if fingerprint in self._offsets:
+                return
+            with self.path.open("a+b") as f, locked_file(f):
+                self._scan(f)
+                if fingerprint in self._offsets:
+                    return
+                offset = f.seek(0, os.SEEK_END)
+                f.write(line)
+                f.flush()
+            self._offsets[fingerprint] = offset
+            self._end = offset + len(line)
+
+    def get(self, fingerprint: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Return the prompt text for a fingerprint, or default if it is not in the table.
+
+        Args:
+            fingerprint (str): The prompt fingerprint.
+            default (str, optional): Value returned if the fingerprint is unknown.
+        """
+        offset = self._offsets.get(fingerprint)
+        if offset is None and self.path.exists():
+            # It may have been added by another process
+            with self._lock:
+                self._load()
+            offset = self._offsets.get(fingerprint)
+        if offset is None:
+            return default
+        with self.path.open("rb") as f:
+            f.seek(offset)
+            line = f.readline()
+        return json.loads(line.partition(b"\t")[2])
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return fingerprint in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
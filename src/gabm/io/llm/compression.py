@@ -0,0 +1,193 @@
+"""
+Compression for cache segments and rolled JSONL logs.
+
+- Codecs: "none", "zlib" and "gzip" (standard library) and "zstd" (needs the optional
+  zstandard package: pip install gabm[compression]).
+- zlib and zstd can use a preset dictionary trained on sample records, which compresses small,
+  repetitive records such as persona and question prompts far better than compressing each alone.
+- Compressed log files are read and written with open_log(), chosen by file suffix (.gz or .zst).
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+from collections import Counter
+import gzip
+from io import TextIOWrapper
+from pathlib import Path
+import zlib
+from typing import Any, Iterable, Optional, Union
+
+CODECS = ("none", "zlib", "gzip", "zstd")
+# Largest useful zlib dictionary (the deflate window)
+ZLIB_MAX_DICTIONARY = 32768
+
+
+def _zstandard() -> Any:
+    # The import is done here to avoid requiring the zstandard package for users who do not use zstd.
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("The 'zstandard' package is required for zstd compression. Please install it with 'pip install zstandard'.")
+    return zstandard
+
+
+class Codec:
+    """
+    Compresses and decompresses byte strings, optionally with a preset dictionary.
+
+    Attributes:
+        name (str): One of CODECS.
+        codec_id (int): The codec's index in CODECS, as stored in file headers.
+        dictionary (bytes): The preset dictionary, or b"" for none.
+        level (int): Compression level (None for the codec's default).
+    """
+
+    def __init__(self, name: str, dictionary: bytes = b"", level: Optional[int] = None):
+        """
+        Initialize the codec.
+
+        Args:
+            name (str): One of CODECS.
+            dictionary (bytes): Preset dictionary (zlib and zstd only).
+            level (int, optional): Compression level.
+        """
+        if name not in CODECS:
+            raise ValueError(f"Unknown compression codec: {name}")
+        if dictionary and name not in ("zlib", "zstd"):
+            raise ValueError(f"The {name} codec does not support a dictionary.")
+        self.name = name
+        self.codec_id = CODECS.index(name)
+        self.dictionary = dictionary or b""
+        self.level = level
+        if name == "zstd":
+            zstandard = _zstandard()
+            kwargs = {"dict_data": zstandard.ZstdCompressionDict(self.dictionary)} if self.dictionary else {}
+            self._compressor = zstandard.ZstdCompressor(level=3 if level is None else level, **kwargs)
+            self._decompressor = zstandard.ZstdDecompressor(**kwargs)
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Return data compressed.
+        """
+        if self.name == "none":
+            return data
+        if self.name == "gzip":
+            return gzip.compress(data, compresslevel=9 if self.level is None else self.level, mtime=0)
+        if self.name == "zstd":
+            return self._compressor.compress(data)
+        level = zlib.Z_DEFAULT_COMPRESSION if self.level is None else self.level
+        if self.dictionary:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY, self.dictionary)
+        else:
+            compressor = zlib.compressobj(level)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        """
+        Return data decompressed.
+        """
+        if self.name == "none":
+            return data
+        if self.name == "gzip":
+            return gzip.decompress(data)
+        if self.name == "zstd":
+            return self._decompressor.decompress(data)
+        decompressor = zlib.decompressobj(zdict=self.dictionary) if self.dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+def get_codec(codec: Union[str, int, Codec, None], dictionary: bytes = b"", level: Optional[int] = None) -> Codec:
+    """
+    Return a Codec for a codec name, a codec id from a file header, or None (no compression).
+    A Codec is returned as it is.
+    """
+    if isinstance(codec, Codec):
+        return codec
+    if codec is None:
+        codec = "none"
+    if isinstance(codec, int):
+        if not 0 <= codec < len(CODECS):
+            raise ValueError(f"Unknown compression codec id: {codec}")
+        codec = CODECS[codec]
+    return Codec(codec, dictionary, level)
+
+
+def train_dictionary(samples: Iterable[bytes], codec: str = "zlib", size: Optional[int] = None) -> bytes:
+    """
+    Train a preset dictionary from sample records.
+
+    For zstd this uses zstandard's dictionary trainer. For zlib the dictionary is built from the
+    most frequently repeated samples, most frequent last (deflate finds nearby matches most cheaply).
+
+    Args:
+        samples (iterable of bytes): Sample records, e.g. serialised cache values.
+        codec (str): "zlib" or "zstd".
+        size (int, optional): Dictionary size in bytes. Defaults to 65536 for zstd and, for zlib, to a
+            twentieth of the sample bytes (at most 32768), so the dictionary stays small relative to the data.
+
+    Returns:
+        bytes: The dictionary (b"" if there are too few samples).
+    """
+    samples = [sample for sample in samples if sample]
+    if not samples:
+        return b""
+    if codec == "zstd":
+        zstandard = _zstandard()
+        try:
+            return zstandard.train_dictionary(size or 65536, samples).as_bytes()
+        except zstandard.ZstdError:
+            # Too few samples to train on
+            return b""
+    if codec != "zlib":
+        raise ValueError(f"The {codec} codec does not support a dictionary.")
+    if size is None:
+        size = sum(len(sample) for sample in samples) // 20
+    size = min(size, ZLIB_MAX_DICTIONARY)
+    counts = Counter(samples)
+    chosen = []
+    total = 0
+    for sample, _ in counts.most_common():
+        if total + len(sample) > size:
+            continue
+        chosen.append(sample)
+        total += len(sample)
+    return b"".join(reversed(chosen))
+
+
+def log_suffix(codec: str) -> str:
+    """
+    Return the file suffix for a log compressed with codec ("" for none).
+    """
+    return {"none": "", "zlib": ".gz", "gzip": ".gz", "zstd": ".zst"}[codec]
+
+
+def open_log(path: Union[Path, str], mode: str = "rt", level: Optional[int] = None) -> Any:
+    """
+    Open a JSONL log file, compressed or not according to its suffix (.gz, .zst or neither).
+
+    Args:
+        path (Path or str): The log file.
+        mode (str): "rt", "wt", "rb" or "wb".
+        level (int, optional): Compression level when writing.
+
+    Returns:
+        A file object.
+    """
+    path = Path(path)
+    text = "t" in mode
+    binary_mode = mode.replace("t", "").replace("b", "") + "b"
+    if path.suffix == ".gz":
+        f = gzip.open(path, binary_mode, compresslevel=9 if level is None else level)
+    elif path.suffix == ".zst":
+        zstandard = _zstandard()
+        if "r" in binary_mode:
+            f = zstandard.open(path, binary_mode)
+        else:
+            f = zstandard.open(path, binary_mode, cctx=zstandard.ZstdCompressor(level=3 if level is None else level))
+    else:
+        f = open(path, binary_mode)
+    return TextIOWrapper(f, encoding="utf-8") if text else f
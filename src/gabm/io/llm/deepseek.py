@@ -12,12 +12,32 @@ __author__ = ["Andy Turner <agdturner@gmail.com>"]
 __version__ = "0.3.0"
 __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
+# Standard library imports
+import json
 # DeepSeek client library
 from deepseek import DeepSeekAPI
 # LLM service base class
 from .llm_service import LLMService
 # Shared utilities for caching and logging
-from .utils import pre_send_check_and_cache, call_and_cache_response, cache_and_log, write_models_json_and_txt
+from .utils import make_cache_key, write_models_json_and_txt, create_http_session
+
+
+class PooledDeepSeekAPI(DeepSeekAPI):
+    """
+    DeepSeekAPI that posts requests through a keep-alive requests session instead of a new connection per call.
+    """
+    def __init__(self, api_key, session):
+        super().__init__(api_key=api_key)
+        self.session = session
+
+    def _post_request(self, api_url, payload, stream):
+        response = self.session.post(api_url, headers=self.headers, data=json.dumps(payload), stream=stream)
+        if response.status_code >= 300:
+            raise Exception(f"HTTP Error {response.status_code}: {response.text}")
+        return response
+
+    def close(self):
+        self.session.close()
 
 class DeepSeekService(LLMService):
     """
@@ -25,12 +45,19 @@ class DeepSeekService(LLMService):
     Handles prompt sending, response caching, logging, and model listing.
     """
     SERVICE_NAME = "deepseek"
+    DEFAULT_MODEL = "deepseek-model-1"
+
+    def _create_client(self, api_key):
+        """
+        Create a DeepSeek client backed by a pooled, keep-alive session.
+        """
+        return PooledDeepSeekAPI(api_key, create_http_session(self.pool_size))
 
     @staticmethod
     def simple_extract_text(response):
         return str(response)
 
-    def send(self, api_key, message, model="deepseek-model-1"):
+    def send(self, api_key, message, model=DEFAULT_MODEL):
         """
         Send a prompt to DeepSeek and return the response object.
         Caches and logs the response for reproducibility.
@@ -44,12 +71,12 @@ class DeepSeekService(LLMService):
             Response object (dict) or None on error.
         
         """
-        cached = pre_send_check_and_cache(api_key, message, model, self.cache, self.logger, self.SERVICE_NAME, self.API_KEY_ENV_VAR)
+        cached = self._pre_send_check_and_cache(api_key, message, model)
         if cached is not None:
             return cached
-        cache_key = (message, model)
+        cache_key = make_cache_key(message, model)
         try:
-            client = DeepSeekAPI(api_key=api_key)
+            client = self._get_client(api_key)
         except Exception as e:
             self.logger.error(f"[deepseek] Could not initialize DeepSeekAPI: {e}")
             return None
@@ -58,22 +85,7 @@ class DeepSeekService(LLMService):
             if model:
                 kwargs["model"] = model
             return client.chat_completion(**kwargs)
-        return self._call_with_error_handling(
-            call_and_cache_response,
-            api_call,
-            cache_and_log,
-            self.cache,
-            cache_key,
-            self.cache_path,
-            self.jsonl_path,
-            message,
-            model,
-            api_key,
-            self.logger,
-            self.SERVICE_NAME,
-            self.list_available_models,
-            extract_text_from_response=self.simple_extract_text
-        )
+        return self._call_and_cache_response(api_call, cache_key, message, model, api_key)
 
     def list_available_models(self, api_key):
         """
@@ -87,7 +99,7 @@ class DeepSeekService(LLMService):
 
         """
         def api_call():
-            client = DeepSeekAPI(api_key=api_key)
+            client = self._get_client(api_key)
             models = client.get_models()
             self.logger.info(f"Raw model list from DeepSeek: {models}")
             def formatter(model):
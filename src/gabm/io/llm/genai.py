@@ -17,12 +17,14 @@ import ast
 # Google Generative AI client library
 #import google.generativeai as genai
 import google.genai as genai
+from google.genai import types as genai_types
+import httpx
 # OpenAI-compatible client for dynamic model listing
 from openai import OpenAI
 # LLM service base class
 from .llm_service import LLMService
 # Shared utilities for caching and logging
-from .utils import pre_send_check_and_cache, call_and_cache_response, cache_and_log, write_models_json_and_txt
+from .utils import make_cache_key, write_models_json_and_txt
 
 class GenAIService(LLMService):
     """
@@ -30,12 +32,51 @@ class GenAIService(LLMService):
     Handles prompt sending, response caching, logging, and model listing.
     """
     SERVICE_NAME = "genai"
+    DEFAULT_MODEL = "models/gemini-2.5-flash"
+
+    def _create_client(self, api_key):
+        """
+        Create a GenAI client whose HTTP connections are kept alive and reused.
+        """
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return genai.Client(
+            api_key=api_key,
+            http_options=genai_types.HttpOptions(client_args={"limits": limits})
+        )
+
+    def _create_async_client(self, api_key):
+        """
+        Create an async GenAI client whose HTTP connections are kept alive and reused.
+        """
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return genai.Client(
+            api_key=api_key,
+            http_options=genai_types.HttpOptions(async_client_args={"limits": limits})
+        ).aio
+
+    @staticmethod
+    def _to_dict(response):
+        """
+        Convert a GenAI response to a dict for caching, if possible.
+        """
+        if hasattr(response, 'to_dict'):
+            return response.to_dict()
+        elif hasattr(response, '__dict__'):
+            return dict(response.__dict__)
+        else:
+            return response
 
     @staticmethod
     def simple_extract_text(response):
         return str(response)
 
-    def send(self, api_key, message, model="models/gemini-2.5-flash"):
+    def _response_text(self, response):
+        """
+        Extract the response text from a GenAI response dict for an LLMResponse.
+        """
+        return self.extract_text_from_response(response)
+
+    def send(self, api_key, message, model=DEFAULT_MODEL):
         """
         Send a prompt to Google Generative AI and return the response object.
         Caches and logs the response for reproducibility.
@@ -43,46 +84,51 @@ class GenAIService(LLMService):
         Args:
             api_key (str): Google API key.
             message (str): Prompt to send.
-            model (str): Model name (default: "models/gemini-2.5-pro").
+            model (str): Model name (default: "models/gemini-2.5-flash").
         
         Returns:
             Response object (dict) or None on error.
         
         """
-        cached = pre_send_check_and_cache(api_key, message, model, self.cache, self.logger, self.SERVICE_NAME, self.API_KEY_ENV_VAR)
+        cached = self._pre_send_check_and_cache(api_key, message, model)
         if cached is not None:
             return cached
-        cache_key = (message, model)
+        cache_key = make_cache_key(message, model)
         def api_call():
-            client = genai.Client(api_key=api_key)
+            client = self._get_client(api_key)
             response = client.models.generate_content(
                 model=model,
                 contents={"text": message}
             )
-            client.close()
-            # Convert to dict if possible
-            if hasattr(response, 'to_dict'):
-                return response.to_dict()
-            elif hasattr(response, '__dict__'):
-                return dict(response.__dict__)
-            else:
-                return response
-        return self._call_with_error_handling(
-            call_and_cache_response,
-            api_call,
-            cache_and_log,
-            self.cache,
-            cache_key,
-            self.cache_path,
-            self.jsonl_path,
-            message,
-            model,
-            api_key,
-            self.logger,
-            self.SERVICE_NAME,
-            self.list_available_models,
-            extract_text_from_response=self.simple_extract_text
-        )
+            return self._to_dict(response)
+        return self._call_and_cache_response(api_call, cache_key, message, model, api_key)
+
+    async def asend(self, api_key, message, model=DEFAULT_MODEL):
+        """
+        Asynchronously send a prompt to Google Generative AI and return the response object.
+        Shares the cache and log with send(); cache hits return without awaiting the network.
+
+        Args:
+            api_key (str): Google API key.
+            message (str): Prompt to send.
+            model (str): Model name (default: "models/gemini-2.5-flash").
+
+        Returns:
+            Response object (dict) or None on error.
+
+        """
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        cache_key = make_cache_key(message, model)
+        async def api_call():
+            client = self._get_async_client(api_key)
+            response = await client.models.generate_content(
+                model=model,
+                contents={"text": message}
+            )
+            return self._to_dict(response)
+        return await self._acall_and_cache_response(api_call, cache_key, message, model, api_key)
 
     def list_available_models(self, api_key):
         """
@@ -9,35 +9,245 @@ __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
 
 # Standard library imports
+import asyncio
+import contextlib
+import inspect
 import os
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 # Shared utilities for caching and logging
 from gabm.utils.logging import setup_module_logger
-from .utils import write_models_json_and_txt, get_llm_cache_paths, load_llm_cache, cache_and_log, pre_send_check_and_cache, call_and_cache_response
+from .bundle import LayeredCacheStore
+from .cache import PromptTable
+from .log_writer import JSONLLogWriter
+from .near_duplicate import NearDuplicateIndex
+from .response import LLMResponse
+from .rate_limit import RateLimiter, estimate_tokens, is_rate_limit_error, response_token_usage
+from .single_flight import SingleFlight
+from .telemetry import CallTimer, Telemetry
+from .utils import write_models_json_and_txt, get_llm_cache_paths, get_prompt_table_path, get_near_duplicate_index_path, load_llm_cache, cache_and_log, pre_send_check_and_cache, call_and_cache_response, acall_and_cache_response, make_cache_key
 
 
 class LLMService(ABC):
     """
     Abstract base class for LLM service modules. Provides shared cache management, logging, and model list utilities.
     Subclasses must implement the send() and list_available_models() methods.
+    Subclasses with an async client should also override asend().
     """
     SERVICE_NAME = None  # Should be overridden by subclasses
+    DEFAULT_MODEL = None  # Model used when none is given
 
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, cache_backend="segment", cache_options=None, log_options=None, pool_size=10, rate_limits=None, near_duplicates=None, cache_limits=None, compact_responses=False, keep_raw=False, cache_bundles=None, telemetry=None):
         """
         Initialize the LLM service, setting up logger, cache paths, and loading cache.
+
+        Args:
+            logger (optional):
+                Logger to use. Defaults to a module logger writing to data/logs/llm/<service>.log.
+            cache_backend (str):
+                Cache store backend passed to load_llm_cache ("segment", "sqlite" or "pickle"; use "sqlite" to share the cache between processes).
+            cache_options (dict, optional):
+                Extra keyword arguments for the cache store (e.g. {"lazy": True, "hot_cache_size": 4096}
+                to load only keys at startup and deserialise cached responses on demand,
+                {"compression": "zlib", "dictionary": True} to compress cached responses, or
+                {"serialiser": "json"} for a new cache that does not use pickle, which implies compact_responses).
+            log_options (dict, optional):
+                Extra keyword arguments for the JSONL log writer (max_queue_size, batch_size,
+                flush_interval, fsync, max_bytes, compression).
+            pool_size (int):
+                Maximum number of keep-alive connections held by each API client.
+            rate_limits (dict or RateLimiter, optional):
+                Keyword arguments for the RateLimiter (requests_per_minute, tokens_per_minute,
+                model_limits, max_retries, base_delay, max_delay), or a RateLimiter to share
+                with other services. By default requests are not limited, but rate limit errors
+                are still retried with backoff.
+            near_duplicates (dict or NearDuplicateIndex, optional):
+                Keyword arguments for a NearDuplicateIndex (slot_tolerance, embed, threshold), or an
+                index to use. If given, responses are indexed by prompt template so that
+                send_similar() can reuse them for equivalent prompts. Off by default.
+            cache_limits (dict, optional):
+                Keyword arguments for a BoundedCacheStore (max_bytes, max_entries, ttl, policy,
+                namespace_max_bytes, low_water) that keeps the cache within a budget, evicting
+                unpinned entries. Entries are namespaced by model. By default the cache is unbounded.
+            compact_responses (bool):
+                If True, send() returns and caches an LLMResponse (text, finish reason, token usage,
+                model and latency) instead of the provider's response object, which makes the cache
+                much smaller and faster to load. Entries cached earlier are returned as they were stored.
+            keep_raw (bool):
+                With compact_responses, also keep the full provider payload in each LLMResponse,
+                as compressed JSON.
+            cache_bundles (list, optional):
+                Paths to read-only cache bundles (see bundle.export_bundle), e.g. on a shared file system.
+                Responses missing from the local cache are served from the bundles, which are
+                memory-mapped rather than copied or loaded; new responses go to the local cache.
+            telemetry (dict or Telemetry, optional):
+                Keyword arguments for a Telemetry (prices, buckets), or a Telemetry to share with
+                other services. Per-call latency, queue wait, tokens, estimated cost, cache hits and
+                retries are recorded per model; see stats().
         """
         if self.SERVICE_NAME is None:
             raise ValueError("SERVICE_NAME must be set in subclass.")
         self.logger = logger or setup_module_logger(__name__, f"{self.SERVICE_NAME}.log")
         self.cache_path, self.jsonl_path = get_llm_cache_paths(self.SERVICE_NAME)
-        self.cache = load_llm_cache(self.cache_path, self.logger)
+        self.cache = self._open_cache(cache_backend, cache_options, cache_limits, cache_bundles)
+        self.prompt_table = self._open_prompt_table()
+        self.log_writer = self._open_log_writer(log_options)
+        self.pool_size = pool_size
+        if isinstance(rate_limits, RateLimiter):
+            self.rate_limiter = rate_limits
+        else:
+            self.rate_limiter = RateLimiter(logger=self.logger, **(rate_limits or {}))
+        # Rate limiters set with using_rate_limiter(), per thread
+        self._rate_limiter_override = threading.local()
+        self.single_flight = SingleFlight()
+        if isinstance(telemetry, Telemetry):
+            self.telemetry = telemetry
+        else:
+            self.telemetry = Telemetry(**(telemetry or {}))
+        # A pickle-free cache can only hold compact records
+        self.compact_responses = compact_responses or self.cache.serialiser == "json"
+        self.keep_raw = keep_raw
+        if near_duplicates is None or isinstance(near_duplicates, NearDuplicateIndex):
+            self.near_duplicates = near_duplicates
+        else:
+            self.near_duplicates = NearDuplicateIndex(
+                get_near_duplicate_index_path(self.cache_path), logger=self.logger, **near_duplicates
+            )
+        self._clients = {}
+        self._async_clients = {}
+        self._clients_lock = threading.Lock()
+
+    def _open_cache(self, backend, options, limits, bundles):
+        """
+        Open the service's cache store, with any cache bundles layered behind it.
+        """
+        cache = load_llm_cache(self.cache_path, self.logger, backend=backend, limits=limits, **(options or {}))
+        if bundles:
+            cache = LayeredCacheStore(cache, bundles, self.logger)
+        return cache
+
+    def _open_prompt_table(self):
+        """
+        Open the side table in which prompt texts are stored once, or return None to keep them in the log.
+        """
+        return PromptTable(get_prompt_table_path(self.cache_path), self.logger)
+
+    def _open_log_writer(self, log_options):
+        """
+        Create the background JSONL log writer. It opens the log with its first write.
+        """
+        return JSONLLogWriter(self.jsonl_path, logger=self.logger, **(log_options or {}))
+
+    def flush(self):
+        """
+        Block until all queued JSONL log entries are written and the cache is flushed to disk.
+        """
+        self.log_writer.flush()
+        self.cache.flush()
+
+    def close(self):
+        """
+        Close the API clients, then flush and close the JSONL log writer and the cache.
+        The service cannot send afterwards.
+        """
+        with self._clients_lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            # Async clients belong to an event loop and are closed by aclose(); drop any left over
+            self._async_clients.clear()
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                self.logger.warning(f"[{self.SERVICE_NAME}] Error closing client: {e}")
+        self.log_writer.close()
+        self.cache.close()
+
+    async def aclose(self):
+        """
+        Close the async API clients created in the running event loop, then close the service.
+        """
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            clients = [client for client_loop, client in self._async_clients.values() if client_loop is loop]
+            self._async_clients.clear()
+        for client in clients:
+            try:
+                close = getattr(client, "aclose", None) or client.close
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.logger.warning(f"[{self.SERVICE_NAME}] Error closing async client: {e}")
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     @property
     def API_KEY_ENV_VAR(self):
         """Environment variable name for the API key."""
         return self.SERVICE_NAME.upper() + "_API_KEY"
 
+    def get_api_key(self):
+        """Return the API key from the API_KEY_ENV_VAR environment variable, or None if it is not set."""
+        return os.environ.get(self.API_KEY_ENV_VAR)
+
+    def get_default_model(self):
+        """Return the model used when none is given."""
+        return self.DEFAULT_MODEL
+
+    def pin(self, message, model=None):
+        """
+        Pin the cached response for a prompt, so it is never evicted or expired.
+        To pin every response from a model use self.cache.pin_namespace(model).
+
+        Args:
+            message (str): The prompt.
+            model (str, optional): The model (default: DEFAULT_MODEL).
+
+        Raises:
+            ValueError: If the service was created without cache_limits.
+        """
+        if not hasattr(self.cache, "pin"):
+            raise ValueError(f"{self.SERVICE_NAME} service was created without cache_limits.")
+        self.cache.pin(make_cache_key(message, model or self.DEFAULT_MODEL))
+
+    @contextlib.contextmanager
+    def using_rate_limiter(self, rate_limiter):
+        """
+        Make API calls from the current thread go through rate_limiter instead of self.rate_limiter
+        within the block. Calls from other threads are not affected.
+
+        Args:
+            rate_limiter (RateLimiter or None): The rate limiter to use (None to keep self.rate_limiter).
+        """
+        previous = getattr(self._rate_limiter_override, "rate_limiter", None)
+        self._rate_limiter_override.rate_limiter = rate_limiter
+        try:
+            yield self
+        finally:
+            self._rate_limiter_override.rate_limiter = previous
+
+    def _current_rate_limiter(self):
+        """
+        Return the rate limiter for an API call from the current thread (see using_rate_limiter()).
+        """
+        return getattr(self._rate_limiter_override, "rate_limiter", None) or self.rate_limiter
+
+    def stats(self):
+        """
+        Return this service's telemetry per model: calls, errors, retries, cache hits and misses,
+        coalesced calls, tokens in and out, estimated cost, and latency and queue wait summaries.
+        Use self.telemetry.to_prometheus() for the Prometheus text format.
+        """
+        return self.telemetry.stats(self.SERVICE_NAME)
+
     @abstractmethod
     def send(self, api_key, message, model=None):
         """
@@ -57,6 +267,261 @@ class LLMService(ABC):
         """
         pass
 
+    async def asend(self, api_key, message, model=None):
+        """
+        Asynchronously send a prompt to the LLM and return the response object.
+
+        Cache hits return without awaiting the network. This default runs send() in a worker
+        thread; services with a native async client override it.
+
+        Args:
+            api_key (str):
+                The API key for the LLM service.
+            message (str):
+                The message to send.
+            model (str, optional):
+                The model to use for the request (default: DEFAULT_MODEL).
+
+        Returns:
+            The response object from the LLM.
+
+        """
+        model = model or self.DEFAULT_MODEL
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        args = (model,) if model else ()
+        return await asyncio.to_thread(self.send, api_key, message, *args)
+
+    def send_similar(self, api_key, message, model=None, slot_tolerance=None, threshold=None):
+        """
+        Send a prompt, reusing the cached response of an equivalent prompt if there is one.
+
+        An exact cache hit is returned first. Otherwise the near-duplicate index is searched for a
+        prompt with the same template (differing only in whitespace, sentence order, or numbers
+        within slot_tolerance) or, with an embedding function, a similarity of at least threshold.
+        If nothing matches the prompt is sent with send().
+
+        Args:
+            api_key (str):
+                The API key for the LLM service.
+            message (str):
+                The message to send.
+            model (str, optional):
+                The model to use for the request (default: DEFAULT_MODEL).
+            slot_tolerance (float, optional):
+                Overrides the index's largest allowed difference between numbers in the prompts.
+            threshold (float, optional):
+                Overrides the index's minimum embedding similarity.
+
+        Returns:
+            The response object from the LLM.
+
+        Raises:
+            ValueError: If the service was created without near_duplicates.
+
+        """
+        if self.near_duplicates is None:
+            raise ValueError(f"{self.SERVICE_NAME} service was created without near_duplicates.")
+        model = model or self.DEFAULT_MODEL
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        cache_key = self.near_duplicates.lookup(message, model, slot_tolerance=slot_tolerance, threshold=threshold)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.logger.info(f"Near-duplicate cache hit for model={model}, message={message}")
+                self.telemetry.record_cache_hit(self.SERVICE_NAME, model)
+                return cached
+        args = (model,) if model else ()
+        return self.send(api_key, message, *args)
+
+    def _plan_many(self, api_key, messages, model):
+        """
+        Deduplicate messages and serve cache hits for send_many() and asend_many().
+
+        Returns:
+            tuple: (results with cache hits filled in, {cache key: [positions]} for the misses, {cache key: message})
+
+        """
+        results = [None] * len(messages)
+        positions = {}
+        unique = {}
+        for i, message in enumerate(messages):
+            cache_key = make_cache_key(message, model)
+            positions.setdefault(cache_key, []).append(i)
+            unique.setdefault(cache_key, message)
+        pending = {}
+        for cache_key, message in unique.items():
+            cached = self._pre_send_check_and_cache(api_key, message, model)
+            if cached is not None:
+                for i in positions[cache_key]:
+                    results[i] = cached
+            else:
+                pending[cache_key] = positions[cache_key]
+        return results, pending, unique
+
+    def send_many(self, api_key, messages, model=None, max_concurrency=8):
+        """
+        Send many prompts, with at most max_concurrency requests in flight, and return the responses in input order.
+
+        Duplicate prompts (equal cache keys) are sent once, and cache hits are served without a request.
+        Misses are sent concurrently from a thread pool using send(), so they are cached and logged as usual.
+
+        Args:
+            api_key (str):
+                The API key for the LLM service.
+            messages (list of str):
+                The messages to send.
+            model (str, optional):
+                The model to use for the requests (default: DEFAULT_MODEL).
+            max_concurrency (int):
+                Maximum number of requests in flight at once.
+
+        Returns:
+            list: The response for each message, in the same order as messages (None for failed requests).
+
+        """
+        model = model or self.DEFAULT_MODEL
+        results, pending, unique = self._plan_many(api_key, messages, model)
+        if pending:
+            args = (model,) if model else ()
+            keys = list(pending)
+            with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(keys)))) as executor:
+                responses = executor.map(lambda cache_key: self.send(api_key, unique[cache_key], *args), keys)
+                for cache_key, response in zip(keys, responses):
+                    for i in pending[cache_key]:
+                        results[i] = response
+        return results
+
+    async def asend_many(self, api_key, messages, model=None, max_concurrency=8):
+        """
+        Async counterpart of send_many(): misses are sent with asend(), at most max_concurrency at once.
+
+        Args:
+            api_key (str):
+                The API key for the LLM service.
+            messages (list of str):
+                The messages to send.
+            model (str, optional):
+                The model to use for the requests (default: DEFAULT_MODEL).
+            max_concurrency (int):
+                Maximum number of requests in flight at once.
+
+        Returns:
+            list: The response for each message, in the same order as messages (None for failed requests).
+
+        """
+        model = model or self.DEFAULT_MODEL
+        results, pending, unique = self._plan_many(api_key, messages, model)
+        if pending:
+            args = (model,) if model else ()
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+            async def send_one(cache_key):
+                async with semaphore:
+                    return await self.asend(api_key, unique[cache_key], *args)
+            keys = list(pending)
+            responses = await asyncio.gather(*(send_one(cache_key) for cache_key in keys))
+            for cache_key, response in zip(keys, responses):
+                for i in pending[cache_key]:
+                    results[i] = response
+        return results
+
+    def send_stream(self, api_key, message, model=None, on_text=None, stop=None):
+        """
+        Send a prompt and stream the response text, optionally stopping generation early.
+
+        Each text chunk is passed to on_text as it arrives. After each chunk, stop is called with
+        the text so far; if it returns True the stream is closed, which ends generation, and the
+        text so far is returned. An AnswerMatcher makes a good stop hook for closed-answer questions.
+
+        Streamed texts are cached separately from send() responses, keyed on the stop hook's
+        cache_key; with a stop hook that has no cache_key the text is not cached.
+        Cached, coalesced or non-streamed texts are passed to on_text in one chunk.
+
+        Args:
+            api_key (str):
+                The API key for the LLM service.
+            message (str):
+                The message to send.
+            model (str, optional):
+                The model to use for the request (default: DEFAULT_MODEL).
+            on_text (callable, optional):
+                Called with each text chunk.
+            stop (callable, optional):
+                Early-stop hook, called with the text so far.
+
+        Returns:
+            str: The response text, or None or an error dict on error.
+
+        """
+        model = model or self.DEFAULT_MODEL
+        if stop is None:
+            params = {"stream": True}
+        elif getattr(stop, "cache_key", None) is not None:
+            params = {"stream": True, "stop": list(stop.cache_key)}
+        else:
+            params = None
+        emitted = []
+        def emit(chunk):
+            emitted.append(chunk)
+            if on_text is not None:
+                on_text(chunk)
+        def api_call():
+            text = ""
+            stream = self._stream(api_key, message, model)
+            try:
+                for chunk in stream:
+                    text += chunk
+                    emit(chunk)
+                    if stop is not None and stop(text):
+                        self.logger.info(f"[{self.SERVICE_NAME}] Stopped stream early after {len(text)} characters.")
+                        break
+            finally:
+                stream.close()
+            return text
+        # A cached send() response is not used, as it was not cut short by stop
+        self._check_api_key(api_key)
+        if params is None:
+            timer = CallTimer()
+            text = self._call_with_error_handling(
+                lambda: self._current_rate_limiter().call(timer.wrap(api_call), model, estimate_tokens(message))
+            )
+            self.telemetry.record_call(self.SERVICE_NAME, model, timer, text, message)
+        else:
+            cache_key = make_cache_key(message, model, params)
+            text = self.cache.get(cache_key)
+            if text is None:
+                text = self._call_and_cache_response(api_call, cache_key, message, model, api_key, compact=False)
+            else:
+                self.telemetry.record_cache_hit(self.SERVICE_NAME, model)
+        if isinstance(text, str) and not emitted:
+            emit(text)
+        return text
+
+    def _stream(self, api_key, message, model):
+        """
+        Return an iterator over the response text chunks for a prompt. The iterator must stop
+        generation when closed. Services with a streaming API override this; by default the
+        whole response from send() is returned as one chunk.
+
+        Args:
+            api_key (str): The API key for the LLM service.
+            message (str): The message to send.
+            model (str): The model to use.
+
+        Returns:
+            An iterator (generator) of str.
+
+        """
+        def chunks():
+            response = self.send(api_key, message, model)
+            if response is None or (isinstance(response, dict) and "error" in response):
+                raise RuntimeError(f"{self.SERVICE_NAME} request failed: {response}")
+            yield self.simple_extract_text(response)
+        return chunks()
+
     @abstractmethod
     def list_available_models(self, api_key):
         """
@@ -71,6 +536,315 @@ class LLMService(ABC):
         """
         pass
     
+    def _create_client(self, api_key):
+        """
+        Create the API client (or HTTP session) for an API key. Subclasses that call an API override this.
+        The client should pool up to self.pool_size keep-alive connections.
+
+        Args:
+            api_key (str): The API key for the LLM service.
+
+        Returns:
+            The client. It is closed with client.close() when the service is closed.
+
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not create API clients.")
+
+    def _get_client(self, api_key):
+        """
+        Return the client for an API key, creating it on first use and reusing it afterwards.
+
+        Args:
+            api_key (str): The API key for the LLM service.
+
+        Returns:
+            The client.
+
+        """
+        client = self._clients.get(api_key)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(api_key)
+                if client is None:
+                    client = self._create_client(api_key)
+                    self._clients[api_key] = client
+        return client
+
+    def _create_async_client(self, api_key):
+        """
+        Create the async API client for an API key. Subclasses with a native asend() override this.
+
+        Args:
+            api_key (str): The API key for the LLM service.
+
+        Returns:
+            The async client. It is closed with aclose() (or an awaitable close()) by LLMService.aclose().
+
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not create async API clients.")
+
+    def _get_async_client(self, api_key):
+        """
+        Return the async client for an API key in the running event loop, creating it on first use.
+        Async clients cannot be shared between event loops, so a new loop gets a new client.
+
+        Args:
+            api_key (str): The API key for the LLM service.
+
+        Returns:
+            The async client.
+
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(api_key)
+        if entry is None or entry[0] is not loop:
+            with self._clients_lock:
+                entry = self._async_clients.get(api_key)
+                if entry is None or entry[0] is not loop:
+                    entry = (loop, self._create_async_client(api_key))
+                    self._async_clients[api_key] = entry
+        return entry[1]
+
+    @staticmethod
+    def simple_extract_text(response):
+        """Extract the response text for logging. Subclasses override this for their response types."""
+        return str(response)
+
+    def _check_api_key(self, api_key):
+        """
+        Check that an API key was given and set the service's API key environment variable.
+        Services that need no API key override this to do nothing.
+
+        Args:
+            api_key (str): The API key for the LLM service.
+
+        Raises:
+            RuntimeError: If api_key is empty.
+
+        """
+        if not api_key:
+            self.logger.error(f"{self.SERVICE_NAME} API key must be provided.")
+            raise RuntimeError(f"{self.SERVICE_NAME} API key must be provided.")
+        os.environ[self.API_KEY_ENV_VAR] = api_key
+
+    def _pre_send_check_and_cache(self, api_key, message, model):
+        """
+        Check the API key and return the cached response for (message, model), or None on a miss.
+
+        Args:
+            api_key (str): The API key for the LLM service.
+            message (str): The message to send.
+            model (str): The model to use.
+
+        Returns:
+            The cached response or None.
+
+        """
+        cached = pre_send_check_and_cache(
+            api_key, message, model, self.cache, self.logger, self.SERVICE_NAME, self.API_KEY_ENV_VAR
+        )
+        if cached is not None:
+            self.telemetry.record_cache_hit(self.SERVICE_NAME, model)
+        return cached
+
+    def _response_text(self, response):
+        """
+        Extract the response text from a provider response for an LLMResponse.
+        Defaults to simple_extract_text(); services whose text needs more work override this.
+        """
+        return self.simple_extract_text(response)
+
+    def to_llm_response(self, response, model, latency=None):
+        """
+        Convert a provider response to a compact LLMResponse (see compact_responses).
+
+        Args:
+            response: The provider response.
+            model (str): The model requested.
+            latency (float, optional): Seconds the request took.
+
+        Returns:
+            LLMResponse: The record, or response itself if it is None, an error dict or already an LLMResponse.
+
+        """
+        if response is None or isinstance(response, LLMResponse) or (isinstance(response, dict) and "error" in response):
+            return response
+        return LLMResponse.from_raw(response, self._response_text(response), model=model, latency=latency, keep_raw=self.keep_raw)
+
+    def _compacting(self, api_call, model):
+        """
+        Wrap api_call so that it returns an LLMResponse with the call's latency, if compact_responses is set.
+        """
+        if not self.compact_responses:
+            return api_call
+        def compact_call():
+            start = time.monotonic()
+            response = api_call()
+            return self.to_llm_response(response, model, time.monotonic() - start)
+        return compact_call
+
+    def _acompacting(self, api_call, model):
+        """
+        Async counterpart of _compacting().
+        """
+        if not self.compact_responses:
+            return api_call
+        async def compact_call():
+            start = time.monotonic()
+            response = await api_call()
+            return self.to_llm_response(response, model, time.monotonic() - start)
+        return compact_call
+
+    def _call_and_cache_response(self, api_call, cache_key, message, model, api_key, compact=True):
+        """
+        Call the API within the rate limits, then cache and log the response.
+        Rate limit errors are retried with backoff (see RateLimiter.call). Errors are logged and
+        reported as None or an error dict.
+        Concurrent calls with the same cache key are coalesced: only the first calls the API
+        and the others return its result (see SingleFlight).
+
+        Args:
+            api_call (callable): Function that performs the API call and returns the response.
+            cache_key (str): The cache key, from make_cache_key(message, model).
+            message (str): The message sent.
+            model (str): The model used.
+            api_key (str): The API key (for model listing on error).
+            compact (bool): Whether the response may be converted to an LLMResponse (see compact_responses).
+
+        Returns:
+            The response object, or None or an error dict on error.
+
+        """
+        tokens = estimate_tokens(message)
+        if compact:
+            api_call = self._compacting(api_call, model)
+        led = []
+        def leader_call():
+            led.append(True)
+            # A call with this key may have completed since the caller's cache lookup
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.telemetry.record_cache_hit(self.SERVICE_NAME, model)
+                return cached
+            timer = CallTimer()
+            def limited_call():
+                return self._current_rate_limiter().call(timer.wrap(api_call), model, tokens, usage=response_token_usage)
+            result = self._call_with_error_handling(
+                call_and_cache_response,
+                limited_call,
+                cache_and_log,
+                self.cache,
+                cache_key,
+                self.cache_path,
+                self.jsonl_path,
+                message,
+                model,
+                api_key,
+                self.logger,
+                self.SERVICE_NAME,
+                self.list_available_models,
+                extract_text_from_response=self.simple_extract_text,
+                prompt_table=self.prompt_table,
+                log_writer=self.log_writer
+            )
+            self.telemetry.record_call(self.SERVICE_NAME, model, timer, result, message, self._response_text)
+            self._index_near_duplicate(cache_key, message, model, result)
+            return result
+        result = self.single_flight.do(cache_key, leader_call)
+        if not led:
+            self.telemetry.record_coalesced(self.SERVICE_NAME, model)
+        return result
+
+    async def _acall_and_cache_response(self, api_call, cache_key, message, model, api_key):
+        """
+        Async counterpart of _call_and_cache_response: awaits api_call(), then caches and logs the response.
+        Coalesces with in-flight calls from other tasks and threads.
+
+        Args:
+            api_call (callable): Coroutine function that performs the API call and returns the response.
+            cache_key (str): The cache key, from make_cache_key(message, model).
+            message (str): The message sent.
+            model (str): The model used.
+            api_key (str): The API key (for model listing on error).
+
+        Returns:
+            The response object, or None or an error dict on error.
+
+        """
+        tokens = estimate_tokens(message)
+        api_call = self._acompacting(api_call, model)
+        led = []
+        async def leader_call():
+            led.append(True)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.telemetry.record_cache_hit(self.SERVICE_NAME, model)
+                return cached
+            timer = CallTimer()
+            async def limited_call():
+                return await self._current_rate_limiter().acall(timer.awrap(api_call), model, tokens, usage=response_token_usage)
+            try:
+                result = await acall_and_cache_response(
+                    limited_call,
+                    cache_and_log,
+                    self.cache,
+                    cache_key,
+                    self.cache_path,
+                    self.jsonl_path,
+                    message,
+                    model,
+                    api_key,
+                    self.logger,
+                    self.SERVICE_NAME,
+                    self.list_available_models,
+                    extract_text_from_response=self.simple_extract_text,
+                    prompt_table=self.prompt_table,
+                    log_writer=self.log_writer
+                )
+            except Exception as e:
+                result = self._error_result(e)
+                self.telemetry.record_call(self.SERVICE_NAME, model, timer, result, message)
+                return result
+            self.telemetry.record_call(self.SERVICE_NAME, model, timer, result, message, self._response_text)
+            self._index_near_duplicate(cache_key, message, model, result)
+            return result
+        result = await self.single_flight.ado(cache_key, leader_call)
+        if not led:
+            self.telemetry.record_coalesced(self.SERVICE_NAME, model)
+        return result
+
+    def _index_near_duplicate(self, cache_key, message, model, result):
+        """
+        Add a newly cached send() response to the near-duplicate index, if there is one.
+        Streamed texts (cached under other keys) and errors are not indexed.
+        """
+        if self.near_duplicates is None or result is None or (isinstance(result, dict) and "error" in result):
+            return
+        if cache_key != make_cache_key(message, model):
+            return
+        try:
+            self.near_duplicates.add(message, model, cache_key)
+        except Exception as e:
+            self.logger.warning(f"[{self.SERVICE_NAME}] Failed to index near-duplicate prompt: {e}")
+
+    def _error_result(self, e):
+        """
+        Log an API error and return the structured error dict for it.
+
+        Args:
+            e (Exception): The error.
+
+        Returns:
+            dict: {"error": "quota_exceeded" or "api_error", "details": str(e)}
+
+        """
+        error_str = str(e)
+        if is_rate_limit_error(e):
+            self.logger.error(f"[{self.SERVICE_NAME}] Rate limit or quota exceeded: {error_str}")
+            return {"error": "quota_exceeded", "details": error_str}
+        self.logger.error(f"[{self.SERVICE_NAME}] API error: {error_str}")
+        return {"error": "api_error", "details": error_str}
+
     def _call_with_error_handling(self, func, *args, **kwargs):
         """
         General error handling for API calls. Logs errors.
@@ -86,10 +860,5 @@ class LLMService(ABC):
         try:
             return func(*args, **kwargs)
         except Exception as e:
-            error_str = str(e)
-            if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
-                self.logger.error(f"[{self.SERVICE_NAME}] Rate limit or quota exceeded: {error_str}")
-                return {"error": "quota_exceeded", "details": error_str}
-            self.logger.error(f"[{self.SERVICE_NAME}] API error: {error_str}")
-            return {"error": "api_error", "details": error_str}
+            return self._error_result(e)
     
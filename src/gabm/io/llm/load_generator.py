@@ -0,0 +1,128 @@
+"""
+Load generation for benchmarking LLM services, e.g. against a local MockLLMServer.
+
+- run_load() sends prompts to a service from a pool of threads and reports throughput
+  (requests per second), latency percentiles, cache hit rate, coalesced calls and errors.
+- make_prompts() builds a workload with a chosen number of distinct prompts, so that
+  cache hits and in-flight coalescing can be exercised.
+- Everything goes through the service's public send(), so caching, rate limiting, retries
+  and logging are measured as they run in a simulation.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence
+# Local imports
+from .llm_service import LLMService
+from .router import percentile
+from .utils import make_cache_key
+
+
+def make_prompts(n_requests: int, n_unique: Optional[int] = None, seed: Optional[int] = None) -> List[str]:
+    """
+    Return a shuffled workload of n_requests prompts drawn from n_unique distinct prompts.
+
+    Args:
+        n_requests (int): Number of prompts.
+        n_unique (int, optional): Number of distinct prompts (default: all distinct).
+        seed (int, optional): Seed for the shuffle.
+
+    Returns:
+        list of str: The prompts.
+    """
+    n_unique = n_requests if n_unique is None else max(1, min(n_unique, n_requests))
+    prompts = [f"Benchmark prompt {i % n_unique}: describe agent {i % n_unique}." for i in range(n_requests)]
+    random.Random(seed).shuffle(prompts)
+    return prompts
+
+
+def run_load(
+    service: LLMService,
+    api_key: str,
+    prompts: Sequence[str],
+    model: Optional[str] = None,
+    concurrency: int = 8,
+    server: Optional[Any] = None
+) -> Dict[str, Any]:
+    """
+    Send prompts to a service concurrently and report throughput, latency and cache statistics.
+
+    A request counts as a cache hit if its response was cached before it was sent, and as an error
+    if the service returned None or an error dict.
+
+    Args:
+        service (LLMService): The service to drive (e.g. OpenAIService(base_url=server.url)).
+        api_key (str): The API key.
+        prompts (sequence of str): The prompts to send (see make_prompts).
+        model (str, optional): The model (default: the service's default model).
+        concurrency (int): Number of threads sending.
+        server (optional): A MockLLMServer whose stats() are included in the report.
+
+    Returns:
+        dict: requests, duration (s), requests_per_second, p50_ms, p90_ms, p99_ms, max_ms,
+        cache_hits, cache_hit_rate, coalesced, errors, error_rate and, with a server, server.
+    """
+    model = model or service.get_default_model()
+    coalesced_before = service.single_flight.stats()["coalesced"]
+
+    def send_one(prompt):
+        cached = make_cache_key(prompt, model) in service.cache
+        start = time.perf_counter()
+        response = service.send(api_key, prompt, model)
+        latency = time.perf_counter() - start
+        failed = response is None or (isinstance(response, dict) and "error" in response)
+        return latency, cached, failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        results = list(executor.map(send_one, prompts))
+    duration = time.perf_counter() - start
+    latencies = [latency * 1000 for latency, _, _ in results]
+    n = len(results)
+    cache_hits = sum(1 for _, cached, _ in results if cached)
+    errors = sum(1 for _, _, failed in results if failed)
+    report = {
+        "requests": n,
+        "duration": duration,
+        "requests_per_second": n / duration if duration > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies) if latencies else None,
+        "cache_hits": cache_hits,
+        "cache_hit_rate": cache_hits / n if n else 0.0,
+        "coalesced": service.single_flight.stats()["coalesced"] - coalesced_before,
+        "errors": errors,
+        "error_rate": errors / n if n else 0.0,
+    }
+    if server is not None:
+        report["server"] = server.stats()
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Return a load report as human-readable text.
+    """
+    def ms(value):
+        return "n/a" if value is None else f"{value:.1f} ms"
+    lines = [
+        f"Requests:       {report['requests']} in {report['duration']:.2f} s ({report['requests_per_second']:.1f} req/s)",
+        f"Latency:        p50 {ms(report['p50_ms'])}, p90 {ms(report['p90_ms'])}, p99 {ms(report['p99_ms'])}, max {ms(report['max_ms'])}",
+        f"Cache hit rate: {report['cache_hit_rate']:.1%} ({report['cache_hits']} hits, {report['coalesced']} coalesced)",
+        f"Errors:         {report['errors']} ({report['error_rate']:.1%})",
+    ]
+    if "server" in report:
+        server = report["server"]
+        lines.append(
+            f"Server:         {server['requests']} requests, {server['ok']} ok, "
+            f"{server['rate_limited']} rate limited, {server['errors']} errors"
+        )
+    return "\n".join(lines)
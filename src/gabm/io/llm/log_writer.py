@@ -0,0 +1,262 @@
+"""
+Buffered, batched writer for the JSONL prompt/response logs of LLM services.
+
+- Entries are queued by the caller and written by a background thread, so LLM calls do not wait on disk I/O.
+- The queue is bounded; a full queue blocks the caller rather than growing without limit.
+- Entries are written in batches, when a batch reaches batch_size or flush_interval seconds have passed.
+- The fsync policy controls durability: "never", "batch" (after every batch) or "flush" (on flush() and close()).
+- Each batch is written under an advisory lock on a lock file next to the log (<log>.lock), so several
+  processes can append to the same log and roll it.
+- Optionally, the log is rolled once it reaches max_bytes: it is renamed with a timestamp and
+  compressed (gzip or zstd), and a new log is started. iter_log_entries() reads rolled and current logs in order.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import atexit
+from datetime import datetime, timezone
+import json
+import logging
+import os
+from pathlib import Path
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Union
+# Local imports
+from .cache import locked_file
+from .compression import log_suffix, open_log
+
+FSYNC_POLICIES = ("never", "batch", "flush")
+
+
+class JSONLLogWriter:
+    """
+    Append JSON lines to a file from a background thread.
+
+    Attributes:
+        path (Path): The JSONL file.
+        batch_size (int): Maximum number of entries written per batch.
+        flush_interval (float): Maximum seconds an entry waits before its batch is written.
+        fsync (str): The fsync policy, one of FSYNC_POLICIES.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        max_queue_size: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        fsync: str = "never",
+        logger: Optional[Any] = None,
+        max_bytes: Optional[int] = None,
+        compression: str = "gzip"
+    ):
+        """
+        Initialize the writer. The background thread starts with the first write.
+
+        Args:
+            path (Path or str): Path to the JSONL file (appended to).
+            max_queue_size (int): Maximum number of entries waiting to be written.
+            batch_size (int): Maximum number of entries written per batch.
+            flush_interval (float): Maximum seconds an entry waits before its batch is written.
+            fsync (str): "never", "batch" or "flush".
+            logger: Logger for error messages (optional).
+            max_bytes (int, optional): Size at which the log is rolled. By default it is never rolled.
+            compression (str): Compression of rolled logs: "gzip", "zstd" or "none".
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, not {fsync!r}")
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.compression = compression
+        log_suffix(compression)
+        self.logger = logger or logging.getLogger(__name__)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Log writer for {self.path} is closed.")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"JSONLLogWriter({self.path.name})", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        """
+        Queue an entry to be written. Blocks only if the queue is full.
+
+        Args:
+            entry (dict): A JSON-serialisable log entry.
+        """
+        if self._closed:
+            raise RuntimeError(f"Log writer for {self.path} is closed.")
+        if self._thread is None:
+            self._start()
+        self._queue.put(entry)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every entry queued so far has been written (and fsynced, unless the policy is "never").
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait.
+
+        Returns:
+            bool: True if the entries were written within the timeout.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """
+        Write any queued entries and stop the background thread. Further writes raise RuntimeError.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+            atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="utf-8")
+        # The lock is held on a separate file, as rolling replaces the log and closing it would drop the lock
+        self._lock_file = self.path.with_name(self.path.name + ".lock").open("a")
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                batch: List[Dict[str, Any]] = []
+                events: List[threading.Event] = []
+                deadline = time.monotonic() + self.flush_interval
+                # Collect a batch until it is full, the interval passes, or a flush/stop is requested
+                while True:
+                    if item is None:
+                        stop = True
+                        break
+                    if isinstance(item, threading.Event):
+                        events.append(item)
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                self._write_batch(batch, sync=self.fsync == "batch" or ((events or stop) and self.fsync == "flush"))
+                for event in events:
+                    event.set()
+        finally:
+            self._file.close()
+            self._lock_file.close()
+
+    def _reopen_if_rolled(self) -> None:
+        """
+        Reopen the log if another process has rolled it. Must be called holding the lock file.
+        """
+        try:
+            rolled = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            rolled = True
+        if rolled:
+            self._file.close()
+            self._file = self.path.open("a", encoding="utf-8")
+
+    def _roll(self) -> None:
+        """
+        Rename the log with a timestamp, compress it and start a new log. Must be called holding the lock file.
+        """
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        rolled = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        os.replace(self.path, rolled)
+        if self.compression != "none":
+            compressed = rolled.with_name(rolled.name + log_suffix(self.compression))
+            with rolled.open("rb") as src, open_log(compressed, "wb") as dst:
+                while True:
+                    chunk = src.read(1 << 20)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+            rolled.unlink()
+            rolled = compressed
+        self.logger.info(f"Rolled JSONL log {self.path} to {rolled}")
+
+    def _write_batch(self, batch: List[Dict[str, Any]], sync: bool) -> None:
+        try:
+            if batch:
+                data = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in batch)
+                with locked_file(self._lock_file):
+                    self._reopen_if_rolled()
+                    self._file.write(data)
+                    self._file.flush()
+                    if sync:
+                        os.fsync(self._file.fileno())
+                    if self.max_bytes is not None and self._file.tell() >= self.max_bytes:
+                        self._roll()
+                        self._reopen_if_rolled()
+            else:
+                self._file.flush()
+                if sync:
+                    os.fsync(self._file.fileno())
+        except Exception as e:
+            self.logger.error(f"Failed to write JSONL log {self.path}: {e}")
+
+
+def rolled_logs(path: Union[Path, str]) -> List[Path]:
+    """
+    Return the rolled logs of a JSONL log, oldest first.
+
+    Args:
+        path (Path or str): The current log file.
+
+    Returns:
+        list of Path: Rolled log files (compressed or not).
+    """
+    path = Path(path)
+    pattern = re.compile(re.escape(path.stem) + r"\.\d{8}T\d{12}Z" + re.escape(path.suffix) + r"(\.gz|\.zst)?$")
+    if not path.parent.exists():
+        return []
+    return sorted(p for p in path.parent.iterdir() if pattern.match(p.name))
+
+
+def iter_log_entries(path: Union[Path, str]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the entries of a JSONL log, from its rolled logs (oldest first) and then the current log.
+    An incomplete last line (from an interrupted write) is skipped.
+
+    Args:
+        path (Path or str): The current log file.
+    """
+    path = Path(path)
+    files = rolled_logs(path) + ([path] if path.exists() else [])
+    for log_path in files:
+        with open_log(log_path, "rt") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    yield json.loads(line)
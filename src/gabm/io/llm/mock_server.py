@@ -0,0 +1,298 @@
+"""
+A local stand-in for OpenAI- and PublicAI-compatible chat completion APIs, for testing and benchmarking.
+
+- Serves POST /v1/chat/completions (plain and streamed as server-sent events) and GET /v1/models,
+  in the format the OpenAI SDK and PublicAIService expect. Any API key is accepted.
+- Responses are deterministic for a prompt (an echo by default, or any function of prompt and model).
+- Latency follows a configurable distribution: fixed, uniform, normal, lognormal or exponential.
+- Server errors (HTTP 500) and rate limit errors (HTTP 429 with Retry-After) can be injected at
+  random rates, and requests above a requests-per-second cap are refused with 429.
+- Runs in a background thread on a free local port; point a service at it with
+  OpenAIService(base_url=server.url) or PublicAIService(base_url=server.url).
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+
+LatencySpec = Union[float, Tuple[Any, ...], Callable[[random.Random], float]]
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections under load, which clients retry after a second
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def sample_latency(latency: LatencySpec, rng: random.Random) -> float:
+    """
+    Return a latency in seconds drawn from a distribution.
+
+    Args:
+        latency: A fixed number of seconds; a tuple ("uniform", low, high), ("normal", mean, sd),
+            ("lognormal", median, sigma) or ("exponential", mean); or a function of a random.Random.
+        rng (random.Random): The random number generator.
+
+    Returns:
+        float: The latency (never negative).
+    """
+    if callable(latency):
+        value = latency(rng)
+    elif isinstance(latency, (int, float)):
+        value = latency
+    else:
+        kind, *params = latency
+        if kind == "uniform":
+            value = rng.uniform(*params)
+        elif kind == "normal":
+            value = rng.gauss(*params)
+        elif kind == "lognormal":
+            median, sigma = params
+            value = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        elif kind == "exponential":
+            value = rng.expovariate(1 / params[0]) if params[0] > 0 else 0.0
+        else:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+    return max(0.0, float(value))
+
+
+def echo_response(prompt: str, model: str) -> str:
+    """
+    The default mock response text: the prompt echoed back.
+    """
+    return f"Mock response to: {prompt}"
+
+
+class MockLLMServer:
+    """
+    Local HTTP server that imitates an OpenAI-compatible chat completion API.
+
+    Attributes:
+        url (str): The API base URL (e.g. "http://127.0.0.1:54321/v1").
+        latency: The latency distribution (see sample_latency).
+        error_rate (float): Probability that a request fails with HTTP 500.
+        rate_limit_rate (float): Probability that a request fails with HTTP 429.
+        max_requests_per_second (float): Requests above this rate over the last second get HTTP 429 (None for no cap).
+        retry_after (float): Seconds sent in the Retry-After header of 429 responses.
+        models (tuple of str): Model ids listed by GET /v1/models.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: LatencySpec = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        max_requests_per_second: Optional[float] = None,
+        retry_after: float = 1.0,
+        respond: Callable[[str, str], str] = echo_response,
+        models: Sequence[str] = ("mock-model",),
+        seed: Optional[int] = None,
+        logger: Optional[Any] = None
+    ):
+        """
+        Create the server (call start() to serve).
+
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on (0 for any free port).
+            latency: Latency distribution (see sample_latency).
+            error_rate (float): Probability of an injected HTTP 500.
+            rate_limit_rate (float): Probability of an injected HTTP 429.
+            max_requests_per_second (float, optional): Request rate above which requests get HTTP 429.
+            retry_after (float): Seconds sent in the Retry-After header of 429 responses.
+            respond (callable): Returns the response text for (prompt, model).
+            models (sequence of str): Model ids listed by GET /v1/models.
+            seed (int, optional): Seed for latencies and injected errors.
+            logger: Logger for request messages (optional).
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.retry_after = retry_after
+        self.respond = respond
+        self.models = tuple(models)
+        self.logger = logger or logging.getLogger(__name__)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self._counts = {"requests": 0, "ok": 0, "rate_limited": 0, "errors": 0, "streamed": 0}
+        self._thread = None
+        self._httpd = _MockHTTPServer((host, port), self._handler_class())
+        self.url = f"http://{host}:{self._httpd.server_address[1]}/v1"
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                server.logger.debug(format % args)
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/v1/models":
+                    self._send_json(200, {
+                        "object": "list",
+                        "data": [{"id": model, "object": "model", "created": 0, "owned_by": "gabm-mock"} for model in server.models],
+                    })
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                    return
+                try:
+                    request = json.loads(body)
+                except ValueError:
+                    self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+                    return
+                outcome, delay = server._admit()
+                time.sleep(delay)
+                if outcome == "rate_limited":
+                    self._send_json(
+                        429,
+                        {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+                        {"Retry-After": f"{server.retry_after:g}"}
+                    )
+                elif outcome == "error":
+                    self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+                elif request.get("stream"):
+                    self._send_stream(request)
+                else:
+                    self._send_json(200, server._completion(request))
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, request):
+                completion = server._completion(request)
+                text = completion["choices"][0]["message"]["content"]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                pieces = [piece + " " for piece in text.split(" ")]
+                pieces[-1] = pieces[-1][:-1]
+                try:
+                    for i, piece in enumerate(pieces):
+                        chunk = {
+                            "id": completion["id"], "object": "chat.completion.chunk",
+                            "created": completion["created"], "model": completion["model"],
+                            "choices": [{
+                                "index": 0, "delta": {"content": piece},
+                                "finish_reason": "stop" if i == len(pieces) - 1 else None,
+                            }],
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client closed the stream early (e.g. an early-stop hook)
+                    pass
+                with server._lock:
+                    server._counts["streamed"] += 1
+
+        return Handler
+
+    def _admit(self) -> Tuple[str, float]:
+        """
+        Decide the outcome of a request ("ok", "rate_limited" or "error") and its latency.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._counts["requests"] += 1
+            while self._recent and self._recent[0] <= now - 1.0:
+                self._recent.popleft()
+            if self.max_requests_per_second is not None and len(self._recent) >= self.max_requests_per_second:
+                outcome = "rate_limited"
+            elif self._rng.random() < self.rate_limit_rate:
+                outcome = "rate_limited"
+            elif self._rng.random() < self.error_rate:
+                outcome = "error"
+            else:
+                outcome = "ok"
+                self._recent.append(now)
+            self._counts[outcome if outcome != "error" else "errors"] += 1
+            delay = 0.0 if outcome == "rate_limited" else sample_latency(self.latency, self._rng)
+        return outcome, delay
+
+    def _completion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        model = request.get("model") or self.models[0]
+        messages = request.get("messages") or []
+        prompt = messages[-1].get("content", "") if messages else ""
+        text = self.respond(prompt, model)
+        prompt_tokens = len(prompt.split())
+        completion_tokens = len(text.split())
+        return {
+            "id": f"chatcmpl-mock-{abs(hash((prompt, model))) % 10 ** 12}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def start(self) -> "MockLLMServer":
+        """
+        Start serving in a background thread. Returns the server.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, name="gabm-mock-llm-server", daemon=True
+            )
+            self._thread.start()
+            self.logger.info(f"Mock LLM server listening at {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop serving and close the socket.
+        """
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the number of requests received, succeeded, rate limited, failed and streamed.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
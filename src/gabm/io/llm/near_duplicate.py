@@ -0,0 +1,241 @@
+"""
+Near-duplicate lookup for prompts that differ only in trivial ways from a cached prompt.
+
+- A prompt template is the normalised prompt with runs of spaces collapsed, its sentences and
+  lines in sorted order (so the order of profile facts does not matter) and numbers replaced by
+  slots. Prompts with the same template and numeric slot values within a tolerance
+  (e.g. ages that differ by a year) match.
+- Optionally, an embedding function adds a second index: a prompt matches the most similar
+  indexed prompt for the same model if their cosine similarity is at least a threshold.
+- The index is kept in an append-only JSONL file alongside the cache, shared by later runs.
+- Lookups are opt-in per call (see LLMService.send_similar); send() only ever uses exact matches.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import hashlib
+import json
+import logging
+import math
+from pathlib import Path
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+# Local imports
+from .cache import locked_file
+from .utils import normalize_prompt
+
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+SLOT = "#"
+_SEGMENT_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def prompt_template(prompt: str) -> Tuple[str, Tuple[float, ...]]:
+    """
+    Return the template of a prompt and the values of its numeric slots.
+
+    Args:
+        prompt (str): The prompt text.
+
+    Returns:
+        tuple: (template, slot values). Prompts that differ only in whitespace, in the order of
+        their sentences or lines, or in their numbers have the same template.
+
+    """
+    segments = []
+    for segment in _SEGMENT_PATTERN.split(normalize_prompt(prompt)):
+        segment = " ".join(segment.split())
+        if segment:
+            segments.append((NUMBER_PATTERN.sub(SLOT, segment), [float(n) for n in NUMBER_PATTERN.findall(segment)]))
+    segments.sort()
+    template = "\n".join(text for text, _ in segments)
+    slots = tuple(value for _, values in segments for value in values)
+    return template, slots
+
+
+def template_key(template: str, model: Optional[str]) -> str:
+    """
+    Return a hex digest identifying a template for a model.
+    """
+    payload = json.dumps([template, model], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class NearDuplicateIndex:
+    """
+    Index from prompt templates (and optionally prompt embeddings) to the cache keys of responses.
+
+    Attributes:
+        slot_tolerance (float): Largest difference allowed between corresponding numeric slots.
+            0 matches prompts that differ only in whitespace and sentence order.
+        embed (callable): Returns an embedding vector for a prompt, or None for no embedding index.
+        threshold (float): Minimum cosine similarity for an embedding match.
+        template_hits (int): Number of lookups answered by the template index.
+        embedding_hits (int): Number of lookups answered by the embedding index.
+        misses (int): Number of lookups with no match.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[Path, str]] = None,
+        slot_tolerance: float = 0.0,
+        embed: Optional[Callable[[str], Sequence[float]]] = None,
+        threshold: float = 0.95,
+        logger: Optional[Any] = None
+    ):
+        """
+        Initialize the index, loading the entries in path if it exists.
+
+        Args:
+            path (Path or str, optional): JSONL file for the index. If None the index is kept in memory only.
+            slot_tolerance (float): Largest difference allowed between corresponding numeric slots.
+            embed (callable, optional): Embedding function, called with the prompt text.
+            threshold (float): Minimum cosine similarity for an embedding match.
+            logger: Logger for warnings (optional).
+        """
+        self.path = Path(path) if path is not None else None
+        self.slot_tolerance = slot_tolerance
+        self.embed = embed
+        self.threshold = threshold
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._keys = set()
+        # template key -> [(slots, cache key)]
+        self._templates: Dict[str, List[Tuple[Tuple[float, ...], str]]] = {}
+        # model -> [(unit vector, cache key)]
+        self._vectors: Dict[Any, List[Tuple[List[float], str]]] = {}
+        self.template_hits = 0
+        self.embedding_hits = 0
+        self.misses = 0
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    self.logger.warning(f"Skipping unreadable line in {self.path}")
+                    continue
+                self._index(entry)
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        self._keys.add(entry["key"])
+        self._templates.setdefault(entry["template"], []).append((tuple(entry["slots"]), entry["key"]))
+        if entry.get("vector") is not None:
+            self._vectors.setdefault(entry["model"], []).append((entry["vector"], entry["key"]))
+
+    def _embed(self, prompt: str) -> Optional[List[float]]:
+        if self.embed is None:
+            return None
+        try:
+            vector = [float(x) for x in self.embed(prompt)]
+        except Exception as e:
+            self.logger.warning(f"Failed to embed prompt for near-duplicate lookup: {e}")
+            return None
+        norm = math.sqrt(sum(x * x for x in vector))
+        return [x / norm for x in vector] if norm else None
+
+    def add(self, prompt: str, model: Optional[str], cache_key: str) -> None:
+        """
+        Index the cached response for a prompt sent to a model.
+
+        Args:
+            prompt (str): The prompt text.
+            model (str, optional): The model name.
+            cache_key (str): The cache key of the response.
+        """
+        if cache_key in self._keys:
+            return
+        template, slots = prompt_template(prompt)
+        entry = {
+            "key": cache_key,
+            "model": model,
+            "template": template_key(template, model),
+            "slots": list(slots),
+            "vector": self._embed(prompt),
+        }
+        with self._lock:
+            if cache_key in self._keys:
+                return
+            self._index(entry)
+            if self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f, locked_file(f):
+                    f.write(json.dumps(entry) + "\n")
+                    f.flush()
+
+    def lookup(
+        self,
+        prompt: str,
+        model: Optional[str],
+        slot_tolerance: Optional[float] = None,
+        threshold: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Return the cache key of an indexed prompt equivalent to prompt, or None.
+
+        The template index is tried first, choosing the entry whose slots are closest. The
+        embedding index (if any) is then tried, choosing the most similar entry.
+
+        Args:
+            prompt (str): The prompt text.
+            model (str, optional): The model name; only entries for the same model match.
+            slot_tolerance (float, optional): Overrides the index's slot tolerance.
+            threshold (float, optional): Overrides the index's similarity threshold.
+
+        Returns:
+            str: The cache key, or None if nothing matches.
+        """
+        tolerance = self.slot_tolerance if slot_tolerance is None else slot_tolerance
+        template, slots = prompt_template(prompt)
+        best = None
+        best_distance = None
+        for entry_slots, cache_key in self._templates.get(template_key(template, model), ()):
+            distance = max((abs(a - b) for a, b in zip(slots, entry_slots)), default=0.0)
+            if distance <= tolerance and (best_distance is None or distance < best_distance):
+                best, best_distance = cache_key, distance
+        if best is not None:
+            with self._lock:
+                self.template_hits += 1
+            return best
+        vectors = self._vectors.get(model)
+        if vectors:
+            vector = self._embed(prompt)
+            if vector is not None:
+                minimum = self.threshold if threshold is None else threshold
+                best_similarity = None
+                for entry_vector, cache_key in vectors:
+                    # Both vectors are unit length, so the dot product is the cosine similarity
+                    similarity = sum(x * y for x, y in zip(vector, entry_vector))
+                    if similarity >= minimum and (best_similarity is None or similarity > best_similarity):
+                        best, best_similarity = cache_key, similarity
+                if best is not None:
+                    with self._lock:
+                        self.embedding_hits += 1
+                    return best
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the number of indexed responses and of template hits, embedding hits and misses.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._keys),
+                "template_hits": self.template_hits,
+                "embedding_hits": self.embedding_hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self) -> int:
+        return len(self._keys)
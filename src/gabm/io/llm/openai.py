@@ -6,18 +6,30 @@ Features:
 - List available models from the OpenAI API and save as both JSON and TXT for validation and reference.
 - Validate selected model names against the cached JSON model list.
 - Unified workflow for model management, matching other LLM modules in the project.
+- Stream responses with send_stream(), optionally stopping as soon as the answer is known.
+- Batch mode: send cache misses through the OpenAI Batch API (discounted, not rate limited per request)
+  and ingest the results into the same cache and log.
 """
 # Metadata
 __author__ = ["Andy Turner <agdturner@gmail.com>"]
 __version__ = "0.3.0"
 __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
+# Standard library imports
+import json
+import time
 # OpenAI client library
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from openai.types.chat import ChatCompletion
+import httpx
 # LLM service base class
 from .llm_service import LLMService
+from .telemetry import CallTimer
 # Shared utilities for caching and logging
-from .utils import pre_send_check_and_cache, call_and_cache_response, cache_and_log, write_models_json_and_txt
+from .utils import cache_and_log, make_cache_key, write_models_json_and_txt
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
 
 
 class OpenAIService(LLMService):
@@ -26,12 +38,40 @@ class OpenAIService(LLMService):
     Handles prompt sending, response caching, logging, and model listing.
     """
     SERVICE_NAME = "openai"
+    DEFAULT_MODEL = "gpt-3.5-turbo"
+
+    def __init__(self, *args, base_url=None, **kwargs):
+        """
+        Initialize the service.
+
+        Args:
+            base_url (str, optional): API base URL, for OpenAI-compatible providers or a local
+                stand-in server. Defaults to the OPENAI_BASE_URL environment variable or the OpenAI API.
+            *args, **kwargs: Passed to LLMService.
+        """
+        super().__init__(*args, **kwargs)
+        self.base_url = base_url
+        self.batch_dir = self.cache_path.parent / "batches"
+
+    def _create_client(self, api_key):
+        """
+        Create an OpenAI client whose HTTP connections are kept alive and reused.
+        """
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return OpenAI(api_key=api_key, base_url=self.base_url, http_client=DefaultHttpxClient(limits=limits))
+
+    def _create_async_client(self, api_key):
+        """
+        Create an async OpenAI client whose HTTP connections are kept alive and reused.
+        """
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return AsyncOpenAI(api_key=api_key, base_url=self.base_url, http_client=DefaultAsyncHttpxClient(limits=limits))
 
     @staticmethod
     def simple_extract_text(response):
         return response.choices[0].message.content if hasattr(response, 'choices') and len(response.choices) > 0 else str(response)
 
-    def send(self, api_key, message, model="gpt-3.5-turbo"):
+    def send(self, api_key, message, model=DEFAULT_MODEL):
         """
         Send a prompt to OpenAI and return the response object.
         Caches and logs the response for reproducibility.
@@ -45,32 +85,233 @@ class OpenAIService(LLMService):
             Response object or None on error.
         
         """
-        cached = pre_send_check_and_cache(api_key, message, model, self.cache, self.logger, self.SERVICE_NAME, self.API_KEY_ENV_VAR)
+        cached = self._pre_send_check_and_cache(api_key, message, model)
         if cached is not None:
             return cached
-        cache_key = (message, model)
+        cache_key = make_cache_key(message, model)
         def api_call():
-            client = OpenAI(api_key=api_key)
+            client = self._get_client(api_key)
             return client.chat.completions.create(
                 model=model,
                 messages=[{"role": "user", "content": message}]
             )
-        return self._call_with_error_handling(
-            call_and_cache_response,
-            api_call,
-            cache_and_log,
-            self.cache,
-            cache_key,
-            self.cache_path,
-            self.jsonl_path,
-            message,
-            model,
-            api_key,
-            self.logger,
-            self.SERVICE_NAME,
-            self.list_available_models,
-            extract_text_from_response=self.simple_extract_text
+        return self._call_and_cache_response(api_call, cache_key, message, model, api_key)
+
+    async def asend(self, api_key, message, model=DEFAULT_MODEL):
+        """
+        Asynchronously send a prompt to OpenAI and return the response object.
+        Shares the cache and log with send(); cache hits return without awaiting the network.
+
+        Args:
+            api_key (str): OpenAI API key.
+            message (str): Prompt to send.
+            model (str): Model name (default: "gpt-3.5-turbo").
+
+        Returns:
+            Response object or None on error.
+
+        """
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        cache_key = make_cache_key(message, model)
+        async def api_call():
+            client = self._get_async_client(api_key)
+            return await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": message}]
+            )
+        return await self._acall_and_cache_response(api_call, cache_key, message, model, api_key)
+
+    def _stream(self, api_key, message, model):
+        """
+        Stream the response text chunks from the chat completions API. Closing the generator
+        closes the HTTP response, which ends generation.
+        """
+        stream = self._get_client(api_key).chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": message}],
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+
+    def submit_batch(self, api_key, messages, model=DEFAULT_MODEL, completion_window="24h"):
+        """
+        Submit the cache misses among messages as an OpenAI batch.
+
+        The batch requests are written to data/llm/openai/batches/<batch id>.jsonl, which
+        ingest_batch() reads to match results to prompts, so a batch can be collected by a later run.
+
+        Args:
+            api_key (str): OpenAI API key.
+            messages (list of str): Prompts to send. Duplicates and cached prompts are not submitted.
+            model (str): Model name (default: "gpt-3.5-turbo").
+            completion_window (str): Time within which the batch should complete.
+
+        Returns:
+            str: The batch id, or None if every prompt was cached.
+
+        """
+        _, pending, unique = self._plan_many(api_key, messages, model)
+        if not pending:
+            return None
+        lines = [
+            json.dumps({
+                "custom_id": cache_key,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {"model": model, "messages": [{"role": "user", "content": unique[cache_key]}]},
+            }, ensure_ascii=False)
+            for cache_key in pending
+        ]
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        client = self._get_client(api_key)
+        input_file = client.files.create(file=("batch_requests.jsonl", data), purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=completion_window
         )
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+        (self.batch_dir / f"{batch.id}.jsonl").write_bytes(data)
+        self.logger.info(f"[{self.SERVICE_NAME}] Submitted batch {batch.id} with {len(lines)} requests.")
+        return batch.id
+
+    def wait_for_batch(self, api_key, batch_id, poll_interval=30.0, timeout=None):
+        """
+        Poll a batch until it completes, fails, expires or is cancelled.
+
+        Args:
+            api_key (str): OpenAI API key.
+            batch_id (str): The batch id.
+            poll_interval (float): Seconds between polls.
+            timeout (float, optional): Maximum seconds to wait.
+
+        Returns:
+            The batch object.
+
+        Raises:
+            TimeoutError: If the batch is still running after timeout seconds.
+
+        """
+        client = self._get_client(api_key)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        batch = client.batches.retrieve(batch_id)
+        while batch.status not in BATCH_TERMINAL_STATUSES:
+            if deadline is not None and time.monotonic() + poll_interval > deadline:
+                raise TimeoutError(f"Batch {batch_id} is still {batch.status} after {timeout}s.")
+            time.sleep(poll_interval)
+            batch = client.batches.retrieve(batch_id)
+        self.logger.info(f"[{self.SERVICE_NAME}] Batch {batch_id} {batch.status}.")
+        return batch
+
+    def _batch_timer(self, batch):
+        """
+        Return a CallTimer for the requests of a finished batch: one attempt each, lasting from the
+        batch's creation to its completion (when the batch reports both times).
+        """
+        timer = CallTimer()
+        created = getattr(batch, "created_at", None)
+        completed = getattr(batch, "completed_at", None)
+        if created and completed:
+            timer.attempts = 1
+            timer.attempt_start = timer.start
+            timer.latency = max(0.0, float(completed - created))
+        return timer
+
+    def ingest_batch(self, api_key, batch):
+        """
+        Cache and log the results of a finished batch.
+
+        Args:
+            api_key (str): OpenAI API key.
+            batch: The batch object (from wait_for_batch) or batch id.
+
+        Returns:
+            dict: The response for each cache key that succeeded. Failed requests are logged and left out.
+
+        """
+        client = self._get_client(api_key)
+        if isinstance(batch, str):
+            batch = client.batches.retrieve(batch)
+        requests = {}
+        with (self.batch_dir / f"{batch.id}.jsonl").open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    request = json.loads(line)
+                    requests[request["custom_id"]] = request["body"]
+        responses = {}
+        timer = self._batch_timer(batch)
+        if batch.output_file_id:
+            for line in client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                cache_key = result.get("custom_id")
+                body = requests.get(cache_key)
+                response = result.get("response") or {}
+                if body is None:
+                    self.logger.warning(f"[{self.SERVICE_NAME}] Batch {batch.id} returned unknown request {cache_key}.")
+                    continue
+                prompt = body["messages"][0]["content"]
+                if result.get("error") or response.get("status_code") != 200:
+                    self.logger.error(f"[{self.SERVICE_NAME}] Batch {batch.id} request failed: {result.get('error') or response}")
+                    error = {"error": "api_error", "details": str(result.get("error") or response)}
+                    self.telemetry.record_call(self.SERVICE_NAME, body["model"], timer, error, prompt)
+                    continue
+                completion = ChatCompletion.model_validate(response["body"])
+                self.telemetry.record_call(self.SERVICE_NAME, body["model"], timer, completion, prompt, self._response_text)
+                if self.compact_responses:
+                    completion = self.to_llm_response(completion, body["model"])
+                cache_and_log(
+                    self.cache, cache_key, completion, self.cache_path, self.jsonl_path,
+                    prompt=prompt, model=body["model"],
+                    extra={"batch_id": batch.id}, logger=self.logger,
+                    extract_text_from_response=self.simple_extract_text,
+                    prompt_table=self.prompt_table, log_writer=self.log_writer
+                )
+                responses[cache_key] = completion
+        if batch.error_file_id:
+            errors = client.files.content(batch.error_file_id).text.splitlines()
+            self.logger.error(f"[{self.SERVICE_NAME}] Batch {batch.id} had {len(errors)} failed requests.")
+        missing = len(requests) - len(responses)
+        if missing:
+            self.logger.warning(f"[{self.SERVICE_NAME}] Batch {batch.id} ({batch.status}): {missing} of {len(requests)} requests have no response.")
+        return responses
+
+    def send_batch(self, api_key, messages, model=DEFAULT_MODEL, poll_interval=30.0, timeout=None, completion_window="24h"):
+        """
+        Send many prompts through the OpenAI Batch API and return the responses in input order.
+
+        Cached prompts are served from the cache; the misses are submitted as one batch, which is
+        polled until it finishes and then ingested into the cache and JSONL log, like send().
+
+        Args:
+            api_key (str): OpenAI API key.
+            messages (list of str): Prompts to send.
+            model (str): Model name (default: "gpt-3.5-turbo").
+            poll_interval (float): Seconds between polls.
+            timeout (float, optional): Maximum seconds to wait for the batch.
+            completion_window (str): Time within which the batch should complete.
+
+        Returns:
+            list: The response for each message (None for failed requests).
+
+        Raises:
+            TimeoutError: If the batch does not finish within timeout. Its results can be
+                collected later with wait_for_batch() and ingest_batch().
+
+        """
+        batch_id = self.submit_batch(api_key, messages, model, completion_window=completion_window)
+        if batch_id is not None:
+            batch = self.wait_for_batch(api_key, batch_id, poll_interval=poll_interval, timeout=timeout)
+            self.ingest_batch(api_key, batch)
+        return [self.cache.get(make_cache_key(message, model)) for message in messages]
 
     def list_available_models(self, api_key):
         """
@@ -84,7 +325,7 @@ class OpenAIService(LLMService):
         
         """
         def api_call():
-            client = OpenAI(api_key=api_key)
+            client = self._get_client(api_key)
             models = client.models.list()
             def formatter(model):
                 return (f"Model ID: {model.id}\n"
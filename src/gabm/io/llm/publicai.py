@@ -6,6 +6,7 @@ Features:
 - List available models from the PublicAI API and save as both JSON and TXT for validation and reference.
 - Validate selected model names against the cached JSON model list.
 - Unified workflow for model management, matching other LLM modules in the project.
+- Stream responses with send_stream(), optionally stopping as soon as the answer is known.
 """
 # Metadata
 __author__ = ["Andy Turner <agdturner@gmail.com>"]
@@ -14,17 +15,56 @@ __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
 
 # Standard library imports
-import requests
+import ast
+# HTTP client library for async requests
+import httpx
 # LLM service base class
 from .llm_service import LLMService
 # Shared utilities for caching and logging
-from .utils import pre_send_check_and_cache, call_and_cache_response, cache_and_log, write_models_json_and_txt
+from .streaming import iter_sse_chat_deltas
+from .utils import make_cache_key, write_models_json_and_txt, create_http_session
 
 class PublicAIService(LLMService):
     """
     Service class for PublicAI LLM integration. Handles prompt sending, response caching, logging, and model listing.
     """
     SERVICE_NAME = "publicai"
+    BASE_URL = "https://api.publicai.co/v1"
+    DEFAULT_MODEL = "swiss-ai/apertus-8b-instruct"
+    HEADERS = {"User-Agent": "GABM/1.0"}
+
+    def __init__(self, *args, base_url=None, **kwargs):
+        """
+        Initialize the service.
+
+        Args:
+            base_url (str, optional): API base URL, for a PublicAI-compatible provider or a local
+                stand-in server (see mock_server.MockLLMServer). Defaults to BASE_URL.
+            *args, **kwargs: Passed to LLMService.
+        """
+        super().__init__(*args, **kwargs)
+        if base_url is not None:
+            self.BASE_URL = base_url.rstrip("/")
+
+    def _create_client(self, api_key):
+        """
+        Create a keep-alive requests session that sends the API key with every request.
+        """
+        return create_http_session(self.pool_size, headers={
+            **self.HEADERS,
+            "Authorization": f"Bearer {api_key}"
+        })
+
+    def _create_async_client(self, api_key):
+        """
+        Create a keep-alive async HTTP client that sends the API key with every request.
+        """
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.AsyncClient(
+            headers={**self.HEADERS, "Authorization": f"Bearer {api_key}"},
+            limits=limits,
+            timeout=None
+        )
 
     @staticmethod
     def simple_extract_text(response):
@@ -39,7 +79,7 @@ class PublicAIService(LLMService):
         except Exception:
             return str(response)
         
-    def send(self, api_key, message, model="swiss-ai/apertus-8b-instruct"):
+    def send(self, api_key, message, model=DEFAULT_MODEL):
         """
         Send a prompt to PublicAI and return the response object.
         Caches and logs the response for reproducibility.
@@ -47,48 +87,79 @@ class PublicAIService(LLMService):
         Args:
             api_key (str): PublicAI API key.
             message (str): Prompt to send.
-            model (str): Model name (default: "apertus-llm-7b").
+            model (str): Model name (default: "swiss-ai/apertus-8b-instruct").
         
         Returns:
             Response object (dict) or None on error.
         
         """
-        cached = pre_send_check_and_cache(api_key, message, model, self.cache, self.logger, self.SERVICE_NAME, self.API_KEY_ENV_VAR)
+        cached = self._pre_send_check_and_cache(api_key, message, model)
         if cached is not None:
             return cached
-        cache_key = (message, model)
+        cache_key = make_cache_key(message, model)
         def api_call():
-            url = "https://api.publicai.co/v1/chat/completions"
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}",
-                "User-Agent": "GABM/1.0"
+            url = f"{self.BASE_URL}/chat/completions"
+            data = {
+                "model": model,
+                "messages": [
+                    {"role": "user", "content": message}
+                ]
             }
+            response = self._get_client(api_key).post(url, json=data)
+            response.raise_for_status()
+            return response.json()
+        return self._call_and_cache_response(api_call, cache_key, message, model, api_key)
+
+    async def asend(self, api_key, message, model=DEFAULT_MODEL):
+        """
+        Asynchronously send a prompt to PublicAI and return the response object.
+        Shares the cache and log with send(); cache hits return without awaiting the network.
+
+        Args:
+            api_key (str): PublicAI API key.
+            message (str): Prompt to send.
+            model (str): Model name (default: "swiss-ai/apertus-8b-instruct").
+
+        Returns:
+            Response object (dict) or None on error.
+
+        """
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        cache_key = make_cache_key(message, model)
+        async def api_call():
+            url = f"{self.BASE_URL}/chat/completions"
             data = {
                 "model": model,
                 "messages": [
                     {"role": "user", "content": message}
                 ]
             }
-            response = requests.post(url, headers=headers, json=data)
+            response = await self._get_async_client(api_key).post(url, json=data)
             response.raise_for_status()
             return response.json()
-        return self._call_with_error_handling(
-            call_and_cache_response,
-            api_call,
-            cache_and_log,
-            self.cache,
-            cache_key,
-            self.cache_path,
-            self.jsonl_path,
-            message,
-            model,
-            api_key,
-            self.logger,
-            self.SERVICE_NAME,
-            self.list_available_models,
-            extract_text_from_response=self.simple_extract_text
-        )
+        return await self._acall_and_cache_response(api_call, cache_key, message, model, api_key)
+
+    def _stream(self, api_key, message, model):
+        """
+        Stream the response text chunks from the chat completions endpoint (server-sent events).
+        Closing the generator closes the HTTP response, which ends generation.
+        """
+        url = f"{self.BASE_URL}/chat/completions"
+        data = {
+            "model": model,
+            "messages": [
+                {"role": "user", "content": message}
+            ],
+            "stream": True
+        }
+        response = self._get_client(api_key).post(url, json=data, stream=True)
+        try:
+            response.raise_for_status()
+            yield from iter_sse_chat_deltas(response.iter_lines(decode_unicode=True))
+        finally:
+            response.close()
 
     def list_available_models(self, api_key):
         """
@@ -102,12 +173,8 @@ class PublicAIService(LLMService):
         
         """
         def api_call():
-            url = "https://api.publicai.co/v1/models"
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "User-Agent": "GABM/1.0"
-            }
-            response = requests.get(url, headers=headers)
+            url = f"{self.BASE_URL}/models"
+            response = self._get_client(api_key).get(url)
             response.raise_for_status()
             models_data = response.json()
             models = models_data.get("data", [])
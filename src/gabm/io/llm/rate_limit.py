@@ -0,0 +1,328 @@
+"""
+Client-side rate limiting and retry with backoff for LLM API calls.
+
+- Token buckets limit requests per minute and tokens per minute, per model.
+- Rate limit errors (HTTP 429, RESOURCE_EXHAUSTED) are retried with jittered exponential backoff,
+  honouring any Retry-After the provider sends.
+- After a rate limit error every caller for that model pauses, not just the one that received it.
+- Limiters are thread-safe and can be awaited from async code, so one limiter can be shared by
+  threads and asyncio tasks.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import asyncio
+from email.utils import parsedate_to_datetime
+import logging
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+# Local imports
+from .response import response_usage
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilled continuously at rate_per_minute.
+
+    Reservations are taken immediately and may overdraw the bucket; the caller then waits for
+    the returned number of seconds. Waiting happens outside the lock, so the same bucket serves
+    both blocking and async callers.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate_per_minute (float): Refill rate.
+            capacity (float, optional): Maximum burst size. Defaults to rate_per_minute.
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """
+        Take amount tokens and return the number of seconds to wait before using them.
+
+        Args:
+            amount (float): Number of tokens.
+
+        Returns:
+            float: Seconds to wait (0 if the tokens are available now).
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """
+        Return tokens to the bucket (positive amount) or take more (negative amount),
+        e.g. when the actual token usage of a request is known.
+
+        Args:
+            amount (float): Number of tokens.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter:
+    """
+    Per-model request and token rate limits with retry and backoff on rate limit errors.
+
+    Attributes:
+        requests_per_minute (float): Default request limit per model (None for no limit).
+        tokens_per_minute (float): Default token limit per model (None for no limit).
+        model_limits (dict): Per-model overrides, {model: {"requests_per_minute": ..., "tokens_per_minute": ...}}.
+        max_retries (int): Number of retries after a rate limit error.
+        base_delay (float): Backoff delay in seconds before the first retry.
+        max_delay (float): Maximum backoff delay in seconds.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        model_limits: Optional[Dict[str, Dict[str, float]]] = None,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        logger: Optional[Any] = None
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute (float, optional): Default request limit per model.
+            tokens_per_minute (float, optional): Default token limit per model.
+            model_limits (dict, optional): Per-model overrides of the two limits.
+            max_retries (int): Number of retries after a rate limit error.
+            base_delay (float): Backoff delay in seconds before the first retry.
+            max_delay (float): Maximum backoff delay in seconds.
+            logger: Logger for warnings (optional).
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.model_limits = model_limits or {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._buckets: Dict[Any, Dict[str, Optional[TokenBucket]]] = {}
+        self._blocked_until: Dict[Any, float] = {}
+        self.retries = 0
+
+    def _model_buckets(self, model: Any) -> Dict[str, Optional[TokenBucket]]:
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            with self._lock:
+                buckets = self._buckets.get(model)
+                if buckets is None:
+                    limits = self.model_limits.get(model, {})
+                    rpm = limits.get("requests_per_minute", self.requests_per_minute)
+                    tpm = limits.get("tokens_per_minute", self.tokens_per_minute)
+                    buckets = {
+                        "requests": TokenBucket(rpm) if rpm else None,
+                        "tokens": TokenBucket(tpm) if tpm else None,
+                    }
+                    self._buckets[model] = buckets
+        return buckets
+
+    def reserve(self, model: Any, tokens: int = 0) -> float:
+        """
+        Reserve one request and tokens for model and return the number of seconds to wait.
+
+        Args:
+            model: The model (each model has its own limits).
+            tokens (int): Estimated tokens for the request.
+
+        Returns:
+            float: Seconds to wait before sending.
+        """
+        buckets = self._model_buckets(model)
+        wait = 0.0
+        if buckets["requests"] is not None:
+            wait = max(wait, buckets["requests"].reserve(1))
+        if buckets["tokens"] is not None and tokens:
+            wait = max(wait, buckets["tokens"].reserve(tokens))
+        with self._lock:
+            blocked_until = self._blocked_until.get(model, 0.0)
+        return max(wait, blocked_until - time.monotonic())
+
+    def record_usage(self, model: Any, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        Correct the token bucket for model once the actual token usage of a request is known.
+
+        Args:
+            model: The model.
+            estimated_tokens (int): Tokens reserved for the request.
+            actual_tokens (int, optional): Tokens actually used, or None if unknown.
+        """
+        bucket = self._model_buckets(model)["tokens"]
+        if bucket is not None and actual_tokens is not None:
+            bucket.adjust(estimated_tokens - actual_tokens)
+
+    def pause(self, model: Any, seconds: float) -> None:
+        """
+        Make every caller for model wait at least seconds from now.
+
+        Args:
+            model: The model.
+            seconds (float): Pause duration.
+        """
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._blocked_until[model] = max(self._blocked_until.get(model, 0.0), until)
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Return the delay before retry number attempt (0-based): the provider's Retry-After if given,
+        otherwise exponential backoff with jitter (between half and all of base_delay * 2**attempt).
+
+        Args:
+            attempt (int): The retry number.
+            retry_after (float, optional): Seconds requested by the provider.
+
+        Returns:
+            float: Delay in seconds.
+        """
+        if retry_after is not None:
+            return min(max(0.0, retry_after), self.max_delay)
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def _on_rate_limit(self, model: Any, attempt: int, e: Exception) -> float:
+        delay = self.backoff_delay(attempt, get_retry_after(e))
+        self.pause(model, delay)
+        with self._lock:
+            self.retries += 1
+        self.logger.warning(
+            f"Rate limited for model={model} (attempt {attempt + 1} of {self.max_retries + 1}); retrying in {delay:.1f}s: {e}"
+        )
+        return delay
+
+    def call(self, func: Callable[[], Any], model: Any, tokens: int = 0,
+             usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        """
+        Call func within the limits for model, retrying rate limit errors with backoff.
+
+        Args:
+            func (callable): The API call.
+            model: The model.
+            tokens (int): Estimated tokens for the request.
+            usage (callable, optional): Returns the actual tokens used from the response.
+
+        Returns:
+            The result of func.
+
+        Raises:
+            The last rate limit error once retries are exhausted, or any other error at once.
+        """
+        for attempt in range(self.max_retries + 1):
+            wait = self.reserve(model, tokens)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                result = func()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self._on_rate_limit(model, attempt, e)
+                continue
+            if usage is not None:
+                self.record_usage(model, tokens, usage(result))
+            return result
+
+    async def acall(self, func: Callable[[], Awaitable[Any]], model: Any, tokens: int = 0,
+                    usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        """
+        Async counterpart of call(): awaits func() and sleeps without blocking the event loop.
+        """
+        for attempt in range(self.max_retries + 1):
+            wait = self.reserve(model, tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await func()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self._on_rate_limit(model, attempt, e)
+                continue
+            if usage is not None:
+                self.record_usage(model, tokens, usage(result))
+            return result
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """
+    Return True if e is a rate limit or quota error (HTTP 429 or RESOURCE_EXHAUSTED).
+    """
+    for holder in (e, getattr(e, "response", None)):
+        for attr in ("status_code", "code", "status"):
+            if getattr(holder, attr, None) == 429:
+                return True
+    error_str = str(e)
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+
+
+def get_retry_after(e: Exception) -> Optional[float]:
+    """
+    Return the delay in seconds requested by the provider for a rate limit error, if any.
+
+    Reads the Retry-After header (seconds or an HTTP date) of the error's response, or a
+    retryDelay such as "30s" in the error details (as sent by Google APIs).
+    """
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    value = None
+    if headers is not None:
+        try:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+        except Exception:
+            value = None
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except Exception:
+                pass
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(e))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Roughly estimate the tokens in text (about four characters per token).
+    """
+    return max(1, len(text) // 4) if text else 0
+
+
+def response_token_usage(response: Any) -> Optional[int]:
+    """
+    Return the total tokens reported in an LLM response, or None if it does not report usage.
+    Usage is read by response.response_usage(), as for telemetry.
+    """
+    usage = response_usage(response)
+    return usage["total_tokens"] if usage is not None else None
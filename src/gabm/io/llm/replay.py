@@ -0,0 +1,281 @@
+"""
+Replay of recorded LLM responses, for reproducing runs offline.
+
+- ReplayLLMService answers send(), asend(), send_many() and the other LLMService methods purely
+  from a service's existing cache, any cache bundles and its JSONL logs (including rolled logs).
+- The lookup index is built once at startup; no API key or network connection is needed.
+- A prompt with no recorded response raises LookupError at once, or is passed to an optional
+  fallback service (e.g. the live service) when one is given.
+- Nothing is written: the recorded cache and logs are left exactly as they were.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+from pathlib import Path
+import threading
+from typing import Any, Dict, Optional, Sequence, Type, Union
+# Shared utilities for caching and logging
+from gabm.utils.logging import setup_module_logger
+from .bundle import CacheBundle
+from .cache import CacheStore, PromptTable
+from .llm_service import LLMService
+from .log_writer import iter_log_entries
+from .response import LLMResponse
+from .utils import get_prompt_table_path, load_llm_cache, load_models_from_json, log_entry_prompt, make_cache_key
+
+
+class ReplayLLMService(LLMService):
+    """
+    LLM service that replays recorded responses instead of calling an API.
+
+    Responses are looked up in the service's cache, then in the cache bundles, then in the JSONL
+    logs. Responses found only in a log are returned as LLMResponse records holding the logged text.
+
+    Attributes:
+        fallback (LLMService): Service used for prompts with no recorded response, or None to fail fast.
+        cache_hits (int): Number of responses replayed from the cache.
+        bundle_hits (int): Number of responses replayed from cache bundles.
+        log_hits (int): Number of responses replayed from JSONL logs.
+        misses (int): Number of prompts with no recorded response.
+    """
+
+    def __init__(
+        self,
+        service: Union[str, Type[LLMService]],
+        default_model: Optional[str] = None,
+        fallback: Optional[LLMService] = None,
+        cache_bundles: Sequence[Union[Path, str]] = (),
+        jsonl_paths: Sequence[Union[Path, str]] = (),
+        cache_backend: str = "segment",
+        cache_options: Optional[Dict[str, Any]] = None,
+        logger: Optional[Any] = None
+    ):
+        """
+        Build the replay index.
+
+        Args:
+            service (str or LLMService subclass): The service whose recordings to replay, by name
+                (e.g. "openai") or class (e.g. OpenAIService, which also sets the default model and
+                how text is extracted from cached responses).
+            default_model (str, optional): Model used when none is given. Defaults to the service class's.
+            fallback (LLMService, optional): Service to call for prompts with no recorded response.
+            cache_bundles (sequence of Path or str): Cache bundles to replay from as well.
+            jsonl_paths (sequence of Path or str): Further JSONL logs to replay from (e.g. from another machine).
+            cache_backend (str): Backend of the recorded cache ("segment", "sqlite" or "pickle").
+            cache_options (dict, optional): Extra keyword arguments for the cache store.
+                Segment caches are opened lazily by default.
+            logger (optional): Logger to use. Defaults to a module logger writing to data/logs/llm/replay.log.
+        """
+        if isinstance(service, str):
+            self.SERVICE_NAME = service
+        else:
+            self.SERVICE_NAME = service.SERVICE_NAME
+            self.DEFAULT_MODEL = service.DEFAULT_MODEL
+            self.simple_extract_text = service.simple_extract_text
+        if default_model is not None:
+            self.DEFAULT_MODEL = default_model
+        # Bundles are kept apart from the cache so that hits can be counted per source
+        super().__init__(
+            logger=logger or setup_module_logger(__name__, "replay.log"),
+            cache_backend=cache_backend,
+            cache_options=cache_options
+        )
+        self.fallback = fallback
+        self.bundles = [CacheBundle(path, self.logger) for path in cache_bundles]
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.bundle_hits = 0
+        self.log_hits = 0
+        self.misses = 0
+        # cache key -> (model, text) for responses found only in the logs
+        self._log_index: Dict[str, tuple] = {}
+        self._models = set()
+        self._index_log(self.jsonl_path, self.prompt_table)
+        for path in jsonl_paths:
+            # Logs from elsewhere resolve prompt fingerprints through the prompt table beside them
+            self._index_log(Path(path), self._read_prompt_table(get_prompt_table_path(path)))
+        self.logger.info(
+            f"[replay {self.SERVICE_NAME}] Indexed {len(self.cache)} cached responses, "
+            f"{sum(len(bundle) for bundle in self.bundles)} bundled responses and {len(self._log_index)} logged responses."
+        )
+
+    def _open_cache(self, backend, options, limits, bundles) -> CacheStore:
+        """
+        Open the recorded cache read-only: a service with no cache replays from an empty store, and
+        a legacy pickle cache with no segment or database is read as it is rather than imported.
+        """
+        options = dict(options or {})
+        if backend == "segment":
+            options.setdefault("lazy", True)
+        return load_llm_cache(self.cache_path, self.logger, backend=backend, read_only=True, **options)
+
+    def _open_prompt_table(self):
+        """
+        Open the recorded prompt table read-only, to resolve the prompts of logged responses.
+        """
+        return self._read_prompt_table(get_prompt_table_path(self.cache_path))
+
+    def _read_prompt_table(self, path: Path) -> Optional[PromptTable]:
+        return PromptTable(path, self.logger, read_only=True) if path.exists() else None
+
+    def _index_log(self, path: Path, prompt_table: Optional[PromptTable] = None) -> None:
+        for entry in iter_log_entries(path):
+            model = entry.get("model")
+            self._models.add(model)
+            cache_key = entry.get("cache_key")
+            if cache_key is None:
+                prompt = log_entry_prompt(entry, prompt_table)
+                if prompt is None:
+                    continue
+                cache_key = make_cache_key(prompt, model)
+            if cache_key in self.cache or entry.get("response") is None:
+                continue
+            # A later entry for the same prompt supersedes an earlier one, as in the cache
+            self._log_index[cache_key] = (model, entry.get("response"))
+
+    def lookup(self, message: str, model: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """
+        Return the recorded response for a prompt, or None if there is none.
+
+        Args:
+            message (str): The prompt.
+            model (str, optional): The model (default: DEFAULT_MODEL).
+            params (dict, optional): Extra request parameters that were part of the cache key.
+
+        Returns:
+            The recorded response, or None.
+        """
+        model = model or self.DEFAULT_MODEL
+        cache_key = make_cache_key(message, model, params)
+        cached = self.cache.get(cache_key)
+        if cached is None and params is None:
+            # Earlier releases keyed caches on (prompt, model)
+            cached = self.cache.get((message, model))
+        if cached is not None:
+            with self._lock:
+                self.cache_hits += 1
+            return cached
+        for bundle in self.bundles:
+            if cache_key in bundle:
+                with self._lock:
+                    self.bundle_hits += 1
+                return bundle[cache_key]
+        logged = self._log_index.get(cache_key)
+        if logged is not None:
+            with self._lock:
+                self.log_hits += 1
+            return LLMResponse(logged[1], model=logged[0])
+        return None
+
+    def _miss(self, message: str, model: Optional[str]) -> None:
+        with self._lock:
+            self.misses += 1
+        self.logger.error(f"[replay {self.SERVICE_NAME}] No recorded response for model={model}, message={message}")
+        if self.fallback is None:
+            raise LookupError(f"No recorded {self.SERVICE_NAME} response for model={model}, message={message!r}")
+
+    def _check_api_key(self, api_key):
+        """
+        Replayed responses need no API key; the fallback service checks its own.
+        """
+
+    def _pre_send_check_and_cache(self, api_key, message, model):
+        """
+        Return the recorded response for (message, model), or None. No API key is needed.
+        """
+        return self.lookup(message, model)
+
+    def send(self, api_key, message, model=None):
+        """
+        Return the recorded response for a prompt.
+
+        Args:
+            api_key (str): Ignored, unless the prompt is passed to the fallback service.
+            message (str): The prompt.
+            model (str, optional): The model (default: DEFAULT_MODEL).
+
+        Returns:
+            The recorded response, or the fallback service's response.
+
+        Raises:
+            LookupError: If there is no recorded response and no fallback service.
+        """
+        model = model or self.DEFAULT_MODEL
+        response = self.lookup(message, model)
+        if response is not None:
+            return response
+        self._miss(message, model)
+        return self.fallback.send(api_key, message, model)
+
+    async def asend(self, api_key, message, model=None):
+        """
+        Async counterpart of send(). Recorded responses are returned without awaiting anything.
+        """
+        model = model or self.DEFAULT_MODEL
+        response = self.lookup(message, model)
+        if response is not None:
+            return response
+        self._miss(message, model)
+        return await self.fallback.asend(api_key, message, model)
+
+    def send_stream(self, api_key, message, model=None, on_text=None, stop=None):
+        """
+        Return the recorded text for a prompt, passing it to on_text in one chunk.
+
+        A text recorded by send_stream() with the same stop hook is preferred to a send() response.
+        The stop hook is not applied to replayed texts.
+        """
+        model = model or self.DEFAULT_MODEL
+        params = {"stream": True}
+        if getattr(stop, "cache_key", None) is not None:
+            params["stop"] = list(stop.cache_key)
+        text = self.lookup(message, model, params)
+        if text is None:
+            response = self.lookup(message, model)
+            if response is None:
+                self._miss(message, model)
+                return self.fallback.send_stream(api_key, message, model, on_text=on_text, stop=stop)
+            text = self.simple_extract_text(response)
+        if on_text is not None and isinstance(text, str):
+            on_text(text)
+        return text
+
+    def list_available_models(self, api_key=None):
+        """
+        Return the service's recorded model list (models.json), or else the models seen in the logs.
+        """
+        models_json = self.cache_path.parent / "models.json"
+        if models_json.exists():
+            return load_models_from_json(models_json)
+        return sorted(model for model in self._models if model is not None)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the number of responses replayed from each source and of misses.
+        """
+        with self._lock:
+            return {
+                "cache_hits": self.cache_hits,
+                "bundle_hits": self.bundle_hits,
+                "log_hits": self.log_hits,
+                "misses": self.misses,
+            }
+
+    def flush(self):
+        """
+        Nothing is written by a replay service; flushes the fallback service, if any.
+        """
+        if self.fallback is not None:
+            self.fallback.flush()
+
+    def close(self):
+        """
+        Close the recorded cache and bundles (not the fallback service, which the caller owns).
+        """
+        super().close()
+        for bundle in self.bundles:
+            bundle.close()
@@ -0,0 +1,297 @@
+"""
+Compact, provider-independent records of LLM responses.
+
+- LLMResponse keeps the response text, finish reason, token usage, model and latency, which is
+  all GABM needs from a response, instead of the provider's SDK object.
+- The full provider payload can optionally be kept, converted to JSON and compressed.
+- Records pickle to a small fraction of the size of SDK objects, load quickly and do not depend on
+  the SDK version that created them.
+- str(record) is the response text, so code that extracts text with str() keeps working.
+- encode_value() and decode_value() serialise records (and plain JSON data) to tagged JSON, the
+  pickle-free value format of cache segments, which any Python version and SDK version can read.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import base64
+import json
+import zlib
+from typing import Any, Dict, Optional
+
+
+def _field(obj: Any, name: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _first(obj: Any, name: str) -> Any:
+    items = _field(obj, name)
+    if isinstance(items, (list, tuple)) and items:
+        return items[0]
+    return None
+
+
+def response_finish_reason(response: Any) -> Optional[str]:
+    """
+    Return the finish reason of an LLM response (OpenAI-style choices or Gemini candidates), or None.
+    """
+    for name in ("choices", "candidates"):
+        first = _first(response, name)
+        if first is not None:
+            reason = _field(first, "finish_reason")
+            if reason is not None:
+                # Gemini returns an enum
+                return str(getattr(reason, "name", reason))
+    return None
+
+
+def response_usage(response: Any) -> Optional[Dict[str, Optional[int]]]:
+    """
+    Return the token usage of an LLM response as {"prompt_tokens", "completion_tokens", "total_tokens"},
+    or None if it does not report usage. Understands OpenAI-style usage and Gemini usage metadata.
+    """
+    usage = _field(response, "usage")
+    if usage is not None:
+        names = ("prompt_tokens", "completion_tokens", "total_tokens")
+    else:
+        usage = _field(response, "usage_metadata")
+        names = ("prompt_token_count", "candidates_token_count", "total_token_count")
+    if usage is None:
+        return None
+    values = [_field(usage, name) for name in names]
+    return {
+        key: value if isinstance(value, int) else None
+        for key, value in zip(("prompt_tokens", "completion_tokens", "total_tokens"), values)
+    }
+
+
+def response_text(response: Any) -> str:
+    """
+    Return the text of a provider response: the first OpenAI-style choice's message content,
+    Gemini's text, or str(response).
+    """
+    first = _first(response, "choices")
+    if first is not None:
+        content = _field(_field(first, "message"), "content")
+        if isinstance(content, str):
+            return content
+    try:
+        text = _field(response, "text")
+    except Exception:
+        # Gemini raises if the response has no text part
+        text = None
+    if isinstance(text, str):
+        return text
+    return str(response)
+
+
+def to_jsonable(response: Any) -> Any:
+    """
+    Convert a provider response to JSON-compatible data: pydantic models with model_dump(),
+    objects with to_dict(), dicts and lists as they are, anything else as its string.
+    """
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json")
+    if hasattr(response, "to_dict"):
+        response = response.to_dict()
+    try:
+        return json.loads(json.dumps(response, default=str))
+    except (TypeError, ValueError):
+        return str(response)
+
+
+class LLMResponse:
+    """
+    A compact record of an LLM response.
+
+    Attributes:
+        text (str): The response text.
+        finish_reason (str): Why generation stopped (e.g. "stop", "length"), if reported.
+        usage (dict): Token counts {"prompt_tokens", "completion_tokens", "total_tokens"}, if reported.
+        model (str): The model that produced the response.
+        latency (float): Seconds the request took, if measured.
+    """
+    __slots__ = ("text", "finish_reason", "usage", "model", "latency", "raw_data")
+
+    def __init__(
+        self,
+        text: str,
+        finish_reason: Optional[str] = None,
+        usage: Optional[Dict[str, Optional[int]]] = None,
+        model: Optional[str] = None,
+        latency: Optional[float] = None,
+        raw_data: Optional[bytes] = None
+    ):
+        """
+        Initialize the record.
+
+        Args:
+            text (str): The response text.
+            finish_reason (str, optional): Why generation stopped.
+            usage (dict, optional): Token counts.
+            model (str, optional): The model.
+            latency (float, optional): Seconds the request took.
+            raw_data (bytes, optional): The compressed JSON provider payload.
+        """
+        self.text = text
+        self.finish_reason = finish_reason
+        self.usage = usage
+        self.model = model
+        self.latency = latency
+        self.raw_data = raw_data
+
+    @classmethod
+    def from_raw(
+        cls,
+        response: Any,
+        text: str,
+        model: Optional[str] = None,
+        latency: Optional[float] = None,
+        keep_raw: bool = False
+    ) -> "LLMResponse":
+        """
+        Create a record from a provider response.
+
+        Args:
+            response: The provider response (SDK object or dict).
+            text (str): The response text, as extracted by the service.
+            model (str, optional): The model requested; the model reported in the response is preferred.
+            latency (float, optional): Seconds the request took.
+            keep_raw (bool): Whether to keep the full payload (as compressed JSON).
+
+        Returns:
+            LLMResponse: The record.
+        """
+        reported = _field(response, "model") or _field(response, "model_version")
+        raw_data = None
+        if keep_raw:
+            payload = json.dumps(to_jsonable(response), ensure_ascii=False, separators=(",", ":"))
+            raw_data = zlib.compress(payload.encode("utf-8"))
+        return cls(
+            text,
+            finish_reason=response_finish_reason(response),
+            usage=response_usage(response),
+            model=reported if isinstance(reported, str) else model,
+            latency=latency,
+            raw_data=raw_data
+        )
+
+    @property
+    def raw(self) -> Any:
+        """The full provider payload as JSON data, or None if it was not kept."""
+        if self.raw_data is None:
+            return None
+        return json.loads(zlib.decompress(self.raw_data).decode("utf-8"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the record as a dict (without the raw payload).
+        """
+        return {
+            "text": self.text,
+            "finish_reason": self.finish_reason,
+            "usage": self.usage,
+            "model": self.model,
+            "latency": self.latency,
+        }
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"LLMResponse(text={self.text!r}, finish_reason={self.finish_reason!r}, model={self.model!r})"
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, LLMResponse):
+            return NotImplemented
+        return self.to_dict() == other.to_dict() and self.raw_data == other.raw_data
+
+
+# Tags for values that JSON cannot represent directly
+_TAG_RESPONSE = "$response"
+_TAG_BYTES = "$bytes"
+_TAG_TUPLE = "$tuple"
+_TAG_DICT = "$dict"
+_TAGS = (_TAG_RESPONSE, _TAG_BYTES, _TAG_TUPLE, _TAG_DICT)
+
+
+def _tagged(value: Any) -> Any:
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, LLMResponse):
+        raw_data = None if value.raw_data is None else base64.b64encode(value.raw_data).decode("ascii")
+        return {_TAG_RESPONSE: [value.text, value.finish_reason, value.usage, value.model, value.latency, raw_data]}
+    if isinstance(value, list):
+        return [_tagged(item) for item in value]
+    if isinstance(value, tuple):
+        return {_TAG_TUPLE: [_tagged(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and not key.startswith("$") for key in value):
+            return {key: _tagged(item) for key, item in value.items()}
+        return {_TAG_DICT: [[_tagged(key), _tagged(item)] for key, item in value.items()]}
+    if isinstance(value, (bytes, bytearray)):
+        return {_TAG_BYTES: base64.b64encode(value).decode("ascii")}
+    raise TypeError(
+        f"Cannot serialise {type(value).__name__} without pickle; convert responses to LLMResponse records first."
+    )
+
+
+def _untagged(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        tag, data = next(iter(obj.items()))
+        if tag == _TAG_RESPONSE:
+            text, finish_reason, usage, model, latency, raw_data = data
+            raw_data = None if raw_data is None else base64.b64decode(raw_data)
+            return LLMResponse(text, finish_reason, usage, model, latency, raw_data)
+        if tag == _TAG_BYTES:
+            return base64.b64decode(data)
+        if tag == _TAG_TUPLE:
+            return tuple(data)
+        if tag == _TAG_DICT:
+            return {key: item for key, item in data}
+    return obj
+
+
+# Reused, as creating them is a large part of the cost of coding one small value
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_DECODER = json.JSONDecoder(object_hook=_untagged)
+
+
+def to_record(value: Any, keep_raw: bool = False) -> Any:
+    """
+    Return value in a form encode_value() can serialise: plain data and LLMResponse records as
+    they are, and anything else (a provider SDK response) converted to an LLMResponse.
+
+    Args:
+        value: A cached value.
+        keep_raw (bool): Whether converted records keep the full provider payload.
+    """
+    try:
+        _tagged(value)
+    except TypeError:
+        return LLMResponse.from_raw(value, response_text(value), keep_raw=keep_raw)
+    return value
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    Serialise a value to tagged JSON (UTF-8).
+
+    Supports None, bools, numbers, strings, bytes, lists, tuples, dicts and LLMResponse records.
+
+    Raises:
+        TypeError: For any other type, e.g. a provider SDK object.
+    """
+    return _ENCODER.encode(_tagged(value)).encode("utf-8")
+
+
+def decode_value(data: bytes) -> Any:
+    """
+    Deserialise a value written by encode_value().
+    """
+    return _DECODER.decode(data.decode("utf-8"))
@@ -0,0 +1,319 @@
+"""
+Route prompts across several LLM services.
+
+- LLMRouter implements the LLMService interface on top of several configured backends (services).
+- Models are named by equivalence class (e.g. "apertus-8b"), each mapped to the model name on each backend that serves it.
+- Each request goes to the best available backend for its class, judged by recent latency percentiles,
+  error rate, cost and per-backend quota; on quota_exceeded or api_error it fails over to the next one.
+- Only requests a backend actually sends count towards its statistics, not hits in the backend's
+  own cache, and backends do not retry rate limit errors, so a quota error fails over at once.
+- Responses are cached by the router with the backend and model that served them.
+- Routed calls, cache hits and coalesced calls are recorded in the router's telemetry per model
+  class (see stats()); a failover to another backend counts as a retry. backend_stats() reports
+  the health of each backend.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+from collections import deque
+import copy
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional
+# LLM service base class
+from .llm_service import LLMService
+from .telemetry import CallTimer
+# Shared utilities for caching and logging
+from .utils import cache_and_log, lookup_cache, make_cache_key
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Return the q-th percentile (0-100) of values by the nearest-rank method, or None if there are none.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(min(rank, len(ordered))) - 1]
+
+
+class RouterBackend:
+    """
+    A service the router can send to, with its live statistics.
+
+    Attributes:
+        name (str): Backend name, used in model classes and recorded with responses.
+        service (LLMService): The service.
+        api_key (str): The API key for the service (None to use the service's environment variable).
+        cost (float): Relative cost per request, used to prefer cheaper backends.
+        requests_per_minute (float): Quota; the backend is skipped once this many requests were sent in the last minute.
+        cooldown (float): Seconds the backend is skipped after it reports quota_exceeded.
+    """
+
+    def __init__(self, name: str, service: LLMService, api_key: Optional[str] = None, cost: float = 0.0,
+                 requests_per_minute: Optional[float] = None, cooldown: float = 60.0, window: int = 100,
+                 retry_rate_limits: bool = False):
+        """
+        Initialize the backend.
+
+        Args:
+            name (str): Backend name.
+            service (LLMService): The service.
+            api_key (str, optional): The API key for the service.
+            cost (float): Relative cost per request.
+            requests_per_minute (float, optional): Quota in requests per minute.
+            cooldown (float): Seconds to skip the backend after quota_exceeded.
+            window (int): Number of recent requests the latency and error statistics are based on.
+            retry_rate_limits (bool): Whether the service retries rate limit errors itself. By default
+                calls routed to the backend use a rate limiter that shares the service's limits but
+                does not retry, so the router fails over to another backend at once. The service
+                itself is not changed, so other callers keep its retries.
+        """
+        self.name = name
+        self.service = service
+        self.retry_rate_limits = retry_rate_limits
+        self._no_retry_limiter = None
+        self._no_retry_source = None
+        self.api_key = api_key
+        self.cost = cost
+        self.requests_per_minute = requests_per_minute
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._sent: Deque[float] = deque()
+        self._cooling_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def get_api_key(self) -> Optional[str]:
+        """Return the API key for the service."""
+        return self.api_key or self.service.get_api_key()
+
+    def rate_limiter(self) -> Optional[Any]:
+        """
+        Return the rate limiter for routed calls, or None to use the service's own.
+        """
+        limiter = self.service.rate_limiter
+        if self.retry_rate_limits or not limiter.max_retries:
+            return None
+        with self._lock:
+            if self._no_retry_limiter is None or self._no_retry_source is not limiter:
+                # A shallow copy shares the token buckets (and lock) of the service's limiter
+                self._no_retry_limiter = copy.copy(limiter)
+                self._no_retry_limiter.max_retries = 0
+                self._no_retry_source = limiter
+            return self._no_retry_limiter
+
+    def available(self, now: float) -> bool:
+        """Return True if the backend is not cooling down and is within its quota."""
+        with self._lock:
+            if now < self._cooling_until:
+                return False
+            if self.requests_per_minute is not None:
+                while self._sent and self._sent[0] <= now - 60.0:
+                    self._sent.popleft()
+                if len(self._sent) >= self.requests_per_minute:
+                    return False
+            return True
+
+    def score(self) -> float:
+        """
+        Return the routing score; lower is better. Backends without statistics score 0, so they are tried.
+        """
+        with self._lock:
+            latency = percentile(list(self._latencies), 50) or 0.0
+            error_rate = (self._outcomes.count(False) / len(self._outcomes)) if self._outcomes else 0.0
+        return latency * (1.0 + 4.0 * error_rate) + self.cost
+
+    def record(self, latency: float, ok: bool, quota_exceeded: bool = False) -> None:
+        """Record the outcome of a request."""
+        with self._lock:
+            self.requests += 1
+            self._sent.append(time.monotonic())
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.append(latency)
+            else:
+                self.errors += 1
+            if quota_exceeded:
+                self._cooling_until = time.monotonic() + self.cooldown
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the backend statistics: requests, errors, error_rate, p50 and p95 latency, cooling_down."""
+        with self._lock:
+            latencies = list(self._latencies)
+            error_rate = (self._outcomes.count(False) / len(self._outcomes)) if self._outcomes else 0.0
+            cooling_down = time.monotonic() < self._cooling_until
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": error_rate,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "cooling_down": cooling_down,
+        }
+
+
+class LLMRouter(LLMService):
+    """
+    LLM service that routes each prompt to one of several backends serving an equivalent model.
+
+    The router keeps its own cache and JSONL log (in data/llm/router); each entry records the
+    backend and backend model that served it. The api_key argument of send() is ignored, as each
+    backend has its own key.
+    """
+    SERVICE_NAME = "router"
+
+    def __init__(self, backends: List[RouterBackend], model_classes: Dict[str, Dict[str, str]], *args, **kwargs):
+        """
+        Initialize the router.
+
+        Args:
+            backends (list of RouterBackend): The backends.
+            model_classes (dict): For each model class, the model name on each backend that serves it,
+                e.g. {"apertus-8b": {"publicai": "swiss-ai/apertus-8b-instruct", "apertus": "swiss-ai/Apertus-8B-2509"}}.
+                The first class is the default model.
+            *args, **kwargs: Passed to LLMService.
+        """
+        names = {backend.name for backend in backends}
+        for model_class, models in model_classes.items():
+            unknown = set(models) - names
+            if unknown:
+                raise ValueError(f"Model class {model_class} refers to unknown backends: {sorted(unknown)}")
+        super().__init__(*args, **kwargs)
+        self.backends = {backend.name: backend for backend in backends}
+        self.model_classes = model_classes
+        self.DEFAULT_MODEL = next(iter(model_classes), None)
+
+    def candidates(self, model_class: str) -> List[RouterBackend]:
+        """
+        Return the available backends for a model class, best first.
+
+        Args:
+            model_class (str): The model class.
+
+        Returns:
+            list of RouterBackend: Backends within quota and not cooling down, ordered by score.
+
+        """
+        if model_class not in self.model_classes:
+            raise ValueError(f"Unknown model class {model_class}; known classes: {list(self.model_classes)}")
+        now = time.monotonic()
+        backends = [self.backends[name] for name in self.model_classes[model_class]]
+        return sorted((b for b in backends if b.available(now)), key=lambda b: b.score())
+
+    def _check_api_key(self, api_key):
+        """
+        Backends check their own API keys.
+        """
+
+    def _pre_send_check_and_cache(self, api_key, message, model):
+        """
+        Return the cached response for (message, model class), or None on a miss. Backends check their own API keys.
+        """
+        entry = lookup_cache(self.cache, make_cache_key(message, model))
+        if entry is not None:
+            self.logger.info(f"Cache hit for model={model} (served by {entry['backend']}), message={message}")
+            self.telemetry.record_cache_hit(self.SERVICE_NAME, model)
+            return entry["response"]
+        return None
+
+    def get_backend(self, message, model=None):
+        """
+        Return (backend name, backend model) that served the cached response for a prompt, or None.
+        """
+        entry = self.cache.get(make_cache_key(message, model or self.DEFAULT_MODEL))
+        return (entry["backend"], entry["model"]) if entry is not None else None
+
+    def send(self, api_key, message, model=None):
+        """
+        Send a prompt to the best available backend for the model class, failing over on errors.
+
+        Args:
+            api_key: Ignored (each backend has its own API key).
+            message (str): Prompt to send.
+            model (str, optional): Model class (default: the first model class).
+
+        Returns:
+            The response of the backend that served the prompt, or the last error (None or an
+            error dict) if every backend failed.
+
+        """
+        model = model or self.DEFAULT_MODEL
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        cache_key = make_cache_key(message, model)
+        led = []
+        def leader_call():
+            led.append(True)
+            return self._route(cache_key, message, model)
+        result = self.single_flight.do(cache_key, leader_call)
+        if not led:
+            self.telemetry.record_coalesced(self.SERVICE_NAME, model)
+        return result
+
+    def _route(self, cache_key, message, model):
+        entry = self.cache.get(cache_key)
+        if entry is not None:
+            self.telemetry.record_cache_hit(self.SERVICE_NAME, model)
+            return entry["response"]
+        result = {"error": "no_backend", "details": f"No backend available for model class {model}"}
+        # One timer for the routed call: each backend tried is an attempt, so failovers count as retries
+        timer = CallTimer()
+        for backend in self.candidates(model):
+            backend_model = self.model_classes[model][backend.name]
+            # A hit in the backend's own cache says nothing about the backend's latency or health
+            backend_cached = make_cache_key(message, backend_model) in backend.service.cache
+            try:
+                with backend.service.using_rate_limiter(backend.rate_limiter()):
+                    response = timer.wrap(lambda: backend.service.send(backend.get_api_key(), message, backend_model))()
+            except Exception as e:
+                response = backend.service._error_result(e)
+            latency = timer.latency
+            failed = response is None or (isinstance(response, dict) and "error" in response)
+            quota_exceeded = failed and isinstance(response, dict) and response.get("error") == "quota_exceeded"
+            if not backend_cached:
+                backend.record(latency, not failed, quota_exceeded)
+            if failed:
+                self.logger.warning(f"[{self.SERVICE_NAME}] {backend.name} failed for model class {model}; failing over: {response}")
+                result = response
+                continue
+            cache_and_log(
+                self.cache, cache_key, {"backend": backend.name, "model": backend_model, "response": response},
+                self.cache_path, self.jsonl_path,
+                prompt=message, model=model, extra={"backend": backend.name, "backend_model": backend_model},
+                logger=self.logger,
+                extract_text_from_response=lambda entry: backend.service.simple_extract_text(entry["response"]),
+                prompt_table=self.prompt_table, log_writer=self.log_writer
+            )
+            self.telemetry.record_call(
+                self.SERVICE_NAME, model, timer, response, message, backend.service.simple_extract_text
+            )
+            return response
+        self.logger.error(f"[{self.SERVICE_NAME}] All backends failed for model class {model}.")
+        self.telemetry.record_call(self.SERVICE_NAME, model, timer, result, message)
+        return result
+
+    def list_available_models(self, api_key=None):
+        """
+        List the model classes and the backends serving each.
+
+        Args:
+            api_key: Ignored.
+
+        Returns:
+            dict: {model class: {backend name: backend model}}.
+
+        """
+        return {model_class: dict(models) for model_class, models in self.model_classes.items()}
+
+    def backend_stats(self):
+        """Return the health statistics of each backend (see RouterBackend.stats()), keyed by backend name."""
+        return {name: backend.stats() for name, backend in self.backends.items()}
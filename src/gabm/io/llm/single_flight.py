@@ -0,0 +1,105 @@
+"""
+Request coalescing ("single flight") for LLM calls.
+
+- When several threads or asyncio tasks make the same call at once (same key, e.g. the cache key of
+  a prompt and model), only the first (the leader) runs it; the others wait for its result.
+- Errors raised by the leader are raised in every waiting caller.
+- Counters record how many calls ran and how many were saved by waiting instead.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import asyncio
+from concurrent.futures import Future
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls with the same key. Safe to share between threads and event loops.
+
+    Attributes:
+        leaders (int): Number of calls that ran.
+        coalesced (int): Number of calls that waited for a leader instead of running (calls saved).
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """Return the future for key and whether the caller is the leader that must complete it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key: Hashable) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Call func, unless a call with the same key is in flight, in which case wait for its result.
+
+        Args:
+            key: Identifies equivalent calls.
+            func (callable): The call.
+
+        Returns:
+            The result of func (from this call or the one in flight).
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key)
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async counterpart of do(): awaits func(), or awaits the call in flight without blocking the event loop.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key)
+
+    def in_flight(self) -> int:
+        """Return the number of distinct calls in flight."""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the counters as a dict: leaders, coalesced and in_flight."""
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
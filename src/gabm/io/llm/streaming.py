@@ -0,0 +1,123 @@
+"""
+Helpers for streamed LLM responses.
+
+- Parse OpenAI-style server-sent events (SSE) into text chunks.
+- AnswerMatcher: an early-stop hook for send_stream() that stops generation as soon as the
+  response unambiguously names one of a closed set of answers (e.g. the answers of a survey question).
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import json
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+def iter_sse_chat_deltas(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Yield the text chunks of a streamed OpenAI-style chat completion.
+
+    Args:
+        lines: The lines of the event stream ("data: {...}" lines; other lines are ignored).
+
+    Yields:
+        str: The content of each chunk's delta that has any.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        for choice in chunk.get("choices") or []:
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+def _normalize(text: str) -> str:
+    """Lower case, with runs of non-word characters replaced by single spaces."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def _contains(text: str, words: str) -> bool:
+    """Return True if the normalized words occur as whole words in the normalized text."""
+    return re.search(r"\b" + re.escape(words) + r"\b", text) is not None
+
+
+class AnswerMatcher:
+    """
+    Early-stop hook matching a streamed response against a closed set of answers.
+
+    Call it with the text generated so far; it returns True once the text names exactly one
+    answer and cannot still grow into naming another. Matching ignores case and punctuation and
+    prefers the longest answer (e.g. "Strongly agree" over "agree").
+
+    Attributes:
+        answers (list of str): The answer texts.
+        matched (str): The matched answer, or None.
+    """
+
+    def __init__(self, answers: List[str]):
+        """
+        Initialize the matcher.
+
+        Args:
+            answers (list of str): The answer texts.
+        """
+        self.answers = list(answers)
+        self._normalized = [(answer, _normalize(answer)) for answer in self.answers if _normalize(answer)]
+        self.matched: Optional[str] = None
+
+    @property
+    def cache_key(self) -> Tuple[str, ...]:
+        """Identifies the matcher's behaviour, so responses cut short by it can be cached."""
+        return ("answers",) + tuple(self.answers)
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        Return the answer the text unambiguously names, or None.
+
+        Args:
+            text (str): The response so far.
+
+        Returns:
+            str: The matched answer text, or None.
+        """
+        normalized = _normalize(text)
+        found = []
+        for answer, option in self._normalized:
+            match = re.search(r"\b" + re.escape(option) + r"\b", normalized)
+            if match:
+                found.append((answer, option, match.start()))
+        # Drop answers that are part of a longer answer that was also found
+        found = [f for f in found if not any(f[1] != g[1] and _contains(g[1], f[1]) for g in found)]
+        if len(found) != 1:
+            return None
+        answer, option, start = found[0]
+        if re.search(r"[.!?\n]\s*$", text):
+            return answer
+        # Wait while the end of the text could still grow into a longer answer that overlaps the match
+        for word in re.finditer(r"\b\w", normalized[:start + 1]):
+            tail = normalized[word.start():]
+            if any(other != option and len(other) > len(tail) and other.startswith(tail)
+                   for _, other in self._normalized):
+                return None
+        return answer
+
+    def __call__(self, text: str) -> bool:
+        """
+        Return True if the text unambiguously names one answer (recording it in matched).
+        """
+        self.matched = self.match(text)
+        return self.matched is not None
@@ -0,0 +1,398 @@
+"""
+Per-call telemetry for LLM services: latency, queue wait, tokens, cost, cache hits and retries.
+
+- Telemetry keeps counters and fixed-bucket histograms in memory for each service and model,
+  cheap enough to leave on in every run. Services share one Telemetry when given the same instance.
+- For each API call it records the queue wait (time spent waiting for the rate limiter, in backoff
+  and on failed attempts before the final attempt), the network latency of the final attempt,
+  input and output tokens (as reported by the provider, otherwise estimated), an estimated cost
+  from a per-model price table, retries and whether the call failed.
+- Cache hits, cache misses and calls coalesced with an identical in-flight call are counted too.
+- stats() returns a nested dict with latency percentiles estimated from the histograms;
+  to_prometheus() and write_prometheus() produce the Prometheus text exposition format, e.g. for
+  the node_exporter textfile collector or a push gateway.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import bisect
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple, Union
+# Local imports
+from .rate_limit import estimate_tokens
+from .response import response_usage
+
+# Upper bounds in seconds of the histogram buckets (the last bucket, +Inf, is implicit)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of non-negative values, as in Prometheus.
+
+    Attributes:
+        buckets (tuple of float): Upper bounds of the buckets, ascending.
+        counts (list of int): Number of values in each bucket, with one more for values above the last bound.
+        count (int): Number of values.
+        sum (float): Sum of the values.
+        max (float): Largest value.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Add a value.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-th percentile (0-100) by linear interpolation within its bucket, or None if empty.
+        """
+        if not self.count:
+            return None
+        rank = self.count * q / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """
+        Return count, sum, mean, p50, p90, p99 and max.
+        """
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else None,
+        }
+
+
+class CallTimer:
+    """
+    Times the attempts of one API call, which may be retried by the rate limiter.
+
+    Wrap the API call with wrap() (or awrap()) inside the rate limiter, then pass the timer to
+    Telemetry.record_call() once the call has returned.
+
+    Attributes:
+        start (float): When the call was issued (time.monotonic()).
+        attempts (int): Number of attempts made.
+        attempt_start (float): When the last attempt started.
+        latency (float): Seconds the last attempt took.
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.attempts = 0
+        self.attempt_start = None
+        self.latency = 0.0
+
+    def wrap(self, api_call: Callable[[], Any]) -> Callable[[], Any]:
+        """
+        Return api_call timed.
+        """
+        def timed_call():
+            self.attempts += 1
+            self.attempt_start = time.monotonic()
+            try:
+                return api_call()
+            finally:
+                self.latency = time.monotonic() - self.attempt_start
+        return timed_call
+
+    def awrap(self, api_call: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        """
+        Async counterpart of wrap().
+        """
+        async def timed_call():
+            self.attempts += 1
+            self.attempt_start = time.monotonic()
+            try:
+                return await api_call()
+            finally:
+                self.latency = time.monotonic() - self.attempt_start
+        return timed_call
+
+    @property
+    def queue_wait(self) -> float:
+        """
+        Seconds from the call being issued to the start of its last attempt (or until now, if no attempt was made).
+        """
+        end = self.attempt_start if self.attempt_start is not None else time.monotonic()
+        return max(0.0, end - self.start)
+
+
+class _ModelMetrics:
+    def __init__(self, buckets: Sequence[float]):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coalesced = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.estimated_usage = 0
+        self.cost = 0.0
+        self.latency = Histogram(buckets)
+        self.queue_wait = Histogram(buckets)
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else None,
+            "coalesced": self.coalesced,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "estimated_usage": self.estimated_usage,
+            "cost": self.cost,
+            "latency": self.latency.summary(),
+            "queue_wait": self.queue_wait.summary(),
+        }
+
+
+class Telemetry:
+    """
+    In-memory metrics of LLM calls, per service and model.
+
+    Attributes:
+        prices (dict): {model: (input price, output price)} per million tokens, for cost estimates.
+            Models without a price cost nothing.
+        buckets (tuple of float): Histogram bucket upper bounds in seconds.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, float]]] = None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize empty metrics.
+
+        Args:
+            prices (dict, optional): {model: (input price, output price)} per million tokens,
+                e.g. {"gpt-4o": (2.5, 10.0)} for US dollars.
+            buckets (sequence of float): Histogram bucket upper bounds in seconds.
+        """
+        self.prices = dict(prices or {})
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._metrics: Dict[Tuple[str, str], _ModelMetrics] = {}
+
+    def _get(self, service: str, model: Any) -> _ModelMetrics:
+        # Called with the lock held
+        key = (str(service), str(model))
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            metrics = self._metrics[key] = _ModelMetrics(self.buckets)
+        return metrics
+
+    def estimate_cost(self, model: Any, tokens_in: int, tokens_out: int) -> float:
+        """
+        Return the estimated cost of a call from the price table (0.0 for models without a price).
+        """
+        price = self.prices.get(model)
+        if price is None:
+            return 0.0
+        return (tokens_in * price[0] + tokens_out * price[1]) / 1_000_000
+
+    def record_cache_hit(self, service: str, model: Any) -> None:
+        """
+        Count a response served from the cache.
+        """
+        with self._lock:
+            self._get(service, model).cache_hits += 1
+
+    def record_coalesced(self, service: str, model: Any) -> None:
+        """
+        Count a cache miss answered by an identical call already in flight.
+        """
+        with self._lock:
+            metrics = self._get(service, model)
+            metrics.cache_misses += 1
+            metrics.coalesced += 1
+
+    def record_call(
+        self,
+        service: str,
+        model: Any,
+        timer: CallTimer,
+        response: Any,
+        message: Optional[str] = None,
+        extract_text: Optional[Callable[[Any], str]] = None
+    ) -> None:
+        """
+        Record an API call (a cache miss) once it has returned.
+
+        Args:
+            service (str): The service name.
+            model: The model.
+            timer (CallTimer): The call's timer.
+            response: The response, or None or an error dict if the call failed.
+            message (str, optional): The prompt, to estimate input tokens if the response reports no usage.
+            extract_text (callable, optional): Returns the response text, to estimate output tokens
+                if the response reports no usage (a str response is its own text).
+        """
+        failed = response is None or (isinstance(response, dict) and "error" in response)
+        usage = None if failed else response_usage(response)
+        tokens_in = (usage or {}).get("prompt_tokens")
+        tokens_out = (usage or {}).get("completion_tokens")
+        estimated = not failed and (tokens_in is None or tokens_out is None)
+        if tokens_in is None:
+            tokens_in = estimate_tokens(message)
+        if tokens_out is None:
+            if failed:
+                tokens_out = 0
+            elif isinstance(response, str):
+                tokens_out = estimate_tokens(response)
+            else:
+                tokens_out = estimate_tokens(extract_text(response) if extract_text is not None else str(response))
+        cost = self.estimate_cost(model, tokens_in, tokens_out) if not failed else 0.0
+        with self._lock:
+            metrics = self._get(service, model)
+            metrics.calls += 1
+            metrics.cache_misses += 1
+            metrics.retries += max(0, timer.attempts - 1)
+            if failed:
+                metrics.errors += 1
+            else:
+                metrics.tokens_in += tokens_in
+                metrics.tokens_out += tokens_out
+                metrics.estimated_usage += int(estimated)
+                metrics.cost += cost
+            if timer.attempts:
+                metrics.latency.observe(timer.latency)
+            metrics.queue_wait.observe(timer.queue_wait)
+
+    def stats(self, service: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Return the metrics as {service: {model: metrics}}, or {model: metrics} for one service.
+
+        Each model's metrics are calls, errors, retries, cache_hits, cache_misses, cache_hit_rate,
+        coalesced, tokens_in, tokens_out, estimated_usage (calls whose tokens were estimated), cost,
+        and latency and queue_wait summaries (count, sum, mean, p50, p90, p99 and max, in seconds).
+        """
+        result: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for (name, model), metrics in sorted(self._metrics.items()):
+                result.setdefault(name, {})[model] = metrics.to_dict()
+        if service is not None:
+            return result.get(service, {})
+        return result
+
+    def reset(self) -> None:
+        """
+        Discard all metrics.
+        """
+        with self._lock:
+            self._metrics.clear()
+
+    def to_prometheus(self, prefix: str = "gabm_llm") -> str:
+        """
+        Return the metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): Prefix of the metric names.
+
+        Returns:
+            str: The exposition text.
+        """
+        counters = [
+            ("calls", "API calls made", lambda m: m.calls),
+            ("errors", "API calls that failed", lambda m: m.errors),
+            ("retries", "Retries after rate limit errors", lambda m: m.retries),
+            ("cache_hits", "Responses served from the cache", lambda m: m.cache_hits),
+            ("cache_misses", "Requests not served from the cache", lambda m: m.cache_misses),
+            ("coalesced", "Cache misses answered by an identical call in flight", lambda m: m.coalesced),
+            ("cost", "Estimated cost of API calls", lambda m: m.cost),
+        ]
+        with self._lock:
+            rows = [
+                (
+                    _labels(name, model),
+                    [get(metrics) for _, _, get in counters],
+                    (metrics.tokens_in, metrics.tokens_out),
+                    {
+                        "latency": (list(metrics.latency.counts), metrics.latency.sum, metrics.latency.count),
+                        "queue_wait": (list(metrics.queue_wait.counts), metrics.queue_wait.sum, metrics.queue_wait.count),
+                    },
+                )
+                for (name, model), metrics in sorted(self._metrics.items())
+            ]
+        lines = []
+        for i, (metric, help_text, _) in enumerate(counters):
+            lines.append(f"# HELP {prefix}_{metric}_total {help_text}.")
+            lines.append(f"# TYPE {prefix}_{metric}_total counter")
+            for labels, values, _, _ in rows:
+                lines.append(f"{prefix}_{metric}_total{{{labels}}} {_number(values[i])}")
+        lines.append(f"# HELP {prefix}_tokens_total Tokens sent (in) and received (out).")
+        lines.append(f"# TYPE {prefix}_tokens_total counter")
+        for labels, _, (tokens_in, tokens_out), _ in rows:
+            lines.append(f"{prefix}_tokens_total{{{labels},direction=\"in\"}} {tokens_in}")
+            lines.append(f"{prefix}_tokens_total{{{labels},direction=\"out\"}} {tokens_out}")
+        for metric, help_text in (("latency", "Network latency of API calls"), ("queue_wait", "Time API calls waited before their final attempt")):
+            lines.append(f"# HELP {prefix}_{metric}_seconds {help_text}.")
+            lines.append(f"# TYPE {prefix}_{metric}_seconds histogram")
+            for labels, _, _, histograms in rows:
+                counts, total, count = histograms[metric]
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(f"{prefix}_{metric}_seconds_bucket{{{labels},le=\"{le}\"}} {cumulative}")
+                lines.append(f"{prefix}_{metric}_seconds_sum{{{labels}}} {_number(total)}")
+                lines.append(f"{prefix}_{metric}_seconds_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Union[Path, str], prefix: str = "gabm_llm") -> None:
+        """
+        Write the metrics in the Prometheus text exposition format, replacing the file atomically
+        (so a collector never reads a partial file).
+
+        Args:
+            path (Path or str): The file to write (e.g. a .prom file for the node_exporter textfile collector).
+            prefix (str): Prefix of the metric names.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.to_prometheus(prefix), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def _labels(service: str, model: str) -> str:
+    return f"service=\"{_escape(service)}\",model=\"{_escape(model)}\""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace("\"", "\\\"")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
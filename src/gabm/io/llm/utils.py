@@ -4,6 +4,12 @@ Utility functions for LLM API error handling, model listing, caching, and valida
 - Provides a decorator for safe API calls.
 - Provides utilities to write model lists as both JSON and TXT for all LLMs.
 - Provides a loader for model lists from JSON for validation and selection.
+- Provides a loader for persistent prompt/response cache stores (see cache.py), optionally bounded.
+- Provides readers and writers for the pickle-free (tagged JSON) cache segment format, and
+  migration of existing pickle caches to it.
+- Provides canonical, hashed cache keys shared by all LLM services.
+- Provides pooled, keep-alive HTTP sessions for services that call HTTP APIs directly.
+- Passes rate limit errors up to the service so they are reported rather than dropped.
 
 This supports a unified workflow for model management across all LLM providers in the project.
 """
@@ -14,14 +20,25 @@ __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
 
 # Standard library imports
+import asyncio
 from datetime import datetime
 import functools
+import hashlib
 import json
 import logging
 import os
 from pathlib import Path
 import pickle
-from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+# HTTP client library
+import requests
+from requests.adapters import HTTPAdapter
+# Persistent cache stores
+from .cache import CacheStore, AppendOnlyCacheStore, BoundedCacheStore, PickleCacheStore, PromptTable, SQLiteCacheStore, segment_serialiser
+from .log_writer import JSONLLogWriter
+from .rate_limit import is_rate_limit_error
+from .response import to_record
 
 
 def safe_api_call(api_name: str) -> Callable:
@@ -46,6 +63,26 @@ def safe_api_call(api_name: str) -> Callable:
         return wrapper
     return decorator
 
+def create_http_session(pool_size: int = 10, headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """
+    Create a requests session that keeps up to pool_size connections per host alive for reuse.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host.
+        headers (dict, optional): Headers sent with every request.
+
+    Returns:
+        requests.Session: The session.
+
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
 def list_models_to_txt(
     models: Iterable[Any],
     models_path: Path,
@@ -141,42 +178,262 @@ def load_models_from_json(models_json_path: Path) -> List[Any]:
         logging.error(f"Error loading models from JSON {models_json_path}: {e}")
         return []
 
-def load_llm_cache(cache_path: Path, logger: Optional[Any] = None) -> Dict[Any, Any]:
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalise a prompt for hashing: Unicode NFC form, Unix line endings and no surrounding whitespace.
+
+    Args:
+        prompt (str): The prompt text.
+
+    Returns:
+        str: The normalised prompt.
+
+    """
+    return unicodedata.normalize("NFC", prompt).replace("\r\n", "\n").replace("\r", "\n").strip()
+
+def prompt_fingerprint(prompt: str) -> str:
+    """
+    Return a stable fingerprint (BLAKE2b hex digest) of the normalised prompt.
+
+    Args:
+        prompt (str): The prompt text.
+
+    Returns:
+        str: 32 character hex digest.
+
     """
-    Load a pickle cache from the given path. Returns an empty dict if not found or on error.
+    return hashlib.blake2b(normalize_prompt(prompt).encode("utf-8"), digest_size=16).hexdigest()
+
+def log_entry_prompt(entry: Dict[str, Any], prompt_table: Optional[PromptTable] = None) -> Optional[str]:
+    """
+    Return the prompt of a JSONL log entry, looking it up in the prompt side table if the entry
+    records only its fingerprint.
+
+    Args:
+        entry (dict): The log entry.
+        prompt_table (PromptTable, optional): The service's prompt side table.
+
+    Returns:
+        str: The prompt text, or None if it is not recorded.
+    """
+    if entry.get("prompt") is not None:
+        return entry["prompt"]
+    fingerprint = entry.get("prompt_fingerprint")
+    if fingerprint is None or prompt_table is None:
+        return None
+    return prompt_table.get(fingerprint)
+
+def make_cache_key(prompt: str, model: Optional[str], params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Return the canonical cache key for a prompt sent to a model with the given generation parameters.
+
+    The key is a BLAKE2b hex digest over the prompt fingerprint, the model name and the
+    parameters (in sorted order), so equal requests have equal keys in every service.
+
+    Args:
+        prompt (str): The prompt text.
+        model (str, optional): The model name.
+        params (dict, optional): Generation parameters that affect the response (e.g. temperature).
+
+    Returns:
+        str: 32 character hex digest.
+
+    """
+    payload = json.dumps(
+        [prompt_fingerprint(prompt), model, params or {}],
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def lookup_cache(
+    cache: Dict[Any, Any],
+    cache_key: Any,
+    legacy_key: Optional[Any] = None
+) -> Optional[Any]:
+    """
+    Look up a cached response, migrating an entry stored under a legacy key if needed.
+
+    Earlier releases keyed caches on raw prompt/model tuples. If cache_key misses and legacy_key
+    is present, the entry is moved to cache_key so the next lookup hits directly.
+
+    Args:
+        cache: The cache store.
+        cache_key: The canonical cache key.
+        legacy_key (optional): The key the same entry would have had in earlier releases.
+
+    Returns:
+        The cached response, or None on a miss.
+
+    """
+    cached = cache.get(cache_key)
+    if cached is None and legacy_key is not None:
+        cached = cache.get(legacy_key)
+        if cached is not None:
+            cache[cache_key] = cached
+            # The legacy entry may be held by a read-only layer (e.g. a cache bundle) rather than the store
+            cache.pop(legacy_key, None)
+    return cached
+
+def load_llm_cache(
+    cache_path: Path,
+    logger: Optional[Any] = None,
+    backend: str = "segment",
+    limits: Optional[Dict[str, Any]] = None,
+    read_only: bool = False,
+    **options: Any
+) -> CacheStore:
+    """
+    Open the prompt/response cache for the given cache path.
 
     Args:
         cache_path (Path):
-            Path to the pickle file.
+            Path to the pickle file (as returned by get_llm_cache_paths).
         logger:
             Logger for warnings (optional).
+        backend (str):
+            "segment" (default) for an append-only segment stored next to the pickle file
+            (with suffix ".seg"), importing the pickle file the first time it is opened;
+            "sqlite" for an SQLite database in WAL mode next to the pickle file (with suffix ".sqlite"),
+            which several processes can share at the same time, also importing the pickle file;
+            or "pickle" for the original whole-file pickle format.
+        limits (dict, optional):
+            If given, the store is wrapped in a BoundedCacheStore with these keyword arguments
+            (max_bytes, max_entries, ttl, policy, namespace_max_bytes, low_water), keeping its
+            metadata and pins in cache_meta.pkl next to the cache.
+        read_only (bool):
+            Whether to open an existing cache without writing to it: nothing is created, imported or
+            repaired, and writes raise an error. With the segment or sqlite backend, a pickle file
+            with no segment or database next to it is read as it is rather than imported.
+        **options:
+            Extra keyword arguments passed to the store (e.g. compact_ratio, fsync, or
+            lazy=True and hot_cache_size to load only keys at startup and read values on demand,
+            or serialiser="json" for a new segment that does not use pickle).
+
+    Returns:
+        CacheStore: The opened cache. An empty cache if the file is not found or cannot be read.
+
+    """
+    cache_path = Path(cache_path)
+    suffix = {"segment": ".seg", "sqlite": ".sqlite"}.get(backend)
+    if backend == "pickle" or (read_only and suffix is not None and not cache_path.with_suffix(suffix).exists()):
+        store = PickleCacheStore(cache_path, logger, read_only=read_only)
+    elif backend == "segment":
+        store = AppendOnlyCacheStore(
+            cache_path.with_suffix(".seg"), logger, legacy_path=cache_path, read_only=read_only, **options
+        )
+    elif backend == "sqlite":
+        store = SQLiteCacheStore(
+            cache_path.with_suffix(".sqlite"), logger, legacy_path=cache_path, read_only=read_only, **options
+        )
+    else:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    if limits is not None:
+        store = BoundedCacheStore(store, cache_path.with_name("cache_meta.pkl"), logger=logger, **limits)
+    return store
+
+def write_cache_records(
+    path: Union[Path, str],
+    records: Iterable[Tuple[Any, Any]],
+    compression: Optional[str] = None,
+    dictionary: bool = False,
+    logger: Optional[Any] = None
+) -> int:
+    """
+    Write (key, value) records to a new cache segment in the pickle-free format.
+
+    Args:
+        path (Path or str): The segment file to create. It must not exist.
+        records (iterable): (key, value) pairs. Values must be plain data or LLMResponse records
+            (see response.to_record).
+        compression (str, optional): "zlib", "gzip" or "zstd" to compress values.
+        dictionary (bool): Whether to train a compression dictionary on the values.
+        logger: Logger for info messages (optional).
 
     Returns:
-        dict: The loaded cache or an empty dict.
+        int: The number of records written.
+
+    Raises:
+        FileExistsError: If path exists.
+    """
+    path = Path(path)
+    if path.exists():
+        raise FileExistsError(f"{path} already exists.")
+    with AppendOnlyCacheStore(path, logger, compression=compression, dictionary=dictionary, serialiser="json") as store:
+        count = store.put_many(records)
+        if dictionary:
+            store.compact()
+    return count
+
+def read_cache_records(path: Union[Path, str], logger: Optional[Any] = None) -> Iterator[Tuple[Any, Any]]:
+    """
+    Yield the (key, value) records of a cache segment (in either format), reading values one at a time.
 
+    Args:
+        path (Path or str): The segment file.
+        logger: Logger for warnings (optional).
     """
+    path = Path(path)
+    with AppendOnlyCacheStore(path, logger, lazy=True, hot_cache_size=0, serialiser=segment_serialiser(path)) as store:
+        for key in store:
+            try:
+                yield key, store[key]
+            except KeyError:
+                # A corrupt record is dropped by the store
+                continue
+
+def migrate_llm_cache(
+    cache_path: Union[Path, str],
+    keep_raw: bool = False,
+    compression: Optional[str] = None,
+    dictionary: bool = False,
+    logger: Optional[Any] = None
+) -> int:
+    """
+    Convert a service's cache to the pickle-free segment format.
+
+    The entries of the pickle file (prompt_response_cache.pkl) and of a pickle-serialised segment
+    (prompt_response_cache.seg) are merged, with the segment taking precedence, provider SDK
+    responses are converted to LLMResponse records and the result is written to the segment.
+    The replaced segment is kept with the suffix ".seg.bak"; the pickle file is left as it is
+    (it is only imported when no segment exists).
+
+    Args:
+        cache_path (Path or str): Path to the pickle file (as returned by get_llm_cache_paths).
+        keep_raw (bool): Whether records keep the full provider payload (as compressed JSON).
+        compression (str, optional): "zlib", "gzip" or "zstd" to compress values.
+        dictionary (bool): Whether to train a compression dictionary on the values.
+        logger: Logger for info messages (optional).
+
+    Returns:
+        int: The number of entries in the migrated cache (0 if there is nothing to migrate).
+    """
+    logger = logger or logging.getLogger(__name__)
+    cache_path = Path(cache_path)
+    segment_path = cache_path.with_suffix(".seg")
+    if segment_path.exists() and segment_serialiser(segment_path) == "json":
+        logger.info(f"{segment_path} is already in the pickle-free format.")
+        return 0
+    records = {}
     if cache_path.exists():
-        try:
-            with cache_path.open("rb") as f:
-                data = pickle.load(f)
-            if isinstance(data, dict):
-                return data
-            # Loaded object is not a dict; warn and fall back to empty cache.
-            log = logger if logger is not None else logging.getLogger(__name__)
-            log.warning(
-                "Cache file '%s' did not contain a dict (got %s). "
-                "Ignoring cache and using an empty dict instead.",
-                cache_path,
-                type(data).__name__,
-            )
-        except Exception as e:
-            if logger is not None:
-                logger.warning("Failed to load cache from '%s': %s", cache_path, e)
-            else:
-                logging.getLogger(__name__).warning(
-                    "Failed to load cache from '%s': %s", cache_path, e
-                )
-    return {}
+        records.update(PickleCacheStore(cache_path, logger))
+    if segment_path.exists():
+        records.update(read_cache_records(segment_path, logger))
+    if not records:
+        logger.info(f"No cache to migrate at {cache_path}.")
+        return 0
+    tmp_path = segment_path.with_name(segment_path.name + ".migrating")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    count = write_cache_records(
+        tmp_path,
+        ((key, to_record(value, keep_raw)) for key, value in records.items()),
+        compression=compression, dictionary=dictionary, logger=logger
+    )
+    if segment_path.exists():
+        os.replace(segment_path, segment_path.with_name(segment_path.name + ".bak"))
+    os.replace(tmp_path, segment_path)
+    logger.info(f"Migrated {count} cache entries to {segment_path}.")
+    return count
 
 def cache_and_log(
     cache: Dict[Any, Any],
@@ -188,13 +445,15 @@ def cache_and_log(
     model: Optional[str] = None,
     extra: Optional[Dict[str, Any]] = None,
     logger: Optional[Any] = None,
-    extract_text_from_response: Optional[Callable[[Any], str]] = None
+    extract_text_from_response: Optional[Callable[[Any], str]] = None,
+    prompt_table: Optional[PromptTable] = None,
+    log_writer: Optional[JSONLLogWriter] = None
 ) -> None:
     """
     Cache and log the prompt/response pair to a JSONL file.
     
     Args:
-        cache: The in-memory cache dictionary to update.
+        cache: The cache store to update. A plain dict is also accepted, in which case the whole dict is re-pickled to cache_path.
         cache_key: The key to use for caching the response.
         response: The response object to cache and log.
         cache_path (Path or str): Path to the pickle file for caching.
@@ -204,33 +463,57 @@ def cache_and_log(
         extra (dict, optional): Any extra information to include in the log entry.
         logger: Logger for info/error messages (optional).
         extract_text_from_response (callable, optional): Function to extract text from the response for logging. Defaults to global extract_text_from_response.
+        prompt_table (PromptTable, optional): Side table in which to store the prompt text once. The log
+            entry then records the prompt fingerprint instead of the text (see log_entry_prompt).
+        log_writer (JSONLLogWriter, optional): Background writer for jsonl_path. If not given, the entry is appended directly.
     """
-    cache[cache_key] = response
     cache_path = Path(cache_path)
     jsonl_path = Path(jsonl_path)
-    cache_path.parent.mkdir(parents=True, exist_ok=True)
     if logger:
         logger.debug(f"cache_and_log: cache_path={cache_path}, jsonl_path={jsonl_path}, prompt={prompt}, model={model}")
     try:
-        with cache_path.open("wb") as f:
-            pickle.dump(cache, f)
+        if isinstance(cache, CacheStore):
+            # The store persists the entry itself (one append for the segment store)
+            cache.put(cache_key, response, namespace=model)
+        else:
+            cache[cache_key] = response
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with cache_path.open("wb") as f:
+                pickle.dump(cache, f)
         if logger:
             logger.info(f"Cache updated for model={model}, prompt={prompt}")
     except Exception as e:
         if logger:
             logger.error(f"Failed to write cache: {e}")
+    fingerprint = None
+    if prompt_table is not None and prompt is not None:
+        try:
+            prompt_table.add(prompt_fingerprint(prompt), prompt)
+            fingerprint = prompt_fingerprint(prompt)
+        except Exception as e:
+            if logger:
+                logger.error(f"Failed to write prompt table: {e}")
     # Write JSONL log
     jsonl_path.parent.mkdir(parents=True, exist_ok=True)
     log_entry = {
         "timestamp": datetime.utcnow().isoformat() + "Z",
         "model": model,
-        "prompt": prompt,
-        "response": extract_text_from_response(response),
     }
+    if fingerprint is not None:
+        log_entry["prompt_fingerprint"] = fingerprint
+    else:
+        # No side table (or it could not be written), so the log keeps the text
+        log_entry["prompt"] = prompt
+    log_entry["response"] = (extract_text_from_response or str)(response)
+    if isinstance(cache_key, str):
+        log_entry["cache_key"] = cache_key
     if extra:
         log_entry.update(extra)
     if logger:
         logger.debug(f"cache_and_log: log_entry={log_entry}")
+    if log_writer is not None:
+        log_writer.write(log_entry)
+        return
     try:
         with jsonl_path.open("a", encoding="utf-8") as f:
             f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
@@ -265,6 +548,32 @@ def get_llm_cache_paths(service_name: str) -> Tuple[Path, Path]:
         base / f"{name}.jsonl"
     )
 
+def get_prompt_table_path(cache_path: Union[Path, str]) -> Path:
+    """
+    Return the prompt table path that sits alongside a cache path.
+
+    Args:
+        cache_path (Path or str): The cache path (as returned by get_llm_cache_paths).
+
+    Returns:
+        Path: The prompt table path.
+
+    """
+    return Path(cache_path).with_name("prompt_table.tsv")
+
+def get_near_duplicate_index_path(cache_path: Union[Path, str]) -> Path:
+    """
+    Return the near-duplicate index path that sits alongside a cache path.
+
+    Args:
+        cache_path (Path or str): The cache path (as returned by get_llm_cache_paths).
+
+    Returns:
+        Path: The near-duplicate index path.
+
+    """
+    return Path(cache_path).with_name("near_duplicates.jsonl")
+
 def pre_send_check_and_cache(
     api_key: str,
     message: str,
@@ -281,7 +590,7 @@ def pre_send_check_and_cache(
         api_key (str): The API key for the LLM service.
         message (str): The message being sent.
         model (str): The model being used.
-        cache (dict): The in-memory cache dictionary.
+        cache (dict): The cache store, keyed by make_cache_key(message, model).
         logger: Logger for info/error messages.
         service_name (str): Name of the LLM service (for error messages).
         api_key_env_var (str): The environment variable name for the API key.
@@ -293,10 +602,10 @@ def pre_send_check_and_cache(
     if not api_key:
         logger.error(f"{service_name} API key must be provided.")
         raise RuntimeError(f"{service_name} API key must be provided.")
-    cache_key = (message, model)
-    if cache_key in cache:
+    cached = lookup_cache(cache, make_cache_key(message, model), legacy_key=(message, model))
+    if cached is not None:
         logger.info(f"Cache hit for model={model}, message={message}")
-        return cache[cache_key]
+        return cached
     os.environ[api_key_env_var] = api_key
     return None
 
@@ -313,7 +622,9 @@ def call_and_cache_response(
     logger: Any,
     service_name: str,
     list_available_models_func: Callable[[str], Any],
-    extract_text_from_response: Optional[Callable[[Any], str]] = None
+    extract_text_from_response: Optional[Callable[[Any], str]] = None,
+    prompt_table: Optional[PromptTable] = None,
+    log_writer: Optional[JSONLLogWriter] = None
 ) -> Optional[Any]:
     """
     Generic try/except, error logging, model listing, and caching for LLM send methods.
@@ -332,21 +643,75 @@ def call_and_cache_response(
         service_name (str): Name of the LLM service (for error messages).
         list_available_models_func (callable): Function to list available models.
         extract_text_from_response (callable, optional): Function to extract text from the response for logging. Passed to cache_and_log_func.
+        prompt_table (PromptTable, optional): Side table for prompt texts. Passed to cache_and_log_func.
+        log_writer (JSONLLogWriter, optional): Background JSONL writer. Passed to cache_and_log_func.
     
     Returns:
         The response object or None on error.
+
+    Raises:
+        Rate limit errors (see rate_limit.is_rate_limit_error), so the caller can report them.
     
     """
     try:
         response = api_call()
     except Exception as e:
         logger.error(f"[{service_name}] Error: {e}")
+        if is_rate_limit_error(e):
+            raise
         if "404" in str(e) or "not found" in str(e) or "not supported" in str(e):
             list_available_models_func(api_key)
         return None
     cache_and_log_func(
         cache, cache_key, response, cache_path, jsonl_path,
         prompt=prompt, model=model, logger=logger,
-        extract_text_from_response=extract_text_from_response
+        extract_text_from_response=extract_text_from_response,
+        prompt_table=prompt_table,
+        log_writer=log_writer
+    )
+    return response
+
+async def acall_and_cache_response(
+    api_call: Callable[[], Awaitable[Any]],
+    cache_and_log_func: Callable,
+    cache: Dict[Any, Any],
+    cache_key: Any,
+    cache_path: Any,
+    jsonl_path: Any,
+    prompt: Any,
+    model: Any,
+    api_key: str,
+    logger: Any,
+    service_name: str,
+    list_available_models_func: Callable[[str], Any],
+    extract_text_from_response: Optional[Callable[[Any], str]] = None,
+    prompt_table: Optional[PromptTable] = None,
+    log_writer: Optional[JSONLLogWriter] = None
+) -> Optional[Any]:
+    """
+    Async counterpart of call_and_cache_response: awaits the API call, then caches and logs the response.
+
+    Takes the same arguments as call_and_cache_response, except that api_call returns an awaitable.
+    Model listing after a "not found" error runs in a worker thread so the event loop is not blocked.
+
+    Returns:
+        The response object or None on error.
+
+    """
+    try:
+        response = await api_call()
+    except Exception as e:
+        logger.error(f"[{service_name}] Error: {e}")
+        if is_rate_limit_error(e):
+            raise
+        if "404" in str(e) or "not found" in str(e) or "not supported" in str(e):
+            await asyncio.to_thread(list_available_models_func, api_key)
+        return None
+    cache_and_log_func(
+        cache, cache_key, response, cache_path, jsonl_path,
+        prompt=prompt, model=model, logger=logger,
+        extract_text_from_response=extract_text_from_response,
+        prompt_table=prompt_table,
+        log_writer=log_writer
     )
     return response
@@ -0,0 +1,65 @@
+"""
+Tests for scripts/clear-caches.py clearing the cached responses of one service or model.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+# Standard library imports
+import importlib.util
+import logging
+import os
+# Third-party imports
+import pytest
+# Local imports
+from gabm.io.llm.llm_service import LLMService
+from gabm.io.llm.utils import make_cache_key
+
+SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'scripts', 'clear-caches.py'))
+spec = importlib.util.spec_from_file_location("clear_caches", SCRIPT)
+clear_caches = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(clear_caches)
+
+
+class EchoService(LLMService):
+    """LLM service that echoes prompts back."""
+    SERVICE_NAME = "echo"
+    DEFAULT_MODEL = "echo-1"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, logger=logging.getLogger("test_clear_caches"), **kwargs)
+
+    def send(self, api_key, message, model=DEFAULT_MODEL):
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        return self._call_and_cache_response(lambda: f"echo: {message}", make_cache_key(message, model), message, model, api_key)
+
+    def list_available_models(self, api_key):
+        return ["echo-1", "echo-2"]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory, as services write to data/llm/<service>."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_clear_model_without_namespace_metadata(workdir, capsys):
+    # Written without cache_limits, so the cache has no namespaces and the model comes from the JSONL log
+    with EchoService() as service:
+        service.send("key", "one")
+        service.send("key", "two")
+        service.send("key", "one", model="echo-2")
+        service.cache[("legacy", "echo-1")] = "echo: legacy"
+    clear_caches.clear_service("echo", "echo-1")
+    out = capsys.readouterr().out
+    assert "Removed 2 cached responses." in out
+    assert "1 cached responses have no model recorded" in out
+    with EchoService() as service:
+        assert make_cache_key("one", "echo-1") not in service.cache
+        assert make_cache_key("two", "echo-1") not in service.cache
+        assert make_cache_key("one", "echo-2") in service.cache
+        assert ("legacy", "echo-1") in service.cache
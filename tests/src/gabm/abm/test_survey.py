@@ -0,0 +1,83 @@
+"""
+Tests for the survey module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import pytest
+from unittest.mock import Mock
+# Local imports
+from gabm.abm.survey import AnswerID, Answer, QuestionID, Question, Survey, SurveyConversation
+
+
+def make_survey():
+    answers = [Answer(AnswerID(0), "Yes"), Answer(AnswerID(1), "No")]
+    questions = [
+        Question(QuestionID(0), "Do you like tea", answers),
+        Question(QuestionID(1), "Do you like coffee", answers),
+    ]
+    return Survey(questions, title="Drinks")
+
+
+def make_service():
+    service = Mock()
+    service.get_api_key.return_value = "key"
+    service.get_default_model.return_value = "model-a"
+    service.send_many.side_effect = lambda api_key, prompts, model=None, max_concurrency=8: [
+        f"answer to: {prompt}" for prompt in prompts
+    ]
+    return service
+
+
+def test_question_prompt():
+    question = make_survey().get_question(0)
+    assert question.get_prompt() == (
+        "I am asked: Do you like tea. I can choose from the following options: Yes, No. What do I choose?"
+    )
+
+
+def test_survey_conversation_conduct():
+    person = Mock()
+    person.get_self_description.return_value = "I am 30 years old. "
+    service = make_service()
+    conversation = SurveyConversation(person, make_survey(), service, max_concurrency=4)
+    assert conversation.api_key == "key" and conversation.model == "model-a"
+    conversation.conduct()
+    service.send_many.assert_called_once()
+    assert service.send_many.call_args.kwargs["max_concurrency"] == 4
+    assert conversation.responses == [f"answer to: {prompt}" for prompt in conversation.get_prompts()]
+    assert conversation.get_prompts()[1].startswith("I am 30 years old. I am asked: Do you like coffee")
+
+
+def test_survey_conversation_conduct_many():
+    service = make_service()
+    conversations = []
+    for age in (20, 40, 60):
+        person = Mock()
+        person.get_self_description.return_value = f"I am {age} years old. "
+        conversations.append(SurveyConversation(person, make_survey(), service))
+    SurveyConversation.conduct_many(conversations)
+    # All persons and questions are sent as one batch
+    service.send_many.assert_called_once()
+    assert len(service.send_many.call_args.args[1]) == 6
+    for conversation in conversations:
+        assert conversation.responses == [f"answer to: {prompt}" for prompt in conversation.get_prompts()]
+
+
+def test_survey_conversation_early_stop():
+    person = Mock()
+    person.get_self_description.return_value = "I am 30 years old. "
+    service = make_service()
+    service.send_stream.side_effect = lambda api_key, prompt, model=None, stop=None: (
+        "No" if stop("I choose No") else None
+    )
+    conversation = SurveyConversation(person, make_survey(), service, early_stop=True)
+    conversation.conduct()
+    service.send_many.assert_not_called()
+    assert service.send_stream.call_count == 2
+    assert conversation.responses == ["No", "No"]
+    assert service.send_stream.call_args.kwargs["stop"].answers == ["Yes", "No"]
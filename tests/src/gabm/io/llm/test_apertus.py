@@ -14,10 +14,17 @@ __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
 
 # Standard library imports
+import logging
 import os
+import queue
+import sys
+import time
+import types
 import pytest
 # Local imports
-from gabm.io.llm.apertus import local_apertus_infer
+from gabm.io.llm import apertus
+from gabm.io.llm.apertus import local_apertus_infer, ApertusService
+from gabm.io.llm.cache import AppendOnlyCacheStore, PromptTable
 
 # Mapping from API model names to local Hugging Face model names
 API_TO_LOCAL_MODEL = {
@@ -37,4 +44,239 @@ def test_local_apertus(api_model_id):
     prompt = "Give me a brief explanation of gravity in simple terms."
     device = "cuda" if os.environ.get("CUDA_VISIBLE_DEVICES") else "cpu"
     response = local_apertus_infer(local_model_id, prompt, device=device)
-    assert response is not None and len(str(response)) > 0
\ No newline at end of file
+    assert response is not None and len(str(response)) > 0
+
+
+class FakeInputs(dict):
+    def to(self, device):
+        return self
+
+
+class FakeTokenizer:
+    """Tokenizer stand-in: one token id per character, 0 for padding."""
+    chat_template = None
+    pad_token = None
+    eos_token = "\0"
+    pad_token_id = 0
+    padding_side = "right"
+
+    def __call__(self, texts, return_tensors=None, padding=False):
+        ids = [[ord(c) for c in text] for text in texts]
+        if padding:
+            width = max(len(row) for row in ids)
+            assert self.padding_side == "left"
+            ids = [[0] * (width - len(row)) + row for row in ids]
+        return FakeInputs(input_ids=ids)
+
+    def pad(self, encoded, return_tensors=None):
+        return FakeInputs(encoded)
+
+    def decode(self, ids, skip_special_tokens=False):
+        return "".join(chr(i) for i in ids if i or not skip_special_tokens)
+
+
+class FakeOutput:
+    def __init__(self, past_key_values):
+        self.past_key_values = past_key_values
+
+
+class FakeModel:
+    """Model stand-in that generates each prompt in upper case, counting generate() calls and encoded (unmasked) tokens."""
+    device = "cpu"
+
+    def __init__(self):
+        self.batches = []
+        self.encoded = 0
+
+    def __call__(self, input_ids, use_cache=False):
+        self.encoded += len(input_ids[0])
+        return FakeOutput({"length": len(input_ids[0])})
+
+    def generate(self, input_ids, max_new_tokens, pad_token_id=None, past_key_values=None, attention_mask=None):
+        self.batches.append(len(input_ids))
+        reused = past_key_values["length"] if past_key_values else 0
+        mask = attention_mask or [[1] * len(row) for row in input_ids]
+        self.encoded += sum(sum(row) - reused for row in mask)
+        outputs = [row + [ord(c) for c in "".join(chr(i) for i in row if i).upper()] for row in input_ids]
+        width = max(len(row) for row in outputs)
+        return [row + [0] * (width - len(row)) for row in outputs]
+
+
+@pytest.fixture
+def fake_transformers(tmp_path, monkeypatch):
+    """Run in a temporary directory and load fake models, counting the loads."""
+    monkeypatch.chdir(tmp_path)
+    loads = []
+    def from_pretrained(model_name, device):
+        loads.append((model_name, device))
+        return FakeTokenizer(), FakeModel()
+    monkeypatch.setattr(apertus, "_from_pretrained", from_pretrained)
+    apertus.unload_local_model()
+    yield loads
+    apertus.unload_local_model()
+
+
+def test_local_apertus_infer_closes_the_cache_it_opens(fake_transformers, tmp_path, monkeypatch):
+    closed = []
+    close = AppendOnlyCacheStore.close
+    monkeypatch.setattr(AppendOnlyCacheStore, "close", lambda self: closed.append(self) or close(self))
+    table = PromptTable(tmp_path / "prompts.tsv")
+    cache_path = tmp_path / "apertus" / "cache.pkl"
+    assert local_apertus_infer("m", "hello", cache_path=cache_path, prompt_table=table) == "HELLO"
+    assert len(closed) == 1 and len(table) == 1
+    assert not (tmp_path / "apertus" / "prompt_table.tsv").exists()
+    # The response was persisted before the cache was closed
+    assert local_apertus_infer("m", "hello", cache_path=cache_path) == "HELLO"
+    assert len(closed) == 2 and fake_transformers == [("m", "cpu")]
+
+
+def test_apertus_service_keeps_model_resident(fake_transformers):
+    with ApertusService(logger=logging.getLogger("test_apertus"), device="cpu") as service:
+        assert fake_transformers == []
+        assert service.send(None, "hello") == "HELLO"
+        assert service.send(None, "world") == "WORLD"
+        assert service.send(None, "hello") == "HELLO"
+        # Loaded once, on the first cache miss
+        assert fake_transformers == [(ApertusService.DEFAULT_MODEL, "cpu")]
+        assert service.list_available_models() == [ApertusService.DEFAULT_MODEL]
+        # The resident model is shared with local_apertus_infer
+        assert local_apertus_infer(ApertusService.DEFAULT_MODEL, "again", cache={}) == "AGAIN"
+        assert len(fake_transformers) == 1
+        assert service.unload_model() == 1
+        assert service.list_available_models() == []
+
+
+def test_apertus_service_eager_load(fake_transformers):
+    with ApertusService(logger=logging.getLogger("test_apertus"), device="cpu", lazy=False):
+        assert fake_transformers == [(ApertusService.DEFAULT_MODEL, "cpu")]
+
+
+def test_plan_generation_batches():
+    lengths = [50, 10, 12, 48, 11, 100]
+    assert apertus.plan_generation_batches(lengths, batch_size=2) == [[1, 4], [2, 3], [0, 5]]
+    assert apertus.plan_generation_batches(lengths, batch_size=8, max_batch_tokens=100) == [[1, 4, 2], [3, 0], [5]]
+    assert apertus.plan_generation_batches([], batch_size=2) == []
+
+
+def test_apertus_service_send_many_generates_in_batches(fake_transformers):
+    with ApertusService(logger=logging.getLogger("test_apertus"), device="cpu", batch_size=2) as service:
+        assert service.send(None, "cached") == "CACHED"
+        prompts = ["a", "bb", "a", "cached", "dddd", "ccc", "eeeee"]
+        assert service.send_many(None, prompts) == [p.upper() for p in prompts]
+        tokenizer, model = service.load_model()
+        # One single generate() for send, then five unique misses in batches of at most two
+        assert model.batches == [1, 2, 2, 1]
+        assert tokenizer.padding_side == "right"
+        assert service.send(None, "eeeee") == "EEEEE"
+        assert model.batches == [1, 2, 2, 1]
+        stats = service.stats()[service.DEFAULT_MODEL]
+        assert stats["calls"] == 6 and stats["cache_hits"] == 2
+
+
+def test_common_prefix_groups():
+    token_ids = [[1, 2, 3, 4], [9, 9], [1, 2, 3, 5, 6], [1, 2, 7], [1, 2, 3]]
+    # [1, 2, 3] cannot reuse all of itself, so it does not join the group sharing [1, 2, 3]
+    assert apertus.common_prefix_groups(token_ids, min_prefix_tokens=3) == [(3, [0, 2])]
+    assert apertus.common_prefix_groups(token_ids, min_prefix_tokens=2) == [(2, [4, 0, 2, 3])]
+    assert apertus.common_prefix_groups(token_ids, min_prefix_tokens=4) == []
+
+
+def test_apertus_service_reuses_shared_prefix(fake_transformers):
+    persona = "I am a retired teacher living in Leeds who cycles to the allotment every day. "
+    questions = ["Do you drive?", "Are you happy?", "Would you vote?", "How old are you?", "Is it raining?"]
+    prompts = [persona + question for question in questions]
+    with ApertusService(logger=logging.getLogger("test_apertus"), device="cpu", min_prefix_tokens=32, batch_size=3) as service:
+        assert service.send_many(None, prompts + ["unrelated"]) == [p.upper() for p in prompts] + ["UNRELATED"]
+        tokenizer, model = service.load_model()
+        # The persona is encoded once, then only each question, and the group is still generated in batches
+        assert model.encoded == len(persona) + sum(len(q) for q in questions) + len("unrelated")
+        assert sorted(model.batches) == [1, 2, 3]
+        prefix_cache = service.get_prefix_cache()
+        assert len(prefix_cache) == 1 and prefix_cache.hits == 5
+        # Later prompts with the same persona reuse it too
+        question = "Tell me more."
+        assert service.send(None, persona + question) == (persona + question).upper()
+        assert model.encoded == len(persona) + sum(len(q) for q in questions) + len("unrelated") + len(question)
+    with ApertusService(logger=logging.getLogger("test_apertus"), device="cpu", prefix_cache_size=0) as service:
+        assert service.get_prefix_cache() is None
+
+
+def test_apertus_service_send_reuses_prefix_of_earlier_sends(fake_transformers):
+    persona = "I am a retired teacher living in Leeds who cycles to the allotment every day. "
+    questions = ["Do you drive?", "Are you happy?", "Would you vote?"]
+    with ApertusService(logger=logging.getLogger("test_apertus"), device="cpu", min_prefix_tokens=32) as service:
+        for question in questions:
+            assert service.send(None, persona + question) == (persona + question).upper()
+        _, model = service.load_model()
+        # The first prompt is encoded whole; the second shares the persona, which is then encoded
+        # once and reused, so only each later question is encoded
+        assert model.encoded == len(persona) + len(questions[0]) + len(persona) + len(questions[1]) + len(questions[2])
+        prefix_cache = service.get_prefix_cache()
+        assert len(prefix_cache) == 1 and prefix_cache.hits == 2 and prefix_cache.misses == 1
+        assert service.send(None, "unrelated") == "UNRELATED"
+        assert len(prefix_cache) == 1
+
+
+class FakeStreamer:
+    """TextIteratorStreamer stand-in: decodes each token put and yields it, ending on end()."""
+
+    def __init__(self, tokenizer, skip_prompt=False, skip_special_tokens=False):
+        self.tokenizer = tokenizer
+        self.queue = queue.Queue()
+
+    def put(self, ids):
+        self.queue.put(self.tokenizer.decode(ids, skip_special_tokens=True))
+
+    def end(self):
+        self.queue.put(None)
+
+    def __iter__(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+
+class StreamingFakeModel(FakeModel):
+    """FakeModel that streams its output one token at a time, honouring stopping criteria."""
+
+    def generate(self, input_ids, max_new_tokens, pad_token_id=None, past_key_values=None, streamer=None, stopping_criteria=()):
+        if streamer is None:
+            return super().generate(input_ids, max_new_tokens, pad_token_id, past_key_values)
+        self.batches.append(len(input_ids))
+        self.streamed = 0
+        try:
+            for c in "".join(chr(i) for i in input_ids[0] if i).upper():
+                # Keep pace with the consumer, as a real model would
+                while not streamer.queue.empty() and not any(criterion(None, None) for criterion in stopping_criteria):
+                    time.sleep(0.001)
+                if any(criterion(None, None) for criterion in stopping_criteria):
+                    break
+                streamer.put([ord(c)])
+                self.streamed += 1
+        finally:
+            streamer.end()
+
+
+def test_apertus_service_send_stream(fake_transformers, monkeypatch):
+    transformers = types.ModuleType("transformers")
+    transformers.StoppingCriteria = object
+    transformers.StoppingCriteriaList = list
+    transformers.TextIteratorStreamer = FakeStreamer
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+    monkeypatch.setattr(apertus, "_from_pretrained", lambda model_name, device: (FakeTokenizer(), StreamingFakeModel()))
+    monkeypatch.delenv("APERTUS_API_KEY", raising=False)
+    with ApertusService(logger=logging.getLogger("test_apertus"), device="cpu") as service:
+        chunks = []
+        assert service.send_stream(None, "yes or no", on_text=chunks.append) == "YES OR NO"
+        assert chunks == list("YES OR NO")
+        # Streamed texts are cached; no API key is needed or exported
+        assert service.send_stream(None, "yes or no") == "YES OR NO"
+        assert "APERTUS_API_KEY" not in os.environ
+        _, model = service.load_model()
+        assert model.batches == [1]
+        # A stop hook ends generation early
+        text = service.send_stream(None, "stop here please", stop=lambda text: text.endswith("HERE"))
+        assert text == "STOP HERE"
+        assert model.streamed < len("STOP HERE PLEASE")
@@ -0,0 +1,142 @@
+"""
+Tests for the bundle module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import logging
+import pytest
+# Local imports
+from gabm.io.llm.bundle import CacheBundle, LayeredCacheStore, export_bundle, import_bundle, write_bundle
+from gabm.io.llm.cache import AppendOnlyCacheStore, PickleCacheStore
+from gabm.io.llm.llm_service import LLMService
+from gabm.io.llm.response import LLMResponse
+from gabm.io.llm.utils import get_llm_cache_paths, load_llm_cache, make_cache_key
+
+
+class EchoService(LLMService):
+    """LLM service that echoes prompts back and counts API calls."""
+    SERVICE_NAME = "echo"
+    DEFAULT_MODEL = "echo-1"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, logger=logging.getLogger("test_bundle"), **kwargs)
+        self.calls = []
+
+    def send(self, api_key, message, model=DEFAULT_MODEL):
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        def api_call():
+            self.calls.append(message)
+            return f"echo: {message}"
+        return self._call_and_cache_response(api_call, make_cache_key(message, model), message, model, api_key)
+
+    def list_available_models(self, api_key):
+        return ["echo-1"]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory, as services write to data/llm/<service>."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_bundle_lookup_and_read_only(tmp_path):
+    path = tmp_path / "responses.bundle"
+    entries = [
+        (f"k{i}", LLMResponse(f"Answer {i}", "stop", model="m"), {"model": "m", "timestamp": None})
+        for i in range(500)
+    ]
+    assert write_bundle(path, entries, compression="zlib", dictionary=True) == 500
+    with CacheBundle(path) as bundle:
+        assert len(bundle) == 500
+        assert bundle["k42"] == LLMResponse("Answer 42", "stop", model="m")
+        assert bundle.metadata("k7") == {"model": "m", "timestamp": None}
+        assert "missing" not in bundle and ("not", "encodable", object()) not in bundle
+        assert sorted(bundle) == sorted(key for key, _, _ in entries)
+        with pytest.raises(TypeError):
+            bundle["k1"] = "changed"
+    (tmp_path / "bad.bundle").write_bytes(b"not a bundle")
+    with pytest.raises(ValueError):
+        CacheBundle(tmp_path / "bad.bundle")
+
+
+def test_export_merges_filters_and_imports(workdir):
+    with EchoService() as service:
+        service.send("key", "Hello", model="echo-1")
+        service.send("key", "Bye", model="echo-2")
+    older = workdir / "older.bundle"
+    write_bundle(older, [
+        (make_cache_key("Hello", "echo-1"), "stale", {"model": "echo-1", "timestamp": "2020-01-01T00:00:00Z"}),
+        ("old-only", "kept", {"model": "echo-1", "timestamp": "2020-01-01T00:00:00Z"}),
+    ])
+    out = workdir / "echo.bundle"
+    assert export_bundle(out, services=["echo"], bundles=[older]) == 3
+    with CacheBundle(out) as bundle:
+        # The newer response from the service wins over the bundled one
+        assert bundle[make_cache_key("Hello", "echo-1")] == "echo: Hello"
+        assert bundle["old-only"] == "kept"
+    assert export_bundle(out, services=["echo"], bundles=[older], models=["echo-2"]) == 1
+    assert export_bundle(out, services=["echo"], bundles=[older], since="2021-01-01") == 2
+    assert export_bundle(out, services=["echo"], bundles=[older], until="2021-01-01") == 2
+    # Import into another service's cache, keeping what it already holds
+    cache_path, _ = get_llm_cache_paths("imported")
+    with load_llm_cache(cache_path) as cache:
+        cache["old-only"] = "local"
+    assert import_bundle(out, "imported") == 1
+    with load_llm_cache(cache_path) as cache:
+        assert cache["old-only"] == "local"
+        assert cache[make_cache_key("Hello", "echo-1")] == "stale"
+
+
+def test_export_reads_sqlite_and_legacy_caches_without_converting(workdir):
+    with EchoService(cache_backend="sqlite") as service:
+        service.send("key", "Hello")
+    out = workdir / "sqlite.bundle"
+    assert export_bundle(out, services=["echo"], backend="sqlite") == 1
+    with CacheBundle(out) as bundle:
+        assert bundle[make_cache_key("Hello", "echo-1")] == "echo: Hello"
+    cache_path, _ = get_llm_cache_paths("legacy")
+    cache_path.parent.mkdir(parents=True)
+    with PickleCacheStore(cache_path) as store:
+        store[("Hi", "old-model")] = "legacy answer"
+    assert export_bundle(workdir / "legacy.bundle", services=["legacy"]) == 1
+    assert not cache_path.with_suffix(".seg").exists()
+
+
+def test_service_serves_hits_from_bundles(workdir):
+    with EchoService() as service:
+        service.send("key", "Hello")
+    bundle_path = workdir / "shared" / "echo.bundle"
+    export_bundle(bundle_path, services=["echo"])
+    for path in workdir.glob("data/llm/echo/*"):
+        path.unlink()
+    with EchoService(cache_bundles=[bundle_path]) as service:
+        assert isinstance(service.cache, LayeredCacheStore)
+        assert service.send("key", "Hello") == "echo: Hello"
+        assert service.send("key", "New") == "echo: New"
+        assert service.calls == ["New"]
+        assert service.cache.bundle_hits == 1
+        assert len(service.cache) == 2
+    # New responses went to the local cache, not the bundle
+    with CacheBundle(bundle_path) as bundle:
+        assert len(bundle) == 1
+
+
+def test_legacy_key_served_from_bundle(workdir):
+    bundle_path = workdir / "legacy.bundle"
+    write_bundle(bundle_path, [(("hi", "echo-1"), "legacy answer", {"model": "echo-1", "timestamp": None})])
+    with EchoService(cache_bundles=[bundle_path]) as service:
+        assert service.send("key", "hi") == "legacy answer"
+        assert service.calls == []
+        # Migrated to the canonical key in the local store; the bundle is left as it was
+        assert service.cache.store[make_cache_key("hi", "echo-1")] == "legacy answer"
+        del service.cache[("hi", "echo-1")]
+        with pytest.raises(KeyError):
+            del service.cache["missing"]
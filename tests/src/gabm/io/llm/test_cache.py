@@ -0,0 +1,452 @@
+"""
+Tests for the cache module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import multiprocessing
+import pickle
+import pytest
+# Local imports
+from gabm.io.llm.cache import AppendOnlyCacheStore, BoundedCacheStore, PickleCacheStore, CacheStore, PromptTable, SQLiteCacheStore, segment_serialiser
+from gabm.io.llm.utils import load_llm_cache, cache_and_log
+
+
+def test_append_only_store_roundtrip(tmp_path):
+    path = tmp_path / "cache.seg"
+    with AppendOnlyCacheStore(path) as store:
+        store[("Hello", "model-a")] = {"text": "Hi"}
+        store[("Bye", "model-a")] = "Goodbye"
+        assert ("Hello", "model-a") in store
+        assert len(store) == 2
+    with AppendOnlyCacheStore(path) as store:
+        assert store[("Hello", "model-a")] == {"text": "Hi"}
+        assert store[("Bye", "model-a")] == "Goodbye"
+        del store[("Bye", "model-a")]
+    with AppendOnlyCacheStore(path) as store:
+        assert ("Bye", "model-a") not in store
+        assert len(store) == 1
+
+
+def test_append_only_store_writes_are_appends(tmp_path):
+    path = tmp_path / "cache.seg"
+    store = AppendOnlyCacheStore(path)
+    store["a"] = "x" * 100
+    size_one = path.stat().st_size
+    store["b"] = "x" * 100
+    size_two = path.stat().st_size
+    store["c"] = "x" * 100
+    # Each write adds one record of the same size, independent of how many entries exist
+    assert path.stat().st_size - size_two == size_two - size_one
+    store.close()
+
+
+def test_append_only_store_recovers_truncated_tail(tmp_path):
+    path = tmp_path / "cache.seg"
+    with AppendOnlyCacheStore(path) as store:
+        store["a"] = "first"
+        store["b"] = "second"
+    good_size = path.stat().st_size
+    # Simulate a run killed part way through writing a record
+    with path.open("ab") as f:
+        f.write(b"\x01\x05\x00\x00")
+    with AppendOnlyCacheStore(path) as store:
+        assert store["a"] == "first"
+        assert store["b"] == "second"
+        assert path.stat().st_size == good_size
+        store["c"] = "third"
+    with AppendOnlyCacheStore(path) as store:
+        assert store["c"] == "third"
+
+
+def test_append_only_store_discards_corrupt_record(tmp_path):
+    path = tmp_path / "cache.seg"
+    with AppendOnlyCacheStore(path) as store:
+        store["a"] = "first"
+    good_size = path.stat().st_size
+    with AppendOnlyCacheStore(path) as store:
+        store["b"] = "second"
+    # Flip the last byte so the crc of the last record no longer matches
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with AppendOnlyCacheStore(path) as store:
+        assert "a" in store
+        assert "b" not in store
+    assert path.stat().st_size == good_size
+
+
+def test_append_only_store_compaction(tmp_path):
+    path = tmp_path / "cache.seg"
+    store = AppendOnlyCacheStore(path, compact_min_records=10, compact_ratio=0.5)
+    for i in range(10):
+        store["key"] = i
+    # The tenth write supersedes nine records; the next triggers compaction
+    store["key"] = "final"
+    assert store.stale_records == 0
+    assert store["key"] == "final"
+    assert not (tmp_path / "cache.seg.tmp").exists()
+    store.close()
+    with AppendOnlyCacheStore(path) as store:
+        assert store["key"] == "final"
+        assert len(store) == 1
+
+
+@pytest.mark.parametrize("compression", ["zlib", "gzip"])
+def test_append_only_store_compressed_roundtrip(tmp_path, compression):
+    path = tmp_path / "cache.seg"
+    with AppendOnlyCacheStore(path, compression=compression) as store:
+        store["a"] = "Hello " * 100
+        store["b"] = {"x": 1}
+    assert path.read_bytes()[:8] == b"GABMSEG2"
+    with AppendOnlyCacheStore(path, compression=compression) as store:
+        assert store["a"] == "Hello " * 100
+        assert store["b"] == {"x": 1}
+        assert store.entry_size("a") < 100
+
+
+def test_append_only_store_converts_compression_and_trains_dictionary(tmp_path):
+    path = tmp_path / "cache.seg"
+    values = {f"k{i}": f"As a {i} year old voter in Leeds I would answer: yes, I support the cycle lanes." for i in range(200)}
+    with AppendOnlyCacheStore(path) as store:
+        for key, value in values.items():
+            store[key] = value
+    plain_size = path.stat().st_size
+    with AppendOnlyCacheStore(path, compression="zlib") as store:
+        store.compact()
+    zlib_size = path.stat().st_size
+    with AppendOnlyCacheStore(path, compression="zlib", dictionary=True) as store:
+        store.compact()
+        assert store._codec.dictionary
+        assert {key: store[key] for key in values} == values
+    # Small records barely compress on their own; a shared dictionary is what makes them small
+    assert path.stat().st_size < min(zlib_size, plain_size) / 1.5
+    # Opening without compression reads the file and converts it back when compacted
+    with AppendOnlyCacheStore(path) as store:
+        assert store["k7"] == values["k7"]
+        store.compact()
+    assert path.read_bytes()[:8] == b"GABMSEG1"
+    with AppendOnlyCacheStore(path) as store:
+        assert {key: store[key] for key in values} == values
+
+
+def test_append_only_store_json_serialiser(tmp_path, caplog):
+    path = tmp_path / "cache.seg"
+    with AppendOnlyCacheStore(path, serialiser="json", compression="zlib") as store:
+        store.put_many([("a", "Hello"), ("b", {"x": [1, 2]}), (("m", "p"), "legacy key")])
+        with pytest.raises(TypeError):
+            store["c"] = object()
+    assert segment_serialiser(path) == "json"
+    assert b"pickle" not in path.read_bytes()
+    # An existing segment keeps its serialiser whatever is asked for
+    with AppendOnlyCacheStore(path) as store:
+        assert store.serialiser == "json"
+        assert store["b"] == {"x": [1, 2]}
+        assert store[("m", "p")] == "legacy key"
+        assert "c" not in store
+    with AppendOnlyCacheStore(tmp_path / "old.seg") as store:
+        store["a"] = "Hello"
+    assert segment_serialiser(tmp_path / "old.seg") == "pickle"
+    with AppendOnlyCacheStore(tmp_path / "old.seg", serialiser="json") as store:
+        assert store.serialiser == "pickle"
+        assert store["a"] == "Hello"
+    assert "migrate-cache" in caplog.text
+
+
+def test_append_only_store_rejects_other_files(tmp_path):
+    path = tmp_path / "cache.seg"
+    path.write_bytes(b"not a segment")
+    with pytest.raises(ValueError):
+        AppendOnlyCacheStore(path)
+
+
+def test_load_llm_cache_imports_legacy_pickle(tmp_path):
+    pkl = tmp_path / "prompt_response_cache.pkl"
+    with pkl.open("wb") as f:
+        pickle.dump({("Hello", "model-a"): "Hi"}, f)
+    store = load_llm_cache(pkl)
+    assert isinstance(store, AppendOnlyCacheStore)
+    assert store[("Hello", "model-a")] == "Hi"
+    assert (tmp_path / "prompt_response_cache.seg").exists()
+    store.close()
+    legacy = load_llm_cache(pkl, backend="pickle")
+    assert isinstance(legacy, PickleCacheStore)
+    assert legacy[("Hello", "model-a")] == "Hi"
+    with pytest.raises(ValueError):
+        load_llm_cache(pkl, backend="unknown")
+
+
+def test_load_llm_cache_read_only(tmp_path):
+    pkl = tmp_path / "prompt_response_cache.pkl"
+    with pkl.open("wb") as f:
+        pickle.dump({("Hello", "model-a"): "Hi"}, f)
+    for backend in ("segment", "sqlite", "pickle"):
+        # The legacy pickle is read as it is, not imported into a new segment or database
+        with load_llm_cache(pkl, backend=backend, read_only=True) as store:
+            assert isinstance(store, PickleCacheStore)
+            assert store[("Hello", "model-a")] == "Hi"
+            with pytest.raises(ValueError):
+                store["new"] = "value"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["prompt_response_cache.pkl"]
+    seg = tmp_path / "prompt_response_cache.seg"
+    with AppendOnlyCacheStore(seg) as store:
+        store["a"] = "first"
+    good_size = seg.stat().st_size
+    with seg.open("ab") as f:
+        f.write(b"\x01\x05\x00\x00")
+    with load_llm_cache(pkl, read_only=True, lazy=True) as store:
+        assert isinstance(store, AppendOnlyCacheStore)
+        assert store["a"] == "first" and ("Hello", "model-a") not in store
+        with pytest.raises(ValueError):
+            del store["a"]
+    # The incomplete tail is left for the writer to recover
+    assert seg.stat().st_size == good_size + 4
+    with SQLiteCacheStore(tmp_path / "prompt_response_cache.sqlite") as store:
+        store["b"] = "second"
+    with load_llm_cache(pkl, backend="sqlite", read_only=True) as store:
+        assert isinstance(store, SQLiteCacheStore)
+        assert list(store) == ["b"]
+
+
+def test_cache_and_log_with_store(tmp_path):
+    pkl = tmp_path / "prompt_response_cache.pkl"
+    jsonl = tmp_path / "prompt_response_cache.jsonl"
+    store = load_llm_cache(pkl)
+    assert isinstance(store, CacheStore)
+    cache_and_log(store, ("Hello", "model-a"), "Hi", pkl, jsonl,
+                  prompt="Hello", model="model-a", extract_text_from_response=str)
+    store.close()
+    # The segment store does not rewrite the pickle file
+    assert not pkl.exists()
+    assert jsonl.read_text(encoding="utf-8").count("\n") == 1
+    with load_llm_cache(pkl) as store:
+        assert store[("Hello", "model-a")] == "Hi"
+
+
+def test_append_only_store_lazy_loading(tmp_path):
+    path = tmp_path / "cache.seg"
+    with AppendOnlyCacheStore(path) as store:
+        for i in range(10):
+            store[f"key{i}"] = {"text": f"value{i}"}
+    store = AppendOnlyCacheStore(path, lazy=True, hot_cache_size=3)
+    # Only keys and offsets are loaded when opening
+    assert len(store) == 10
+    assert len(store._values) == 0
+    assert store["key4"] == {"text": "value4"}
+    for i in range(10):
+        assert store[f"key{i}"] == {"text": f"value{i}"}
+    # The hot set is bounded and keeps the most recently used values
+    assert list(store._values) == ["key7", "key8", "key9"]
+    store["key10"] = "new"
+    assert list(store._values) == ["key8", "key9", "key10"]
+    store.close()
+
+
+def test_append_only_store_lazy_corrupt_record_is_a_miss(tmp_path):
+    path = tmp_path / "cache.seg"
+    with AppendOnlyCacheStore(path) as store:
+        store["a"] = "first"
+        store["b"] = "second"
+    # Corrupt the value of the first record; only the last record is checked when opening lazily
+    data = bytearray(path.read_bytes())
+    index = data.index(pickle.dumps("first", protocol=pickle.HIGHEST_PROTOCOL))
+    data[index + 5] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with AppendOnlyCacheStore(path, lazy=True) as store:
+        assert store.get("a") is None
+        assert "a" not in store
+        assert store["b"] == "second"
+
+
+def write_unloadable_entry(path, monkeypatch):
+    """Cache an object whose class stops importing, as after an SDK upgrade."""
+    import sys
+    import types
+    module = types.ModuleType("gabm_removed_sdk")
+    class Response:
+        pass
+    Response.__module__ = module.__name__
+    Response.__qualname__ = "Response"
+    module.Response = Response
+    with monkeypatch.context() as patch:
+        patch.setitem(sys.modules, module.__name__, module)
+        with AppendOnlyCacheStore(path) as store:
+            store["old"] = Response()
+            store["ok"] = "fine"
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_append_only_store_unloadable_value_is_a_miss(tmp_path, monkeypatch, lazy):
+    path = tmp_path / "cache.seg"
+    write_unloadable_entry(path, monkeypatch)
+    with AppendOnlyCacheStore(path, lazy=lazy) as store:
+        assert store.get("old") is None
+        assert "old" not in store
+        assert store["ok"] == "fine"
+        store["old"] = "refetched"
+    with AppendOnlyCacheStore(path, lazy=lazy) as store:
+        assert store["old"] == "refetched"
+
+
+def test_sqlite_store_roundtrip(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with SQLiteCacheStore(path) as store:
+        store[("Hello", "model-a")] = {"text": "Hi"}
+        store["b"] = "first"
+        store["b"] = "second"
+        assert len(store) == 2
+        del store["b"]
+        with pytest.raises(KeyError):
+            del store["b"]
+    with SQLiteCacheStore(path) as store:
+        assert store[("Hello", "model-a")] == {"text": "Hi"}
+        assert "b" not in store
+        assert list(store) == [("Hello", "model-a")]
+        store.compact()
+
+
+def test_sqlite_store_sees_writes_from_other_connections(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with SQLiteCacheStore(path) as first, SQLiteCacheStore(path) as second:
+        first["a"] = "x"
+        assert second["a"] == "x"
+        second["b"] = "y"
+        assert first.get("b") == "y"
+
+
+def test_sqlite_store_drops_rows_that_cannot_be_loaded(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with SQLiteCacheStore(path) as store:
+        store["k"] = "good"
+        store["other"] = "fine"
+        store._conn.execute("UPDATE cache SET value = ? WHERE key = ?", (b"not a pickle", pickle.dumps("k", protocol=pickle.HIGHEST_PROTOCOL)))
+        store._conn.execute("INSERT INTO cache (key, value) VALUES (?, ?)", (b"bad key", pickle.dumps("x")))
+        assert store.get("k") is None
+        assert "k" not in store
+        assert list(store) == ["other"]
+        store["k"] = "again"
+        assert store["k"] == "again"
+
+
+def test_load_llm_cache_sqlite_imports_legacy_pickle(tmp_path):
+    pkl = tmp_path / "prompt_response_cache.pkl"
+    with pkl.open("wb") as f:
+        pickle.dump({("Hello", "model-a"): "Hi"}, f)
+    with load_llm_cache(pkl, backend="sqlite") as store:
+        assert isinstance(store, SQLiteCacheStore)
+        assert store[("Hello", "model-a")] == "Hi"
+    assert (tmp_path / "prompt_response_cache.sqlite").exists()
+
+
+def _write_entries(path, worker, count):
+    with SQLiteCacheStore(path) as store:
+        table = PromptTable(path.with_suffix(".prompts"))
+        for i in range(count):
+            store[(worker, i)] = f"value {worker} {i}"
+            # Every worker also writes the shared keys and prompts
+            store[("shared", i)] = f"shared {i}"
+            table.add(f"fp{i}", f"prompt {i}")
+            table.add(f"fp{worker}-{i}", f"prompt {worker} {i}")
+
+
+def test_sqlite_store_and_prompt_table_shared_by_processes(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    SQLiteCacheStore(path).close()
+    workers = [multiprocessing.Process(target=_write_entries, args=(path, w, 50)) for w in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+    with SQLiteCacheStore(path) as store:
+        assert len(store) == 4 * 50 + 50
+        assert store[(3, 49)] == "value 3 49"
+        assert store[("shared", 7)] == "shared 7"
+    table = PromptTable(path.with_suffix(".prompts"))
+    # Every line is complete and each shared prompt was written once
+    assert len(table) == 4 * 50 + 50
+    assert table.path.read_text(encoding="utf-8").count("\n") == 4 * 50 + 50
+    assert table.get("fp2-10") == "prompt 2 10"
+
+
+def test_bounded_store_evicts_least_recently_used(tmp_path):
+    store = BoundedCacheStore(AppendOnlyCacheStore(tmp_path / "cache.seg"), max_entries=3, low_water=1.0)
+    for key in "abc":
+        store.put(key, key * 10, namespace="m")
+    assert store["a"] == "a" * 10
+    store.put("d", "d" * 10, namespace="m")
+    # "b" was used least recently
+    assert sorted(store) == ["a", "c", "d"]
+    assert "b" not in store.store
+    assert store.stats()["evictions"] == 1
+    store.close()
+
+
+def test_bounded_store_lfu_byte_budget_and_pins(tmp_path):
+    inner = AppendOnlyCacheStore(tmp_path / "cache.seg")
+    store = BoundedCacheStore(inner, tmp_path / "meta.pkl", max_bytes=3 * inner_size(inner), policy="lfu", low_water=1.0)
+    store.put("a", "x" * 100)
+    store.put("b", "x" * 100)
+    store.put("c", "x" * 100)
+    store.pin("a")
+    for _ in range(3):
+        store["b"]
+    store["c"]
+    store.put("d", "x" * 100)
+    # "a" is pinned and "b" is used most, so "c" goes
+    assert sorted(store) == ["a", "b", "d"]
+    store.put("e", "x" * 100)
+    assert sorted(store) == ["a", "b", "e"]
+    store.close()
+    # Hit counts and pins are saved with the metadata
+    store = BoundedCacheStore(AppendOnlyCacheStore(tmp_path / "cache.seg"), tmp_path / "meta.pkl")
+    assert store.is_pinned("a")
+    assert store._meta["b"][3] == 3
+    store.close()
+
+
+def inner_size(store):
+    store["probe"] = "x" * 100
+    size = store.entry_size("probe")
+    del store["probe"]
+    return size
+
+
+def test_bounded_store_ttl_and_namespaces(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("gabm.io.llm.cache.time.time", lambda: now[0])
+    store = BoundedCacheStore(
+        SQLiteCacheStore(tmp_path / "cache.sqlite"), ttl=60, namespace_max_bytes={"small": 1}
+    )
+    store.put("a", "old", namespace="model-a")
+    store.put("b", "kept", namespace="model-b")
+    store.pin_namespace("model-b")
+    store.put("s1", "first", namespace="small")
+    store.put("s2", "second", namespace="small")
+    # The namespace is over its budget; only the newest entry is kept
+    assert "s1" not in store
+    store.clear_namespace("small")
+    now[0] += 61
+    assert "a" not in store
+    assert store.get("b") == "kept"
+    assert store.expire() == 1
+    assert store.namespaces() == {"model-b": {"entries": 1, "bytes": store.store.entry_size("b")}}
+    store.put("c", "new", namespace="model-a")
+    assert store.clear_namespace("model-b") == 0
+    assert store.clear_namespace("model-b", include_pinned=True) == 1
+    assert list(store) == ["c"]
+    store.close()
+
+
+def test_load_llm_cache_with_limits_and_cache_and_log_namespace(tmp_path):
+    pkl = tmp_path / "prompt_response_cache.pkl"
+    jsonl = tmp_path / "prompt_response_cache.jsonl"
+    with load_llm_cache(pkl, limits={"max_entries": 10}) as store:
+        assert isinstance(store, BoundedCacheStore)
+        cache_and_log(store, "key", "Hi", pkl, jsonl, prompt="Hello", model="model-a", extract_text_from_response=str)
+        assert store.namespaces() == {"model-a": {"entries": 1, "bytes": store.store.entry_size("key")}}
+    assert (tmp_path / "cache_meta.pkl").exists()
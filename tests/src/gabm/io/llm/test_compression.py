@@ -0,0 +1,68 @@
+"""
+Tests for the compression module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import pytest
+# Local imports
+from gabm.io.llm.compression import get_codec, log_suffix, open_log, train_dictionary
+
+
+SAMPLES = [
+    f"You are a {age} year old voter living in Leeds. Do you support the new cycle lanes? Answer yes or no.".encode("utf-8")
+    for age in range(18, 90)
+]
+
+
+@pytest.mark.parametrize("name", ["none", "zlib", "gzip"])
+def test_codec_roundtrip(name):
+    codec = get_codec(name)
+    data = b"".join(SAMPLES)
+    assert codec.decompress(codec.compress(data)) == data
+    if name != "none":
+        assert len(codec.compress(data)) < len(data)
+
+
+def test_get_codec_by_id_and_unknown():
+    assert get_codec(1).name == "zlib"
+    assert get_codec(None).name == "none"
+    with pytest.raises(ValueError):
+        get_codec("lz4")
+    with pytest.raises(ValueError):
+        get_codec(9)
+    with pytest.raises(ValueError):
+        get_codec("gzip", dictionary=b"abc")
+
+
+def test_zlib_dictionary_shrinks_small_records():
+    dictionary = train_dictionary(SAMPLES, "zlib")
+    assert 0 < len(dictionary) <= 32768
+    plain = get_codec("zlib")
+    trained = get_codec("zlib", dictionary)
+    record = b"You are a 45 year old voter living in York. Do you support the new cycle lanes? Answer yes or no."
+    assert trained.decompress(trained.compress(record)) == record
+    assert len(trained.compress(record)) < len(plain.compress(record)) / 2
+
+
+def test_zstd_codec_roundtrip():
+    pytest.importorskip("zstandard")
+    dictionary = train_dictionary(SAMPLES * 20, "zstd", size=4096)
+    codec = get_codec("zstd", dictionary)
+    assert codec.decompress(codec.compress(SAMPLES[0])) == SAMPLES[0]
+
+
+def test_open_log_by_suffix(tmp_path):
+    assert log_suffix("gzip") == ".gz"
+    assert log_suffix("none") == ""
+    for name in ("log.jsonl", "log.jsonl.gz"):
+        path = tmp_path / name
+        with open_log(path, "wt") as f:
+            f.write('{"i": 1}\n')
+        with open_log(path) as f:
+            assert f.read() == '{"i": 1}\n'
+    assert (tmp_path / "log.jsonl.gz").read_bytes()[:2] == b"\x1f\x8b"
@@ -0,0 +1,284 @@
+"""
+Tests for the llm_service module, using a stand-in service that does not call any API.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import asyncio
+import json
+import logging
+import threading
+import time
+import pytest
+# Local imports
+from gabm.io.llm.llm_service import LLMService
+from gabm.io.llm.response import LLMResponse
+from gabm.io.llm.utils import make_cache_key
+
+
+class EchoService(LLMService):
+    """LLM service that echoes prompts back and counts API calls."""
+    SERVICE_NAME = "echo"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, logger=logging.getLogger("test_echo"), **kwargs)
+        self.calls = []
+
+    DEFAULT_MODEL = "echo-1"
+
+    def send(self, api_key, message, model=DEFAULT_MODEL):
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        cache_key = make_cache_key(message, model)
+        def api_call():
+            self.calls.append(message)
+            return f"echo: {message}"
+        return self._call_and_cache_response(api_call, cache_key, message, model, api_key)
+
+    def list_available_models(self, api_key):
+        return ["echo-1"]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory, as services write to data/llm/<service>."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_send_caches_and_logs(workdir):
+    with EchoService(log_options={"flush_interval": 60}) as service:
+        assert service.send("key", "Hello") == "echo: Hello"
+        assert service.send("key", "Hello") == "echo: Hello"
+        assert service.calls == ["Hello"]
+        service.flush()
+        lines = (workdir / "data/llm/echo/prompt_response_cache.jsonl").read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["response"] for line in lines] == ["echo: Hello"]
+    # A new instance reads the persisted cache
+    with EchoService() as service:
+        assert service.send("key", "Hello") == "echo: Hello"
+        assert service.calls == []
+
+
+def test_asend_shares_cache_with_send(workdir):
+    service = EchoService()
+    assert asyncio.run(service.asend("key", "Hello")) == "echo: Hello"
+    assert service.send("key", "Hello") == "echo: Hello"
+    assert asyncio.run(service.asend("key", "Hello")) == "echo: Hello"
+    assert service.calls == ["Hello"]
+    service.close()
+
+
+def test_send_many_deduplicates_and_keeps_order(workdir):
+    service = EchoService()
+    service.send("key", "b")
+    results = service.send_many("key", ["a", "b", "a", "c", " c "], max_concurrency=2)
+    assert results == ["echo: a", "echo: b", "echo: a", "echo: c", "echo: c"]
+    # "b" was a cache hit and duplicates (including normalised ones) were sent once
+    assert sorted(service.calls) == ["a", "b", "c"]
+    service.close()
+
+
+def test_send_many_limits_concurrency(workdir):
+    service = EchoService()
+    lock = threading.Lock()
+    state = {"in_flight": 0, "peak": 0}
+    original = service.send
+    def slow_send(api_key, message, model="echo-1"):
+        with lock:
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        time.sleep(0.02)
+        try:
+            return original(api_key, message, model)
+        finally:
+            with lock:
+                state["in_flight"] -= 1
+    service.send = slow_send
+    results = service.send_many("key", [f"m{i}" for i in range(12)], max_concurrency=3)
+    assert results == [f"echo: m{i}" for i in range(12)]
+    assert 1 < state["peak"] <= 3
+    service.close()
+
+
+def test_asend_many(workdir):
+    service = EchoService()
+    results = asyncio.run(service.asend_many("key", ["x", "y", "x"], max_concurrency=2))
+    assert results == ["echo: x", "echo: y", "echo: x"]
+    assert sorted(service.calls) == ["x", "y"]
+    service.close()
+
+
+class RateLimitedService(EchoService):
+    """Echo service whose API fails with HTTP 429 for the first `failures` calls."""
+    SERVICE_NAME = "ratelimited"
+
+    def __init__(self, failures, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+
+    def send(self, api_key, message, model=EchoService.DEFAULT_MODEL):
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        cache_key = make_cache_key(message, model)
+        def api_call():
+            self.calls.append(message)
+            if len(self.calls) <= self.failures:
+                raise RuntimeError("Error code: 429 - rate limit reached")
+            return f"echo: {message}"
+        return self._call_and_cache_response(api_call, cache_key, message, model, api_key)
+
+
+def test_send_retries_rate_limit_errors(workdir):
+    with RateLimitedService(2, rate_limits={"max_retries": 2, "base_delay": 0.001}) as service:
+        assert service.send("key", "Hello") == "echo: Hello"
+        assert service.calls == ["Hello"] * 3
+
+
+def test_send_reports_quota_exceeded_after_retries(workdir):
+    with RateLimitedService(10, rate_limits={"max_retries": 1, "base_delay": 0.001}) as service:
+        result = service.send("key", "Hello")
+        assert result["error"] == "quota_exceeded"
+        assert len(service.calls) == 2
+        # Errors are not cached
+        assert make_cache_key("Hello", "echo-1") not in service.cache
+
+
+def test_concurrent_identical_sends_are_coalesced(workdir):
+    with EchoService() as service:
+        original = service._call_and_cache_response
+        release = threading.Event()
+        def slow_call(api_call, *args):
+            def wait_then_call():
+                release.wait(5)
+                return api_call()
+            return original(wait_then_call, *args)
+        service._call_and_cache_response = slow_call
+        threads = [threading.Thread(target=service.send, args=("key", "Same question")) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while service.single_flight.coalesced < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert service.calls == ["Same question"]
+        assert service.single_flight.coalesced == 3
+
+
+class StreamingEchoService(EchoService):
+    """Echo service that streams its response word by word, recording how many words were generated."""
+    SERVICE_NAME = "streamecho"
+
+    def _stream(self, api_key, message, model):
+        self.calls.append(message)
+        self.generated = 0
+        for word in f"echo: {message}".split(" "):
+            self.generated += 1
+            yield word + " "
+
+
+def test_send_stream_stops_early_and_caches(workdir):
+    from gabm.io.llm.streaming import AnswerMatcher
+    with StreamingEchoService() as service:
+        chunks = []
+        message = "I choose Yes then keep talking for a while"
+        text = service.send_stream("key", message, on_text=chunks.append, stop=AnswerMatcher(["Yes", "No"]))
+        assert text == "echo: I choose Yes "
+        assert chunks == ["echo: ", "I ", "choose ", "Yes "]
+        assert service.generated == 4
+        # Cached per stop hook: the same hook is served from the cache in one chunk
+        chunks.clear()
+        assert service.send_stream("key", message, on_text=chunks.append, stop=AnswerMatcher(["Yes", "No"])) == text
+        assert chunks == [text]
+        assert len(service.calls) == 1
+        # Without a stop hook the whole response is streamed
+        assert service.send_stream("key", message) == f"echo: {message} "
+        # A hook without a cache_key is applied but not cached
+        assert service.send_stream("key", message, stop=lambda t: "Yes" in t) == text
+        assert service.send_stream("key", message, stop=lambda t: "Yes" in t) == text
+        assert len(service.calls) == 4
+
+
+def test_send_stream_falls_back_to_send(workdir):
+    with EchoService() as service:
+        chunks = []
+        assert service.send_stream("key", "Hello", on_text=chunks.append) == "echo: Hello"
+        assert chunks == ["echo: Hello"]
+
+
+def test_send_similar_reuses_equivalent_prompts(workdir):
+    service = EchoService(near_duplicates={"slot_tolerance": 1})
+    assert service.send("key", "I am 30 years old. I am female. I am asked: Do you vote?") == \
+        "echo: I am 30 years old. I am female. I am asked: Do you vote?"
+    # Reordered facts, extra whitespace and an age within the tolerance reuse the response
+    assert service.send_similar("key", "I am female.  I am 31 years old. I am asked: Do you vote?") == \
+        "echo: I am 30 years old. I am female. I am asked: Do you vote?"
+    # send() only uses exact matches, and send_similar() can narrow the tolerance per call
+    assert service.send("key", "I am 31 years old. I am female. I am asked: Do you vote?").startswith("echo: I am 31")
+    assert service.send_similar("key", "I am 33 years old. I am female. I am asked: Do you vote?") == \
+        "echo: I am 33 years old. I am female. I am asked: Do you vote?"
+    assert service.send_similar("key", "I am 32 years old. I am female. I am asked: Do you vote?",
+                                slot_tolerance=0).startswith("echo: I am 32")
+    assert len(service.calls) == 4
+    service.close()
+    # The index is persisted alongside the cache
+    with EchoService(near_duplicates={"slot_tolerance": 1}) as service:
+        assert len(service.near_duplicates) == 4
+        with pytest.raises(ValueError):
+            EchoService().send_similar("key", "Hello")
+
+
+class CompletionService(EchoService):
+    """Echo service whose API returns OpenAI-style response dicts."""
+
+    def send(self, api_key, message, model=EchoService.DEFAULT_MODEL):
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        def api_call():
+            self.calls.append(message)
+            return {
+                "model": model,
+                "choices": [{"message": {"content": f"echo: {message}"}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+            }
+        return self._call_and_cache_response(api_call, make_cache_key(message, model), message, model, api_key)
+
+    @staticmethod
+    def simple_extract_text(response):
+        return response["choices"][0]["message"]["content"] if isinstance(response, dict) else str(response)
+
+
+def test_compact_responses_are_returned_and_cached(workdir):
+    with CompletionService(compact_responses=True, keep_raw=True) as service:
+        response = service.send("key", "Hello")
+        assert isinstance(response, LLMResponse)
+        assert str(response) == "echo: Hello"
+        assert response.usage["total_tokens"] == 5
+        assert response.latency is not None
+        assert response.raw["choices"][0]["finish_reason"] == "stop"
+    with CompletionService(compact_responses=True) as service:
+        assert service.send("key", "Hello") == response
+        assert service.calls == []
+        service.flush()
+        lines = (workdir / "data/llm/echo/prompt_response_cache.jsonl").read_text(encoding="utf-8").splitlines()
+        assert json.loads(lines[0])["response"] == "echo: Hello"
+
+
+def test_json_cache_implies_compact_responses(workdir):
+    with CompletionService(cache_options={"serialiser": "json"}) as service:
+        assert service.compact_responses
+        response = service.send("key", "Hello")
+        assert isinstance(response, LLMResponse)
+    with CompletionService() as service:
+        assert service.cache.serialiser == "json"
+        assert service.send("key", "Hello") == response
+        assert service.calls == []
@@ -0,0 +1,56 @@
+"""
+Tests for the load_generator module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import logging
+import pytest
+# Local imports
+from gabm.io.llm.load_generator import format_report, make_prompts, run_load
+from gabm.io.llm.mock_server import MockLLMServer
+from gabm.io.llm.publicai import PublicAIService
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory, as services write to data/llm/<service>."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_make_prompts():
+    prompts = make_prompts(20, n_unique=5, seed=1)
+    assert len(prompts) == 20
+    assert len(set(prompts)) == 5
+    assert prompts == make_prompts(20, n_unique=5, seed=1)
+    assert len(set(make_prompts(10))) == 10
+
+
+def test_run_load_reports_cache_hits_and_errors(workdir):
+    with MockLLMServer(latency=("uniform", 0.001, 0.005), seed=0) as server:
+        with PublicAIService(base_url=server.url, logger=logging.getLogger("test_load_generator")) as service:
+            report = run_load(service, "key", make_prompts(40, n_unique=10, seed=0), model="mock-model", concurrency=4, server=server)
+            assert report["requests"] == 40
+            assert report["errors"] == 0
+            assert report["requests_per_second"] > 0
+            assert report["p50_ms"] <= report["p99_ms"] <= report["max_ms"]
+            # Every distinct prompt reaches the server once; repeats are cache hits or coalesced
+            assert report["server"]["ok"] == 10
+            assert 0 < report["cache_hits"] + report["coalesced"] <= 30
+            rerun = run_load(service, "key", make_prompts(40, n_unique=10, seed=0), model="mock-model")
+            assert rerun["cache_hit_rate"] == 1.0
+    text = format_report(report)
+    assert "req/s" in text and "p99" in text and "Server:" in text
+
+
+def test_run_load_counts_server_errors(workdir):
+    with MockLLMServer(error_rate=1.0) as server:
+        with PublicAIService(base_url=server.url, logger=logging.getLogger("test_load_generator")) as service:
+            report = run_load(service, "key", make_prompts(5), model="mock-model", concurrency=2)
+    assert report["errors"] == 5
+    assert report["error_rate"] == 1.0
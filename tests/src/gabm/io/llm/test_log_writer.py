@@ -0,0 +1,103 @@
+"""
+Tests for the log_writer module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import json
+import logging
+import time
+import pytest
+# Local imports
+from gabm.io.llm.log_writer import JSONLLogWriter, iter_log_entries, rolled_logs
+
+
+def read_entries(path):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_log_writer_flush_and_close(tmp_path):
+    path = tmp_path / "log.jsonl"
+    writer = JSONLLogWriter(path, batch_size=1000, flush_interval=60, fsync="flush")
+    for i in range(250):
+        writer.write({"i": i, "prompt": "Hello", "response": "Hi"})
+    assert writer.flush(timeout=5)
+    assert [e["i"] for e in read_entries(path)] == list(range(250))
+    writer.write({"i": 250})
+    writer.close()
+    assert len(read_entries(path)) == 251
+    with pytest.raises(RuntimeError):
+        writer.write({"i": 251})
+    # Closing twice is harmless
+    writer.close()
+
+
+def test_log_writer_flushes_on_interval(tmp_path):
+    path = tmp_path / "log.jsonl"
+    writer = JSONLLogWriter(path, batch_size=1000, flush_interval=0.05)
+    writer.write({"i": 0})
+    deadline = time.monotonic() + 5
+    while not read_entries(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert read_entries(path) == [{"i": 0}]
+    writer.close()
+
+
+def test_log_writer_flushes_on_batch_size(tmp_path):
+    path = tmp_path / "log.jsonl"
+    writer = JSONLLogWriter(path, batch_size=10, flush_interval=60, fsync="batch")
+    for i in range(10):
+        writer.write({"i": i})
+    deadline = time.monotonic() + 5
+    while len(read_entries(path)) < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(read_entries(path)) == 10
+    writer.close()
+
+
+def test_log_writer_rejects_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        JSONLLogWriter(tmp_path / "log.jsonl", fsync="sometimes")
+
+
+def test_log_writer_rolls_and_compresses(tmp_path):
+    path = tmp_path / "log.jsonl"
+    writer = JSONLLogWriter(path, batch_size=10, flush_interval=60, max_bytes=2000, compression="gzip")
+    for i in range(200):
+        writer.write({"i": i, "prompt": "Hello", "response": "Hi"})
+    writer.close()
+    rolled = rolled_logs(path)
+    assert rolled and all(p.name.endswith(".jsonl.gz") for p in rolled)
+    assert [e["i"] for e in iter_log_entries(path)] == list(range(200))
+    assert path.stat().st_size < 2000
+    # A writer that had the log open before it was rolled appends to the new log
+    other = JSONLLogWriter(path, batch_size=1, flush_interval=60, max_bytes=2000)
+    other.write({"i": 200})
+    assert other.flush(timeout=5)
+    writer = JSONLLogWriter(path, batch_size=1, flush_interval=60, max_bytes=2000)
+    for i in range(201, 260):
+        writer.write({"i": i})
+    writer.close()
+    other.write({"i": 260})
+    other.close()
+    assert [e["i"] for e in iter_log_entries(path)] == list(range(261))
+
+
+def test_log_writer_rolls_without_errors(tmp_path, caplog):
+    path = tmp_path / "log.jsonl"
+    writer = JSONLLogWriter(path, batch_size=1, flush_interval=60, max_bytes=100, compression="none",
+                            logger=logging.getLogger("test_log_writer"))
+    with caplog.at_level(logging.INFO, logger="test_log_writer"):
+        for i in range(10):
+            writer.write({"i": i, "prompt": "Hello", "response": "Hi"})
+        writer.close()
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+    assert rolled_logs(path)
+    assert [e["i"] for e in iter_log_entries(path)] == list(range(10))
+    assert (tmp_path / "log.jsonl.lock").exists()
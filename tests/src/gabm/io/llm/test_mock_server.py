@@ -0,0 +1,103 @@
+"""
+Tests for the mock_server module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import logging
+import random
+import pytest
+import requests
+# Local imports
+from gabm.io.llm.mock_server import MockLLMServer, sample_latency
+from gabm.io.llm.openai import OpenAIService
+from gabm.io.llm.publicai import PublicAIService
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory, as services write to data/llm/<service>."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_sample_latency_distributions():
+    rng = random.Random(0)
+    assert sample_latency(0.25, rng) == 0.25
+    assert all(0.1 <= sample_latency(("uniform", 0.1, 0.2), rng) <= 0.2 for _ in range(100))
+    assert sample_latency(("normal", -5, 0.1), rng) == 0.0
+    lognormal = sorted(sample_latency(("lognormal", 0.05, 0.5), rng) for _ in range(1001))
+    assert 0.04 < lognormal[500] < 0.06
+    assert sample_latency(("exponential", 0.0), rng) == 0.0
+    assert sample_latency(lambda r: 0.5, rng) == 0.5
+    with pytest.raises(ValueError):
+        sample_latency(("pareto", 1.0), rng)
+
+
+def test_chat_completion_and_models():
+    with MockLLMServer(models=("m1", "m2")) as server:
+        response = requests.post(f"{server.url}/chat/completions", json={
+            "model": "m2", "messages": [{"role": "user", "content": "Hello there"}]
+        })
+        assert response.status_code == 200
+        body = response.json()
+        assert body["model"] == "m2"
+        assert body["choices"][0]["message"]["content"] == "Mock response to: Hello there"
+        assert body["usage"]["prompt_tokens"] == 2
+        models = requests.get(f"{server.url}/models").json()
+        assert [model["id"] for model in models["data"]] == ["m1", "m2"]
+        assert requests.get(f"{server.url}/other").status_code == 404
+        assert server.stats()["ok"] == 1
+
+
+def test_injected_errors():
+    with MockLLMServer(rate_limit_rate=1.0, retry_after=2) as server:
+        response = requests.post(f"{server.url}/chat/completions", json={"messages": []})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "2"
+        assert response.json()["error"]["type"] == "rate_limit_error"
+    with MockLLMServer(error_rate=1.0) as server:
+        response = requests.post(f"{server.url}/chat/completions", json={"messages": []})
+        assert response.status_code == 500
+        assert server.stats() == {"requests": 1, "ok": 0, "rate_limited": 0, "errors": 1, "streamed": 0}
+
+
+def test_max_requests_per_second():
+    with MockLLMServer(max_requests_per_second=2) as server:
+        codes = [requests.post(f"{server.url}/chat/completions", json={"messages": []}).status_code for _ in range(4)]
+        assert codes == [200, 200, 429, 429]
+
+
+def test_openai_service_against_mock_server(workdir):
+    with MockLLMServer(respond=lambda prompt, model: prompt.upper()) as server:
+        with OpenAIService(base_url=server.url, logger=logging.getLogger("test_mock_server")) as service:
+            response = service.send("key", "hello", model="mock-model")
+            assert service.simple_extract_text(response) == "HELLO"
+            assert service.send("key", "hello", model="mock-model") is not None
+            chunks = []
+            assert service.send_stream("key", "stream this", model="mock-model", on_text=chunks.append) == "STREAM THIS"
+            assert "".join(chunks) == "STREAM THIS"
+        assert server.stats()["requests"] == 2
+        assert server.stats()["streamed"] == 1
+
+
+def test_publicai_service_retries_injected_rate_limits(workdir):
+    with MockLLMServer(max_requests_per_second=1, retry_after=0.05) as server:
+        service = PublicAIService(
+            base_url=server.url + "/",
+            logger=logging.getLogger("test_mock_server"),
+            rate_limits={"max_retries": 50, "max_delay": 0.05}
+        )
+        with service:
+            assert service.BASE_URL == server.url
+            first = service.send("key", "one", model="mock-model")
+            second = service.send("key", "two", model="mock-model")
+            assert service.simple_extract_text(first) == "Mock response to: one"
+            assert service.simple_extract_text(second) == "Mock response to: two"
+        stats = server.stats()
+        assert stats["ok"] == 2
+        assert stats["rate_limited"] >= 1
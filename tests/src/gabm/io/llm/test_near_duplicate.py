@@ -0,0 +1,44 @@
+"""
+Tests for the near_duplicate module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Local imports
+from gabm.io.llm.near_duplicate import NearDuplicateIndex, prompt_template
+
+
+def test_prompt_template_ignores_whitespace_order_and_numbers():
+    template, slots = prompt_template("I am 34 years old. I am male.\nI am asked: Do you agree?")
+    other, other_slots = prompt_template("  I am male.   I am 35 years old. I am asked: Do you agree? ")
+    assert template == other
+    assert slots == (34.0,)
+    assert other_slots == (35.0,)
+    assert prompt_template("I am male. I am asked: Do you disagree?")[0] != template
+
+
+def test_index_matches_closest_slots_within_tolerance(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "near.jsonl", slot_tolerance=2)
+    index.add("I am 30 years old.", "m", "k30")
+    index.add("I am 40 years old.", "m", "k40")
+    assert index.lookup("I am 39 years old.", "m") == "k40"
+    assert index.lookup("I am 35 years old.", "m") is None
+    assert index.lookup("I am 35 years old.", "m", slot_tolerance=5) == "k30"
+    # Entries only match prompts for the same model
+    assert index.lookup("I am 30 years old.", "other") is None
+    assert index.stats() == {"entries": 2, "template_hits": 2, "embedding_hits": 0, "misses": 2}
+    reloaded = NearDuplicateIndex(tmp_path / "near.jsonl")
+    assert reloaded.lookup("I am 30 years old.", "m") == "k30"
+
+
+def test_index_embedding_threshold(tmp_path):
+    vectors = {"Do you like cats?": [1.0, 0.0], "Are you fond of cats?": [0.9, 0.1], "Do you like dogs?": [0.0, 1.0]}
+    index = NearDuplicateIndex(embed=vectors.get, threshold=0.95)
+    index.add("Do you like cats?", "m", "cats")
+    assert index.lookup("Are you fond of cats?", "m") == "cats"
+    assert index.lookup("Are you fond of cats?", "m", threshold=0.999) is None
+    assert index.lookup("Do you like dogs?", "m") is None
+    assert index.embedding_hits == 1
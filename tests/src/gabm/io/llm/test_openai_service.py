@@ -8,6 +8,9 @@ __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
 
 # Standard library imports
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
 import pytest
 # Local imports
 from gabm.io.read_data import read_api_keys
@@ -52,3 +55,110 @@ def test_openai_communication():
     model, prompt = DEFAULT_PROMPT
     resp = service.send(api_key, prompt, model=model)
     assert resp is not None and len(str(resp)) > 0
+
+
+def test_openai_client_is_reused(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Service = import_service()
+    service = Service()
+    client = service._get_client("key-1")
+    assert service._get_client("key-1") is client
+    assert service._get_client("key-2") is not client
+    service.close()
+    assert client.is_closed()
+
+
+
+class BatchStandIn(BaseHTTPRequestHandler):
+    """Local stand-in for the OpenAI files and batches endpoints. Each batch completes on its second poll."""
+    files = {}
+    batches = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _file(self, content):
+        file_id = f"file-{len(self.files)}"
+        self.files[file_id] = content
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": 0,
+                "filename": "batch.jsonl", "purpose": "batch", "status": "processed"}
+
+    def _batch(self, batch):
+        fields = {"object": "batch", "endpoint": "/v1/chat/completions", "completion_window": "24h", "created_at": 0}
+        return {**fields, **batch}
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/v1/files":
+            boundary = self.headers["Content-Type"].split("boundary=")[1].encode()
+            part = next(p for p in body.split(b"--" + boundary) if b'name="file"' in p)
+            self._reply(self._file(part.split(b"\r\n\r\n", 1)[1].rsplit(b"\r\n", 1)[0]))
+        elif self.path == "/v1/batches":
+            request = json.loads(body)
+            batch_id = f"batch-{len(self.batches)}"
+            self.batches[batch_id] = {"id": batch_id, "input_file_id": request["input_file_id"],
+                                      "status": "in_progress", "polls": 0}
+            self._reply(self._batch({"id": batch_id, "input_file_id": request["input_file_id"], "status": "validating"}))
+
+    def do_GET(self):
+        if self.path.startswith("/v1/batches/"):
+            batch = self.batches[self.path.rsplit("/", 1)[1]]
+            batch["polls"] += 1
+            if batch["polls"] >= 2 and batch["status"] == "in_progress":
+                lines = []
+                for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+                    request = json.loads(line)
+                    prompt = request["body"]["messages"][0]["content"]
+                    if prompt == "fail":
+                        response = {"status_code": 400, "body": {"error": {"message": "bad request"}}}
+                    else:
+                        response = {"status_code": 200, "body": {
+                            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": request["body"]["model"],
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": f"echo: {prompt}"}}]}}
+                    lines.append(json.dumps({"id": "r", "custom_id": request["custom_id"], "response": response}))
+                batch["output_file_id"] = self._file(("\n".join(lines) + "\n").encode("utf-8"))["id"]
+                batch["status"] = "completed"
+            self._reply(self._batch({k: v for k, v in batch.items() if k != "polls"}))
+        elif self.path.startswith("/v1/files/") and self.path.endswith("/content"):
+            self._reply(self.files[self.path.split("/")[3]], content_type="application/octet-stream")
+
+
+@pytest.fixture
+def batch_server():
+    BatchStandIn.files, BatchStandIn.batches = {}, {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BatchStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+def test_openai_send_batch(tmp_path, monkeypatch, batch_server):
+    monkeypatch.chdir(tmp_path)
+    Service = import_service()
+    with Service(base_url=batch_server) as service:
+        service.send_batch("key", ["Hello", "Bye", "Hello"], poll_interval=0.01)
+        responses = service.send_batch("key", ["Hello", "Bye", "fail", "Hello"], poll_interval=0.01)
+        assert [service.simple_extract_text(r) if r else None for r in responses] == [
+            "echo: Hello", "echo: Bye", None, "echo: Hello"
+        ]
+        # Duplicates are submitted once, and the second batch only holds the prompt that was not cached
+        batch_dir = tmp_path / "data/llm/openai/batches"
+        assert len((batch_dir / "batch-0.jsonl").read_text().splitlines()) == 2
+        assert len((batch_dir / "batch-1.jsonl").read_text().splitlines()) == 1
+        service.flush()
+        log = (tmp_path / "data/llm/openai/prompt_response_cache.jsonl").read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["batch_id"] for line in log] == ["batch-0", "batch-0"]
+        assert service.submit_batch("key", ["Hello", "Bye"]) is None
+        stats = service.stats()[service.DEFAULT_MODEL]
+        assert stats["calls"] == 3 and stats["errors"] == 1
+        assert stats["cache_hits"] == 4
@@ -8,6 +8,9 @@ __copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
 
 
 # Standard library imports
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
 import pytest
 # Local imports
 from gabm.io.read_data import read_api_keys
@@ -52,3 +55,83 @@ def test_publicai_communication():
     model, prompt = DEFAULT_PROMPT
     resp = service.send(api_key, prompt, model=model)
     assert resp is not None and len(str(resp)) > 0
+
+
+def test_publicai_client_is_pooled_and_reused(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Service = import_service()
+    service = Service(pool_size=4)
+    session = service._get_client("key-1")
+    assert service._get_client("key-1") is session
+    assert service._get_client("key-2") is not session
+    assert session.headers["Authorization"] == "Bearer key-1"
+    assert session.get_adapter("https://api.publicai.co")._pool_maxsize == 4
+    service.close()
+    assert service._clients == {}
+
+
+def test_publicai_asend_uses_cache_and_async_client(tmp_path, monkeypatch):
+    import asyncio
+    import httpx
+    monkeypatch.chdir(tmp_path)
+    requests_seen = []
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Hi there"}}]})
+    Service = import_service()
+    service = Service()
+    monkeypatch.setattr(service, "_create_async_client",
+                        lambda api_key: httpx.AsyncClient(transport=httpx.MockTransport(handler),
+                                                          headers={"Authorization": f"Bearer {api_key}"}))
+    async def run():
+        first = await service.asend("key", "Hello", model="test-model")
+        second = await service.asend("key", "Hello", model="test-model")
+        await service.aclose()
+        return first, second
+    first, second = asyncio.run(run())
+    assert first == second == {"choices": [{"message": {"content": "Hi there"}}]}
+    assert len(requests_seen) == 1
+    assert requests_seen[0].headers["Authorization"] == "Bearer key"
+
+
+
+class StreamingStandIn(BaseHTTPRequestHandler):
+    """Local stand-in for the chat completions endpoint that streams one word per event."""
+    sent = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        assert request["stream"] is True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for word in ["I", " would", " say", " No", ".", " Because", " coffee", " is", " better", "."]:
+                chunk = {"choices": [{"index": 0, "delta": {"content": word}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                self.sent.append(word)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def test_publicai_send_stream_with_early_stop(tmp_path, monkeypatch):
+    from gabm.io.llm.streaming import AnswerMatcher
+    monkeypatch.chdir(tmp_path)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StreamingStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        Service = import_service()
+        with Service() as service:
+            service.BASE_URL = f"http://127.0.0.1:{server.server_address[1]}/v1"
+            chunks = []
+            text = service.send_stream("key", "Tea or coffee?", on_text=chunks.append, stop=AnswerMatcher(["Yes", "No"]))
+            assert text == "I would say No"
+            assert "".join(chunks) == text
+            assert service.send_stream("key", "Tea or coffee?") == "I would say No. Because coffee is better."
+    finally:
+        server.shutdown()
@@ -0,0 +1,134 @@
+"""
+Tests for the rate_limit module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import asyncio
+import threading
+import pytest
+# HTTP client library
+import httpx
+# Local imports
+from gabm.io.llm.rate_limit import (
+    TokenBucket, RateLimiter, is_rate_limit_error, get_retry_after, estimate_tokens, response_token_usage
+)
+from gabm.io.llm.response import LLMResponse, response_usage
+
+
+class RateLimitError(Exception):
+    """Stand-in for a provider's HTTP 429 error."""
+    def __init__(self, retry_after=None):
+        super().__init__("Error code: 429 - Too Many Requests")
+        headers = {"retry-after": retry_after} if retry_after is not None else {}
+        self.response = httpx.Response(429, headers=headers)
+        self.status_code = 429
+
+
+def test_token_bucket_waits_when_empty():
+    bucket = TokenBucket(60, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # One token per second; the third request waits about a second
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    bucket.adjust(5)
+    assert bucket.reserve() == 0
+
+
+def test_limiter_limits_requests_and_tokens_per_model():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600,
+                          model_limits={"big": {"requests_per_minute": 6000}})
+    waits = [limiter.reserve("small") for _ in range(61)]
+    assert max(waits[:60]) == 0
+    assert waits[60] > 0
+    # Other models have their own buckets
+    assert limiter.reserve("big", tokens=600) == 0
+    assert limiter.reserve("big", tokens=60) > 0
+    # The first request used far fewer tokens than estimated
+    limiter.record_usage("big", estimated_tokens=600, actual_tokens=100)
+    assert limiter.reserve("big", tokens=1) == 0
+
+
+def test_limiter_is_shared_by_threads():
+    limiter = RateLimiter(requests_per_minute=60)
+    waits = []
+    lock = threading.Lock()
+    def reserve():
+        wait = limiter.reserve("m")
+        with lock:
+            waits.append(wait)
+    threads = [threading.Thread(target=reserve) for _ in range(70)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(1 for wait in waits if wait == 0) == 60
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    limiter = RateLimiter(base_delay=1.0, max_delay=5.0)
+    for attempt in range(6):
+        delay = limiter.backoff_delay(attempt)
+        cap = min(5.0, 2 ** attempt)
+        assert cap / 2 <= delay <= cap
+    assert limiter.backoff_delay(0, retry_after=3) == 3
+    assert limiter.backoff_delay(0, retry_after=300) == 5.0
+
+
+def test_call_retries_rate_limit_errors():
+    limiter = RateLimiter(max_retries=2, base_delay=0.001)
+    attempts = []
+    def api_call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitError()
+        return {"text": "ok", "usage": {"total_tokens": 7}}
+    assert limiter.call(api_call, "m", tokens=3, usage=response_token_usage)["text"] == "ok"
+    assert len(attempts) == 3
+    assert limiter.retries == 2
+    # Retries are exhausted on the next run of failures
+    with pytest.raises(RateLimitError):
+        limiter.call(lambda: (_ for _ in ()).throw(RateLimitError()), "m")
+
+
+def test_call_does_not_retry_other_errors():
+    limiter = RateLimiter(base_delay=0.001)
+    attempts = []
+    def api_call():
+        attempts.append(1)
+        raise ValueError("bad request")
+    with pytest.raises(ValueError):
+        limiter.call(api_call, "m")
+    assert len(attempts) == 1
+
+
+def test_acall_honours_retry_after():
+    limiter = RateLimiter(max_retries=1)
+    attempts = []
+    async def api_call():
+        attempts.append(asyncio.get_running_loop().time())
+        if len(attempts) == 1:
+            raise RateLimitError(retry_after="0.2")
+        return "ok"
+    assert asyncio.run(limiter.acall(api_call, "m")) == "ok"
+    assert attempts[1] - attempts[0] >= 0.15
+
+
+def test_error_helpers():
+    assert is_rate_limit_error(RateLimitError())
+    assert is_rate_limit_error(Exception("429 RESOURCE_EXHAUSTED"))
+    assert not is_rate_limit_error(Exception("404 not found"))
+    assert get_retry_after(RateLimitError(retry_after="12")) == 12.0
+    assert get_retry_after(RateLimitError()) is None
+    assert get_retry_after(Exception("{'retryDelay': '30s'}")) == 30.0
+    assert estimate_tokens("x" * 40) == 10
+    assert estimate_tokens("") == 0
+    assert response_token_usage({"usage_metadata": {"total_token_count": 5}}) == 5
+    assert response_token_usage("no usage") is None
+    # The rate limiter reads usage as telemetry does
+    record = LLMResponse("text", usage={"prompt_tokens": 2, "completion_tokens": 3, "total_tokens": 5})
+    assert response_token_usage(record) == response_usage(record)["total_tokens"] == 5
@@ -0,0 +1,137 @@
+"""
+Tests for the replay module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import asyncio
+import logging
+import pytest
+# Local imports
+from gabm.io.llm.bundle import export_bundle
+from gabm.io.llm.cache import PickleCacheStore, PromptTable
+from gabm.io.llm.llm_service import LLMService
+from gabm.io.llm.replay import ReplayLLMService
+from gabm.io.llm.response import LLMResponse
+from gabm.io.llm.utils import cache_and_log, make_cache_key
+
+
+class EchoService(LLMService):
+    """LLM service that echoes prompts back and counts API calls."""
+    SERVICE_NAME = "echo"
+    DEFAULT_MODEL = "echo-1"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, logger=logging.getLogger("test_replay"), **kwargs)
+        self.calls = []
+
+    def send(self, api_key, message, model=DEFAULT_MODEL):
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        def api_call():
+            self.calls.append(message)
+            return f"echo: {message}"
+        return self._call_and_cache_response(api_call, make_cache_key(message, model), message, model, api_key)
+
+    def list_available_models(self, api_key):
+        return ["echo-1"]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory, as services write to data/llm/<service>."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def record(messages):
+    with EchoService() as service:
+        for message in messages:
+            service.send("key", message)
+
+
+def test_replay_from_cache_and_log(workdir):
+    record(["Hello", "Bye"])
+    cache_file = workdir / "data/llm/echo/prompt_response_cache.seg"
+    files = {path: path.read_bytes() for path in (workdir / "data/llm/echo").iterdir()}
+    with ReplayLLMService(EchoService, logger=logging.getLogger("test_replay")) as replay:
+        assert replay.send(None, "Hello") == "echo: Hello"
+        assert replay.send_many(None, ["Bye", "Hello", "Bye"]) == ["echo: Bye", "echo: Hello", "echo: Bye"]
+        assert asyncio.run(replay.asend(None, "Hello")) == "echo: Hello"
+        with pytest.raises(LookupError):
+            replay.send(None, "Never sent")
+        assert replay.stats() == {"cache_hits": 4, "bundle_hits": 0, "log_hits": 0, "misses": 1}
+    # Replaying wrote nothing
+    assert {path: path.read_bytes() for path in (workdir / "data/llm/echo").iterdir()} == files
+    # With the cache gone, the logged texts are replayed
+    cache_file.unlink()
+    with ReplayLLMService("echo", default_model="echo-1", logger=logging.getLogger("test_replay")) as replay:
+        response = replay.send(None, "Bye")
+        assert isinstance(response, LLMResponse) and str(response) == "echo: Bye" and response.model == "echo-1"
+        assert replay.list_available_models() == ["echo-1"]
+        texts = []
+        assert replay.send_stream(None, "Hello", on_text=texts.append) == "echo: Hello"
+        assert texts == ["echo: Hello"]
+        assert replay.stats()["log_hits"] == 2
+
+
+def test_replay_resolves_logged_prompts_through_prompt_table(workdir):
+    # A log from elsewhere whose entries have no cache key record only the prompt fingerprint
+    other = workdir / "other"
+    table = PromptTable(other / "prompt_table.tsv")
+    cache_and_log({}, ("Hello", "echo-1"), "echo: Hello", other / "cache.pkl", other / "log.jsonl",
+                  prompt="Hello", model="echo-1", prompt_table=table)
+    assert '"prompt"' not in (other / "log.jsonl").read_text()
+    with ReplayLLMService(EchoService, jsonl_paths=[other / "log.jsonl"]) as replay:
+        assert str(replay.send(None, "Hello")) == "echo: Hello"
+        assert replay.stats()["log_hits"] == 1
+
+
+def test_replay_from_bundle_with_fallback(workdir):
+    record(["Hello"])
+    export_bundle(workdir / "echo.bundle", services=["echo"])
+    for path in (workdir / "data/llm/echo").iterdir():
+        path.unlink()
+    with EchoService() as live:
+        with ReplayLLMService(EchoService, fallback=live, cache_bundles=[workdir / "echo.bundle"]) as replay:
+            assert replay.send("key", "Hello") == "echo: Hello"
+            assert replay.send("key", "New") == "echo: New"
+            assert replay.stats() == {"cache_hits": 0, "bundle_hits": 1, "log_hits": 0, "misses": 1}
+        assert live.calls == ["New"]
+
+
+def test_replay_leaves_legacy_and_damaged_caches_untouched(workdir):
+    cache_dir = workdir / "data/llm/echo"
+    cache_dir.mkdir(parents=True)
+    with PickleCacheStore(cache_dir / "prompt_response_cache.pkl") as store:
+        store[make_cache_key("Hello", "echo-1")] = "legacy: Hello"
+    with ReplayLLMService(EchoService) as replay:
+        assert replay.send(None, "Hello") == "legacy: Hello"
+    assert [path.name for path in cache_dir.iterdir()] == ["prompt_response_cache.pkl"]
+    record(["Bye"])
+    segment = cache_dir / "prompt_response_cache.seg"
+    with segment.open("ab") as f:
+        f.write(b"\x01\x05\x00\x00")
+    size = segment.stat().st_size
+    with ReplayLLMService(EchoService) as replay:
+        assert replay.send(None, "Bye") == "echo: Bye"
+    assert segment.stat().st_size == size
+
+
+def test_replay_supports_inherited_methods(workdir):
+    record(["Hello", "Bye"])
+    files = {path: path.read_bytes() for path in (workdir / "data/llm/echo").iterdir()}
+    with ReplayLLMService(EchoService) as replay:
+        assert replay.telemetry is not None and replay.rate_limiter is not None
+        assert asyncio.run(replay.asend_many(None, ["Bye", "Hello", "Bye"])) == ["echo: Bye", "echo: Hello", "echo: Bye"]
+        with pytest.raises(ValueError):
+            replay.send_similar(None, "Hello")
+        with pytest.raises(ValueError):
+            replay.pin("Hello")
+        replay.flush()
+    assert {path: path.read_bytes() for path in (workdir / "data/llm/echo").iterdir()} == files
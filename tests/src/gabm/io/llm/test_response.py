@@ -0,0 +1,94 @@
+"""
+Tests for the response module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import pickle
+import pytest
+# OpenAI client library
+from openai.types.chat import ChatCompletion
+# Local imports
+from gabm.io.llm.response import (
+    LLMResponse, decode_value, encode_value, response_finish_reason, response_text, response_usage, to_record
+)
+
+
+def make_completion(content="Yes, I agree."):
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 1700000000,
+        "model": "gpt-4o-2024-08-06",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 4, "total_tokens": 16},
+        "system_fingerprint": "fp_1",
+    })
+
+
+def test_from_openai_completion():
+    completion = make_completion()
+    record = LLMResponse.from_raw(completion, "Yes, I agree.", model="gpt-4o", latency=0.5)
+    assert str(record) == "Yes, I agree."
+    assert record.finish_reason == "stop"
+    assert record.usage == {"prompt_tokens": 12, "completion_tokens": 4, "total_tokens": 16}
+    # The model reported by the provider is preferred to the model requested
+    assert record.model == "gpt-4o-2024-08-06"
+    assert record.latency == 0.5
+    assert record.raw is None
+    # Much smaller than the SDK object, and independent of the SDK when unpickled
+    assert len(pickle.dumps(record)) * 3 < len(pickle.dumps(completion))
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_from_genai_dict_keeps_compressed_raw():
+    response = {
+        "candidates": [{"content": {"parts": [{"text": "No."}]}, "finish_reason": "STOP"}],
+        "usage_metadata": {"prompt_token_count": 7, "candidates_token_count": 1, "total_token_count": 8},
+        "model_version": "gemini-2.5-flash",
+    }
+    assert response_finish_reason(response) == "STOP"
+    assert response_usage(response) == {"prompt_tokens": 7, "completion_tokens": 1, "total_tokens": 8}
+    record = LLMResponse.from_raw(response, "No.", model="models/gemini-2.5-flash", keep_raw=True)
+    assert record.model == "gemini-2.5-flash"
+    assert record.raw == response
+    assert record.to_dict() == {
+        "text": "No.", "finish_reason": "STOP",
+        "usage": {"prompt_tokens": 7, "completion_tokens": 1, "total_tokens": 8},
+        "model": "gemini-2.5-flash", "latency": None,
+    }
+
+
+def test_encode_value_roundtrip_without_pickle():
+    record = LLMResponse.from_raw(make_completion(), "Yes, I agree.", latency=0.5, keep_raw=True)
+    value = {
+        "record": record,
+        "tuple": ("gpt-4o", "Hello"),
+        "bytes": b"\x00\x01",
+        "$literal": [1, 2.5, None, True],
+        ("m", "p"): "tuple key",
+    }
+    data = encode_value(value)
+    assert b"pickle" not in data and data.startswith(b"{")
+    decoded = decode_value(data)
+    assert decoded == value
+    assert decoded["record"].raw == record.raw
+    with pytest.raises(TypeError):
+        encode_value(make_completion())
+
+
+def test_to_record_converts_sdk_responses_only():
+    assert to_record("plain text") == "plain text"
+    assert to_record({"error": "quota"}) == {"error": "quota"}
+    record = to_record(make_completion())
+    assert isinstance(record, LLMResponse)
+    assert record.text == response_text(make_completion()) == "Yes, I agree."
+    assert record.usage["total_tokens"] == 16
@@ -0,0 +1,165 @@
+"""
+Tests for the router module, using stand-in services that do not call any API.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import json
+import logging
+import time
+import pytest
+# Local imports
+from gabm.io.llm.llm_service import LLMService
+from gabm.io.llm.router import LLMRouter, RouterBackend, percentile
+from gabm.io.llm.utils import make_cache_key
+
+
+class FakeService(LLMService):
+    """Service that answers from its cache, or with its own name, or fails with the given error dict."""
+    SERVICE_NAME = "fake"
+
+    def __init__(self, name, delay=0.0, error=None):
+        self.SERVICE_NAME = name
+        super().__init__(logger=logging.getLogger("test_router"))
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    def send(self, api_key, message, model=None):
+        cached = self.cache.get(make_cache_key(message, model))
+        if cached is not None:
+            return cached
+        self.calls.append((api_key, message, model))
+        time.sleep(self.delay)
+        return self.error or f"{self.SERVICE_NAME}/{model}: {message}"
+
+    def list_available_models(self, api_key):
+        return []
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+MODEL_CLASSES = {"apertus-8b": {"slow": "slow-8b", "fast": "fast-8b"}}
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3.0, 1.0, 2.0, 4.0], 50) == 2.0
+    assert percentile([3.0, 1.0, 2.0, 4.0], 95) == 4.0
+
+
+def test_router_prefers_faster_backend_and_records_it(workdir):
+    slow, fast = FakeService("slow", delay=0.05), FakeService("fast")
+    backends = [RouterBackend("slow", slow, api_key="k1"), RouterBackend("fast", fast, api_key="k2")]
+    with LLMRouter(backends, MODEL_CLASSES, logger=logging.getLogger("test_router")) as router:
+        assert router.get_default_model() == "apertus-8b"
+        # Untried backends are tried first, then the faster one is preferred
+        for i in range(6):
+            router.send(None, f"Question {i}")
+        assert len(slow.calls) == 1
+        assert len(fast.calls) == 5
+        assert fast.calls[0][0] == "k2" and fast.calls[0][2] == "fast-8b"
+        assert router.get_backend("Question 5") == ("fast", "fast-8b")
+        # Cached by the router
+        assert router.send(None, "Question 5") == "fast/fast-8b: Question 5"
+        assert len(fast.calls) == 5
+        router.flush()
+        log = (workdir / "data/llm/router/prompt_response_cache.jsonl").read_text(encoding="utf-8").splitlines()
+        assert {json.loads(line)["backend"] for line in log} == {"slow", "fast"}
+        assert router.backend_stats()["slow"]["p50"] >= 0.05
+        stats = router.stats()["apertus-8b"]
+        assert stats["calls"] == 6 and stats["errors"] == 0 and stats["cache_hits"] == 1
+
+
+def test_router_fails_over_and_cools_down(workdir):
+    limited = FakeService("limited", error={"error": "quota_exceeded", "details": "429"})
+    spare = FakeService("spare")
+    backends = [RouterBackend("limited", limited, api_key="k", cost=0.0),
+                RouterBackend("spare", spare, api_key="k", cost=1.0)]
+    classes = {"m": {"limited": "l-1", "spare": "s-1"}}
+    with LLMRouter(backends, classes, logger=logging.getLogger("test_router")) as router:
+        assert router.send(None, "Hello") == "spare/s-1: Hello"
+        assert router.send(None, "Again") == "spare/s-1: Again"
+        # The backend that exceeded its quota is skipped while it cools down
+        assert len(limited.calls) == 1
+        assert router.backend_stats()["limited"]["cooling_down"]
+        assert router.get_backend("Hello") == ("spare", "s-1")
+        # The failover is a retry of the routed call
+        stats = router.stats()["m"]
+        assert stats["calls"] == 2 and stats["retries"] == 1 and stats["errors"] == 0
+
+
+def test_router_quota_and_errors(workdir):
+    broken = FakeService("broken", error={"error": "api_error", "details": "500"})
+    backends = [RouterBackend("broken", broken, api_key="k"), RouterBackend("quota", FakeService("quota"), api_key="k", requests_per_minute=1)]
+    classes = {"m": {"broken": "b", "quota": "q"}}
+    with LLMRouter(backends, classes, logger=logging.getLogger("test_router")) as router:
+        assert router.send(None, "One") == "quota/q: One"
+        # Both backends are now out: one errors, the other is over its quota
+        assert router.send(None, "Two") == {"error": "api_error", "details": "500"}
+        assert router.get_backend("Two") is None
+        assert router.stats()["m"]["errors"] == 1
+        with pytest.raises(ValueError):
+            router.send(None, "Three", model="unknown")
+    with pytest.raises(ValueError):
+        LLMRouter(backends, {"m": {"missing": "x"}}, logger=logging.getLogger("test_router"))
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class RateLimitedService(FakeService):
+    """Service whose every request is rate limited, sent through its rate limiter."""
+
+    def send(self, api_key, message, model=None):
+        def api_call():
+            self.calls.append((api_key, message, model))
+            raise RateLimitError("429 Too Many Requests")
+        try:
+            return self._current_rate_limiter().call(api_call, model)
+        except Exception as e:
+            return self._error_result(e)
+
+
+def test_router_scores_only_backend_requests(workdir):
+    cached, other = FakeService("cached"), FakeService("other")
+    cached.cache[make_cache_key("Hello", "c-1")] = "cached/c-1: Hello"
+    backends = [RouterBackend("cached", cached, api_key="k"), RouterBackend("other", other, api_key="k", cost=1.0)]
+    with LLMRouter(backends, {"m": {"cached": "c-1", "other": "o-1"}}, logger=logging.getLogger("test_router")) as router:
+        assert router.send(None, "Hello") == "cached/c-1: Hello"
+        # Served from the backend's own cache, so no request counts towards its statistics
+        assert router.backend_stats()["cached"]["requests"] == 0
+        assert router.send(None, "Bye") == "cached/c-1: Bye"
+        assert router.backend_stats()["cached"]["requests"] == 1
+
+
+def test_router_backends_do_not_retry_rate_limits(workdir):
+    limited, spare = RateLimitedService("limited"), FakeService("spare")
+    shared = limited.rate_limiter
+    backends = [RouterBackend("limited", limited, api_key="k"), RouterBackend("spare", spare, api_key="k", cost=1.0)]
+    # The service passed in is left as it is
+    assert limited.rate_limiter is shared and shared.max_retries == 3
+    assert backends[0].rate_limiter().max_retries == 0
+    with LLMRouter(backends, {"m": {"limited": "l-1", "spare": "s-1"}}, logger=logging.getLogger("test_router")) as router:
+        start = time.monotonic()
+        assert router.send(None, "Hello") == "spare/s-1: Hello"
+        # Failed over at once, without backing off and retrying on the limited backend
+        assert len(limited.calls) == 1
+        assert time.monotonic() - start < 0.5
+        assert router.backend_stats()["limited"]["cooling_down"]
+        # Direct use of the service still retries
+        shared.base_delay = shared.max_delay = 0.001
+        limited.send("k", "Direct", "l-1")
+        assert len(limited.calls) == 1 + 1 + shared.max_retries
+    kept = RateLimitedService("kept")
+    assert RouterBackend("kept", kept, retry_rate_limits=True).rate_limiter() is None
+    kept.close()
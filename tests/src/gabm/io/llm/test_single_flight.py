@@ -0,0 +1,68 @@
+"""
+Tests for the single_flight module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytest
+# Local imports
+from gabm.io.llm.single_flight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(flight.do, "key", call) for _ in range(5)]
+        while flight.coalesced < 4:
+            threading.Event().wait(0.01)
+        release.set()
+        assert [future.result() for future in futures] == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+    # Once complete, the next call runs again
+    assert flight.do("key", lambda: "again") == "again"
+    assert flight.leaders == 2
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+    release = threading.Event()
+    def call():
+        release.wait(5)
+        raise ValueError("failed")
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(flight.do, "key", call) for _ in range(3)]
+        while flight.coalesced < 2:
+            threading.Event().wait(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    assert flight.in_flight() == 0
+
+
+def test_async_calls_are_coalesced():
+    flight = SingleFlight()
+    calls = []
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", call) for _ in range(5)), flight.ado("other", call))
+    assert asyncio.run(main()) == ["result"] * 6
+    assert len(calls) == 2
+    assert flight.coalesced == 4
@@ -0,0 +1,50 @@
+"""
+Tests for the streaming module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import json
+import pytest
+# Local imports
+from gabm.io.llm.streaming import AnswerMatcher, iter_sse_chat_deltas
+
+
+def test_iter_sse_chat_deltas():
+    def event(content):
+        return "data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": content}}]})
+    lines = [": keep-alive", event("Hel"), "", event("lo"), 'data: {"choices": [{"delta": {}}]}',
+             "data: [DONE]", event("ignored")]
+    assert list(iter_sse_chat_deltas(lines)) == ["Hel", "lo"]
+    assert list(iter_sse_chat_deltas([event("b").encode("utf-8")])) == ["b"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I", None),
+    ("I would", None),
+    ("I disagree", "Disagree"),
+    ("I agree", "Agree"),
+    ("STRONGLY AGREE", "Strongly agree"),
+    # Could still become "Neither agree nor disagree"
+    ("I neither agree", None),
+    ("I neither agree nor", None),
+    ("I neither agree nor disagree", "Neither agree nor disagree"),
+    ("I agree, but I also disagree", None),
+])
+def test_answer_matcher(text, expected):
+    matcher = AnswerMatcher(["Agree", "Disagree", "Neither agree nor disagree", "Strongly agree"])
+    assert matcher.match(text) == expected
+    assert matcher(text) is (expected is not None)
+    assert matcher.matched == expected
+
+
+def test_answer_matcher_waits_for_longer_answers():
+    matcher = AnswerMatcher(["Yes", "Yes, definitely"])
+    assert matcher.match("Yes") is None
+    assert matcher.match("Yes.") == "Yes"
+    assert matcher.match("Yes, definitely") == "Yes, definitely"
+    assert matcher.cache_key == ("answers", "Yes", "Yes, definitely")
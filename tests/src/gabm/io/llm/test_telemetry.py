@@ -0,0 +1,151 @@
+"""
+Tests for the telemetry module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import asyncio
+import logging
+import threading
+import pytest
+# Local imports
+from gabm.io.llm.llm_service import LLMService
+from gabm.io.llm.mock_server import MockLLMServer
+from gabm.io.llm.publicai import PublicAIService
+from gabm.io.llm.response import LLMResponse
+from gabm.io.llm.telemetry import CallTimer, Histogram, Telemetry
+from gabm.io.llm.utils import make_cache_key
+
+
+class EchoService(LLMService):
+    """LLM service that echoes prompts back, optionally waiting on an event first."""
+    SERVICE_NAME = "echo"
+    DEFAULT_MODEL = "echo-1"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, logger=logging.getLogger("test_telemetry"), **kwargs)
+        self.release = None
+
+    def send(self, api_key, message, model=DEFAULT_MODEL):
+        cached = self._pre_send_check_and_cache(api_key, message, model)
+        if cached is not None:
+            return cached
+        def api_call():
+            if self.release is not None:
+                self.release.wait(5)
+            if message == "fail":
+                raise RuntimeError("boom")
+            return LLMResponse(f"echo: {message}", usage={"prompt_tokens": 3, "completion_tokens": 7, "total_tokens": 10})
+        return self._call_and_cache_response(api_call, make_cache_key(message, model), message, model, api_key)
+
+    def list_available_models(self, api_key):
+        return ["echo-1"]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory, as services write to data/llm/<service>."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(buckets=(1, 2, 4))
+    assert histogram.percentile(50) is None
+    for value in (0.5, 0.5, 1.5, 3.0, 10.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.percentile(20) == pytest.approx(0.5)
+    assert histogram.percentile(50) == pytest.approx(1.5)
+    assert histogram.percentile(100) == 10.0
+    summary = histogram.summary()
+    assert summary["count"] == 5 and summary["sum"] == pytest.approx(15.5) and summary["max"] == 10.0
+
+
+def test_record_call_tokens_cost_and_retries():
+    telemetry = Telemetry(prices={"m": (1.0, 2.0)})
+    timer = CallTimer()
+    call = timer.wrap(lambda: None)
+    call()
+    call()
+    telemetry.record_call("svc", "m", timer, {"usage": {"prompt_tokens": 1000, "completion_tokens": 500}}, "hi")
+    telemetry.record_call("svc", "m", CallTimer(), "a reply of twenty chars", "x" * 40)
+    telemetry.record_call("svc", "m", CallTimer(), {"error": "api_error", "details": "boom"}, "hi")
+    telemetry.record_cache_hit("svc", "m")
+    stats = telemetry.stats("svc")["m"]
+    assert stats["calls"] == 3
+    assert stats["errors"] == 1
+    assert stats["retries"] == 1
+    assert stats["tokens_in"] == 1000 + 10
+    assert stats["tokens_out"] == 500 + 5
+    assert stats["estimated_usage"] == 1
+    assert stats["cost"] == pytest.approx((1010 * 1.0 + 505 * 2.0) / 1_000_000)
+    assert stats["cache_hit_rate"] == pytest.approx(0.25)
+    assert stats["latency"]["count"] == 1
+    assert stats["queue_wait"]["count"] == 3
+    assert telemetry.stats() == {"svc": {"m": stats}}
+    telemetry.reset()
+    assert telemetry.stats() == {}
+
+
+def test_prometheus_format(tmp_path):
+    telemetry = Telemetry(buckets=(0.1, 1.0))
+    timer = CallTimer()
+    timer.wrap(lambda: None)()
+    telemetry.record_call("svc", 'm"1', timer, "text", "prompt")
+    text = telemetry.to_prometheus()
+    assert "# TYPE gabm_llm_calls_total counter" in text
+    assert 'gabm_llm_calls_total{service="svc",model="m\\"1"} 1' in text
+    assert 'gabm_llm_tokens_total{service="svc",model="m\\"1",direction="out"} 1' in text
+    assert "# TYPE gabm_llm_latency_seconds histogram" in text
+    assert 'gabm_llm_latency_seconds_bucket{service="svc",model="m\\"1",le="+Inf"} 1' in text
+    assert 'gabm_llm_queue_wait_seconds_count{service="svc",model="m\\"1"} 1' in text
+    path = tmp_path / "metrics" / "gabm.prom"
+    telemetry.write_prometheus(path)
+    assert path.read_text() == text
+
+
+def test_service_records_hits_misses_errors_and_coalesced(workdir):
+    with EchoService(telemetry={"prices": {"echo-1": (1.0, 1.0)}}) as service:
+        service.send("key", "Hello")
+        service.send("key", "Hello")
+        service.send("key", "fail")
+        service.release = threading.Event()
+        threads = [threading.Thread(target=service.send, args=("key", "Same")) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while service.single_flight.stats()["coalesced"] < 2:
+            pass
+        service.release.set()
+        for thread in threads:
+            thread.join()
+        asyncio.run(service.asend("key", "Hello"))
+        stats = service.stats()["echo-1"]
+    assert stats["calls"] == 3
+    assert stats["errors"] == 1
+    assert stats["coalesced"] == 2
+    assert stats["cache_hits"] == 2
+    assert stats["cache_misses"] == 5
+    assert stats["tokens_in"] == 6 and stats["tokens_out"] == 14
+    assert stats["cost"] == pytest.approx(20 / 1_000_000)
+
+
+def test_shared_telemetry_against_mock_server(workdir):
+    telemetry = Telemetry()
+    with MockLLMServer(max_requests_per_second=1, retry_after=0.05) as server:
+        with PublicAIService(base_url=server.url, telemetry=telemetry, logger=logging.getLogger("test_telemetry"),
+                             rate_limits={"max_retries": 50, "max_delay": 0.05}) as service:
+            service.send("key", "one two three", model="mock-model")
+            service.send("key", "four", model="mock-model")
+            assert service.send_stream("key", "streamed", model="mock-model") == "Mock response to: streamed"
+    stats = telemetry.stats()["publicai"]["mock-model"]
+    assert stats["calls"] == 3
+    assert stats["retries"] >= 1
+    assert stats["queue_wait"]["max"] > 0
+    # Usage reported by the server for send(); estimated for the streamed text
+    assert stats["tokens_in"] == 3 + 1 + 2
+    assert stats["estimated_usage"] == 1
@@ -0,0 +1,125 @@
+"""
+Tests for the utils module.
+"""
+# Metadata
+__author__ = ["Andy Turner <agdturner@gmail.com>"]
+__version__ = "0.1.0"
+__copyright__ = "Copyright (c) 2026 GABM contributors, University of Leeds"
+
+
+# Standard library imports
+import json
+import logging
+import pickle
+import pytest
+# OpenAI client library
+from openai.types.chat import ChatCompletion
+# Local imports
+from gabm.io.llm.cache import AppendOnlyCacheStore, PromptTable, segment_serialiser
+from gabm.io.llm.response import LLMResponse
+from gabm.io.llm.utils import (
+    make_cache_key, prompt_fingerprint, normalize_prompt, lookup_cache, pre_send_check_and_cache,
+    cache_and_log, log_entry_prompt, load_llm_cache, migrate_llm_cache, read_cache_records, write_cache_records
+)
+
+
+def test_make_cache_key_is_stable_and_normalised():
+    key = make_cache_key("Hello there", "gpt-3.5-turbo")
+    assert isinstance(key, str) and len(key) == 32
+    assert key == make_cache_key("  Hello there\r\n", "gpt-3.5-turbo")
+    # Composed and decomposed forms of the same character hash equally
+    assert make_cache_key("caf\u00e9", "m") == make_cache_key("cafe\u0301", "m")
+    assert key != make_cache_key("Hello there", "gpt-4")
+    assert key != make_cache_key("Hello there", "gpt-3.5-turbo", {"temperature": 0})
+    assert (make_cache_key("Hi", "m", {"a": 1, "b": 2})
+            == make_cache_key("Hi", "m", {"b": 2, "a": 1}))
+
+
+def test_normalize_prompt_and_fingerprint():
+    assert normalize_prompt(" a\r\nb ") == "a\nb"
+    assert prompt_fingerprint("a\r\nb") == prompt_fingerprint("a\nb")
+
+
+def test_lookup_cache_migrates_legacy_key():
+    cache = {("Hello", "model-a"): "Hi"}
+    key = make_cache_key("Hello", "model-a")
+    assert lookup_cache(cache, key, legacy_key=("Hello", "model-a")) == "Hi"
+    assert cache == {key: "Hi"}
+    assert lookup_cache(cache, make_cache_key("Other", "model-a")) is None
+
+
+def test_pre_send_check_and_cache(monkeypatch):
+    logger = logging.getLogger(__name__)
+    cache = {make_cache_key("Hello", "model-a"): "Hi"}
+    monkeypatch.delenv("TEST_API_KEY", raising=False)
+    assert pre_send_check_and_cache("key", "Hello", "model-a", cache, logger, "test", "TEST_API_KEY") == "Hi"
+    assert pre_send_check_and_cache("key", "Other", "model-a", cache, logger, "test", "TEST_API_KEY") is None
+    with pytest.raises(RuntimeError):
+        pre_send_check_and_cache("", "Hello", "model-a", cache, logger, "test", "TEST_API_KEY")
+
+
+def test_prompt_table(tmp_path):
+    path = tmp_path / "prompt_table.tsv"
+    table = PromptTable(path)
+    fingerprint = prompt_fingerprint("Hello\tworld\n")
+    table.add(fingerprint, "Hello\tworld\n")
+    table.add(fingerprint, "Hello\tworld\n")
+    assert path.read_text(encoding="utf-8").count("\n") == 1
+    table = PromptTable(path)
+    assert fingerprint in table
+    assert table.get(fingerprint) == "Hello\tworld\n"
+    assert table.get("missing") is None
+    # An interrupted write leaves a partial line which is discarded on reopening
+    with path.open("a", encoding="utf-8") as f:
+        f.write("abc")
+    table = PromptTable(path)
+    assert len(table) == 1
+    assert path.read_text(encoding="utf-8").count("\n") == 1
+
+
+def test_cache_and_log_records_prompt_once(tmp_path):
+    table = PromptTable(tmp_path / "prompt_table.tsv")
+    jsonl_path = tmp_path / "log.jsonl"
+    key = make_cache_key("Hello", "model-a")
+    cache_and_log({}, key, "Hi", tmp_path / "cache.pkl", jsonl_path, prompt="Hello", model="model-a", prompt_table=table)
+    cache_and_log({}, key, "Hi", tmp_path / "cache.pkl", jsonl_path, prompt="Hello", model="model-a")
+    with_table, without_table = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+    assert "prompt" not in with_table and with_table["prompt_fingerprint"] == prompt_fingerprint("Hello")
+    assert log_entry_prompt(with_table, table) == "Hello"
+    assert log_entry_prompt(with_table) is None
+    assert without_table["prompt"] == "Hello" and log_entry_prompt(without_table) == "Hello"
+
+
+def make_completion(content):
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 1700000000, "model": "gpt-4o",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    })
+
+
+def test_write_and_read_cache_records(tmp_path):
+    path = tmp_path / "cache.seg"
+    records = [(f"k{i}", LLMResponse(f"Answer {i}", "stop")) for i in range(100)]
+    assert write_cache_records(path, records, compression="zlib", dictionary=True) == 100
+    assert segment_serialiser(path) == "json"
+    assert list(read_cache_records(path)) == records
+    with pytest.raises(FileExistsError):
+        write_cache_records(path, records)
+
+
+def test_migrate_llm_cache(tmp_path):
+    cache_path = tmp_path / "prompt_response_cache.pkl"
+    with cache_path.open("wb") as f:
+        pickle.dump({"old": make_completion("Old"), "both": make_completion("Stale")}, f)
+    with AppendOnlyCacheStore(cache_path.with_suffix(".seg"), legacy_path=cache_path) as store:
+        store["both"] = make_completion("Fresh")
+        store["text"] = "Streamed text"
+    assert migrate_llm_cache(cache_path) == 3
+    assert (tmp_path / "prompt_response_cache.seg.bak").exists()
+    with load_llm_cache(cache_path) as cache:
+        assert cache.serialiser == "json"
+        assert isinstance(cache["old"], LLMResponse) and str(cache["old"]) == "Old"
+        assert str(cache["both"]) == "Fresh"
+        assert cache["text"] == "Streamed text"
+    # Migrating again does nothing
+    assert migrate_llm_cache(cache_path) == 0